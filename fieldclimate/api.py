@@ -1,3 +1,6 @@
+from fieldclimate import tracing
+
+
 class ApiClient:
     api_uri = 'https://api.fieldclimate.com/v1'
 
@@ -8,6 +11,9 @@ class ApiClient:
         async def _send(self, *args):
             return await self._client._send(*args)
 
+        async def _stream(self, *args):
+            return await self._client._stream(*args)
+
     class User(ClientRoute):
         """User routes enables you to manage information regarding user you used to authenticate with."""
 
@@ -205,6 +211,28 @@ class ApiClient:
                 uri += '/to/{}'.format(to_unix_timestamp)
             return await self._send('POST', uri, custom_data)
 
+        async def stream_last_data(self, station_id, data_group, time_period, format=None):
+            """Retrieve last data that device sends, parsing it while it is being received. Returns a
+            `ResponseStream` of `('data', sensor, values)` events for every sensor and `(key, None, value)` events for
+            other fields of the response."""
+            if format is not None:
+                uri = 'data/{}/{}/{}/last/{}'.format(format, station_id, data_group, time_period)
+            else:
+                uri = 'data/{}/{}/last/{}'.format(station_id, data_group, time_period)
+            return await self._stream('GET', uri)
+
+        async def stream_data_between_period(self, station_id, data_group, from_unix_timestamp,
+                                             to_unix_timestamp=None, format=None):
+            """Retrieve data between specified time periods, parsing it while it is being received. Returns a
+            `ResponseStream`, like `stream_last_data`."""
+            if format is not None:
+                uri = 'data/{}/{}/{}/from/{}'.format(format, station_id, data_group, from_unix_timestamp)
+            else:
+                uri = 'data/{}/{}/from/{}'.format(station_id, data_group, from_unix_timestamp)
+            if to_unix_timestamp is not None:
+                uri += '/to/{}'.format(to_unix_timestamp)
+            return await self._stream('GET', uri)
+
     class Forecast(ClientRoute):
 
         async def get_forecast_data(self, station_id, forecast_option):
@@ -346,12 +374,40 @@ class ApiClient:
                 uri += '/{}'.format(camera)
             return await self._send('GET', uri)
 
-    def __init__(self, auth):
+    def __init__(self, auth, scheduler=None, priority=None, tenant=None, tracer=None):
         self._auth = auth
+        self._scheduler = scheduler
+        self._priority = priority
+        self._tenant = tenant
+        self._tracer = tracer
+
+    def scheduled(self, scheduler, priority, tenant=None):
+        """Returns a client sharing this connection whose requests run through a `PriorityScheduler` with the given
+        priority class, on behalf of the given tenant."""
+        return ApiClient(self._auth, scheduler, priority, tenant, self._tracer)
+
+    def traced(self, tracer):
+        """Returns a client sharing this connection which records the spans of its calls in a `Tracer`."""
+        return ApiClient(self._auth, self._scheduler, self._priority, self._tenant, tracer)
 
     async def _send(self, *args):
-        resp = await self._auth._make_request(*args)
-        return resp
+        return await self._call(self._auth._make_request, *args)
+
+    async def _stream(self, *args):
+        # With a scheduler, the slot is only held until the body starts arriving.
+        return await self._call(self._auth._stream_request, *args)
+
+    async def _call(self, make_request, *args):
+        if self._tracer is None:
+            return await self._scheduled(make_request, *args)
+        with self._tracer.span(tracing.route_name(args[0], args[1]), 'api'):
+            return await self._scheduled(make_request, *args)
+
+    async def _scheduled(self, make_request, *args):
+        if self._scheduler is not None:
+            async with self._scheduler.slot(self._priority, self._tenant):
+                return await make_request(*args)
+        return await make_request(*args)
 
     @property
     def user(self):
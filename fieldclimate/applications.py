@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+from fieldclimate.ratelimit import RateLimiter
+
+
+def _first_of(entry, *keys):
+    if not isinstance(entry, dict):
+        return entry
+    for key in keys:
+        if entry.get(key) is not None:
+            return entry[key]
+    return None
+
+
+def application_id(application):
+    return _first_of(application, '_id', 'id')
+
+
+def user_id(user):
+    return _first_of(user, '_id', 'id', 'username')
+
+
+def station_id(station):
+    name = station.get('name') if isinstance(station, dict) else None
+    if isinstance(name, dict):
+        return name.get('original')
+    return _first_of(station, 'name', 'id')
+
+
+class ApplicationIndex:
+    """In-memory index of the users and stations of your applications, built from the `Dev` routes.
+
+    `refresh` crawls the applications concurrently and keeps the mapping between users and stations, after which
+    lookups are answered from memory. Refreshes are incremental: users are crawled when they first appear and then
+    only when their data is older than `max_age` seconds (never, if `max_age` is `None`).
+
+    The functions extracting identifiers from the returned objects can be replaced if your data is shaped differently.
+    """
+
+    def __init__(self, client, app_ids=None, limiter=None, application_id=application_id, user_id=user_id,
+                 station_id=station_id):
+        self._client = client
+        self._app_ids = app_ids
+        self._limiter = limiter if limiter is not None else RateLimiter()
+        self._application_id = application_id
+        self._user_id = user_id
+        self._station_id = station_id
+        self._application_users = {}
+        self._application_stations = {}
+        self._user_stations = {}
+        self._station_users = {}
+        self._crawled_at = {}
+
+    async def _fetch(self, method, *args):
+        async with self._limiter:
+            response = await method(*args)
+        return response.response or []
+
+    async def _crawl_application(self, app_id):
+        (users, stations) = await asyncio.gather(self._fetch(self._client.dev.application_users, app_id),
+                                                 self._fetch(self._client.dev.application_stations, app_id))
+        self._application_users[app_id] = frozenset(self._user_id(user) for user in users)
+        self._application_stations[app_id] = frozenset(self._station_id(station) for station in stations)
+
+    async def _crawl_user(self, user):
+        stations = await self._fetch(self._client.dev.user_stations, user)
+        self._set_user_stations(user, frozenset(self._station_id(station) for station in stations))
+        self._crawled_at[user] = time.monotonic()
+
+    def _set_user_stations(self, user, stations):
+        for station in self._user_stations.get(user, frozenset()) - stations:
+            self._station_users[station].discard(user)
+            if not self._station_users[station]:
+                del self._station_users[station]
+        for station in stations:
+            self._station_users.setdefault(station, set()).add(user)
+        if stations or user in self._user_stations:
+            self._user_stations[user] = stations
+
+    async def refresh(self, max_age=None):
+        """Updates the index. Returns the users that were crawled."""
+        app_ids = self._app_ids
+        if app_ids is None:
+            app_ids = [self._application_id(app) for app in await self._fetch(self._client.dev.list_of_applications)]
+        await asyncio.gather(*[self._crawl_application(app_id) for app_id in app_ids])
+        for app_id in set(self._application_users) - set(app_ids):
+            del self._application_users[app_id]
+            del self._application_stations[app_id]
+
+        users = set().union(*self._application_users.values())
+        for user in set(self._crawled_at) - users:
+            self._set_user_stations(user, frozenset())
+            self._user_stations.pop(user, None)
+            del self._crawled_at[user]
+        now = time.monotonic()
+        stale = [user for user in users
+                 if user not in self._crawled_at or (max_age is not None and now - self._crawled_at[user] >= max_age)]
+        await asyncio.gather(*[self._crawl_user(user) for user in stale])
+        return stale
+
+    async def refresh_periodically(self, interval, max_age=None):
+        """Refreshes the index every `interval` seconds, until cancelled."""
+        while True:
+            await self.refresh(max_age)
+            await asyncio.sleep(interval)
+
+    def schedule(self, interval, max_age=None):
+        """Starts `refresh_periodically` as a task and returns it; cancel the task to stop refreshing."""
+        return asyncio.ensure_future(self.refresh_periodically(interval, max_age))
+
+    def stations_of_user(self, user):
+        return self._user_stations.get(user, frozenset())
+
+    def users_of_station(self, station):
+        return frozenset(self._station_users.get(station, ()))
+
+    def users_of_application(self, app_id):
+        return self._application_users.get(app_id, frozenset())
+
+    def stations_of_application(self, app_id):
+        return self._application_stations.get(app_id, frozenset())
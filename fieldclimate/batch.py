@@ -0,0 +1,102 @@
+import asyncio
+from collections import namedtuple
+
+from fieldclimate.ratelimit import RateLimiter
+
+DiseaseRow = namedtuple('DiseaseRow', ['station_id', 'model', 'date', 'variable', 'value'])
+
+
+class DiseaseBatchResult:
+    def __init__(self):
+        self.rows = []
+        self.errors = {}
+
+
+def _model_keys(metadata):
+    """Extracts model keys from the response of `system_diseases_support`, which lists models either directly or
+    grouped under a `models` field."""
+    keys = []
+    for entry in metadata or []:
+        models = entry.get('models') if isinstance(entry, dict) else None
+        for model in models if models is not None else [entry]:
+            if isinstance(model, dict):
+                key = model.get('key', model.get('name'))
+                if key is not None:
+                    keys.append(key)
+            else:
+                keys.append(model)
+    return keys
+
+
+def _rows(station_id, model, response):
+    """Flattens a disease model response into one row per date and variable."""
+    if not isinstance(response, dict) or 'dates' not in response or 'data' not in response:
+        return [DiseaseRow(station_id, model, None, None, response)]
+    dates = response['dates']
+    data = response['data']
+    if isinstance(data, dict):
+        data = [dict(sensor, name=sensor.get('name', tag)) for (tag, sensor) in data.items()]
+    rows = []
+    for entry in data:
+        values = entry.get('values', entry.get('aggr'))
+        if isinstance(values, dict):
+            series = [('{}:{}'.format(entry.get('name'), key), value) for (key, value) in values.items()]
+        else:
+            series = [(entry.get('name'), values)]
+        for (variable, values) in series:
+            for (date, value) in zip(dates, values or []):
+                rows.append(DiseaseRow(station_id, model, date, variable, value))
+    return rows
+
+
+class DiseaseBatch:
+    """Evaluates many disease models on many stations concurrently.
+
+    All requests go through one shared `RateLimiter`, and the list of supported models is fetched only once per batch
+    object. Results are returned as a `DiseaseBatchResult`, whose `rows` is a tidy table of `DiseaseRow` tuples and
+    whose `errors` maps `(station_id, model)` to the exception raised for that combination.
+    """
+
+    def __init__(self, client, limiter=None):
+        self._client = client
+        self._limiter = limiter if limiter is not None else RateLimiter()
+        self._models = None
+
+    async def models(self):
+        """Returns the (cached) response of `system_diseases_support`."""
+        if self._models is None:
+            response = await self._client.system.system_diseases_support()
+            self._models = response.response
+        return self._models
+
+    async def model_keys(self):
+        return _model_keys(await self.models())
+
+    async def get_last_disease(self, station_ids, time_period, models=None):
+        """Runs `get_last_disease` for every combination of station and model."""
+        return await self._run(station_ids, models,
+                               lambda station_id, disease_data: self._client.disease.get_last_disease(
+                                   station_id, time_period, disease_data))
+
+    async def get_disease_between(self, station_ids, from_unix_timestamp, to_unix_timestamp=None, models=None):
+        """Runs `get_disease_between` for every combination of station and model."""
+        return await self._run(station_ids, models,
+                               lambda station_id, disease_data: self._client.disease.get_disease_between(
+                                   station_id, from_unix_timestamp, disease_data, to_unix_timestamp))
+
+    async def _run(self, station_ids, models, call):
+        if models is None:
+            models = await self.model_keys()
+        result = DiseaseBatchResult()
+
+        async def evaluate(station_id, model):
+            try:
+                async with self._limiter:
+                    response = await call(station_id, {'name': model})
+            except Exception as e:
+                result.errors[(station_id, model)] = e
+            else:
+                result.rows.extend(_rows(station_id, model, response.response))
+
+        await asyncio.gather(*[evaluate(station_id, model) for station_id in station_ids for model in models])
+        return result
@@ -0,0 +1,84 @@
+"""Throughput of the transports, measured against a local `MockServer`.
+
+Every transport makes the same `get_last_data` requests with a given number of them running at once:
+
+    results = await compare_transports(('aiohttp', 'httpx', 'in-process'), requests=1000, concurrency=50)
+    for result in results:
+        print(result.summary())
+
+or from the command line: `fieldclimate benchmark --requests 1000 --concurrency 50`. The mock server speaks HTTP/1.1
+only, so HTTP/2 is not measured; `in-process` shows the cost of the client without any networking.
+"""
+import asyncio
+import time
+
+from fieldclimate.connection.hmac import HMAC
+from fieldclimate.connection.transport import AiohttpTransport, HttpxTransport, InProcessTransport, httpx
+from fieldclimate.metrics import percentile
+from fieldclimate.mockserver import MockServer
+from fieldclimate.ratelimit import RateLimiter
+
+# The httpx transport is optional.
+TRANSPORTS = ('aiohttp', 'httpx', 'in-process') if httpx is not None else ('aiohttp', 'in-process')
+
+
+def make_transport(name, server):
+    if name == 'aiohttp':
+        return AiohttpTransport()
+    if name == 'httpx':
+        return HttpxTransport(http2=False)
+    if name == 'in-process':
+        return InProcessTransport(server.respond, server.api_uri)
+    raise ValueError('Unknown transport: {}'.format(name))
+
+
+class BenchmarkResult:
+    def __init__(self, transport, requests, elapsed, latencies, errors):
+        self.transport = transport
+        self.requests = requests
+        self.elapsed = elapsed
+        self.latencies = latencies
+        self.errors = errors
+
+    @property
+    def throughput(self):
+        return self.requests / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        return '{:12} {:8.1f} requests/s   p50 {:6.1f} ms   p95 {:6.1f} ms   {} errors'.format(
+            self.transport, self.throughput, (percentile(self.latencies, 0.5) or 0) * 1000,
+            (percentile(self.latencies, 0.95) or 0) * 1000, self.errors)
+
+
+async def measure(name, transport, server, requests, concurrency, data_group='hourly', time_period='1d'):
+    """Makes `requests` calls over `transport` to `server`, at most `concurrency` at once."""
+    connection = HMAC('public', 'private', transport=transport)
+    connection.api_uri = server.api_uri
+    limiter = RateLimiter(concurrency)
+    latencies = []
+    errors = []
+
+    async def call(station_id):
+        async with limiter:
+            started = time.perf_counter()
+            try:
+                await client.data.get_last_data(station_id, data_group, time_period, 'optimized')
+            except Exception as e:
+                errors.append(e)
+                return
+            latencies.append(time.perf_counter() - started)
+
+    async with connection as client:
+        started = time.perf_counter()
+        await asyncio.gather(*[call(server.station_ids[i % len(server.station_ids)]) for i in range(requests)])
+        elapsed = time.perf_counter() - started
+    return BenchmarkResult(name, len(latencies), elapsed, latencies, len(errors))
+
+
+async def compare_transports(transports=TRANSPORTS, requests=500, concurrency=50, stations=10, latency=0):
+    """Measures the transports one after another against one `MockServer` answering after `latency` seconds."""
+    results = []
+    async with MockServer(credentials={'public': 'private'}, stations=stations, latency=latency) as server:
+        for name in transports:
+            results.append(await measure(name, make_transport(name, server), server, requests, concurrency))
+    return results
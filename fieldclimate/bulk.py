@@ -0,0 +1,161 @@
+import asyncio
+from collections import OrderedDict, namedtuple
+
+from fieldclimate.metadata import StationMetadataCache
+from fieldclimate.ratelimit import RateLimiter
+
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+NOT_FOUND = 'not_found'
+FAILED = 'failed'
+
+UpdateResult = namedtuple('UpdateResult', ['kind', 'station_id', 'key', 'status', 'error'])
+
+
+class BulkUpdateReport:
+    def __init__(self):
+        self.results = []
+
+    def with_status(self, status):
+        return [result for result in self.results if result.status == status]
+
+    @property
+    def failed(self):
+        return self.with_status(FAILED)
+
+
+def _differs(current, changes):
+    return any(current.get(field) != value for (field, value) in changes.items())
+
+
+class BulkUpdate:
+    """Applies the desired names and settings of sensors, nodes and serials of many stations at once.
+
+    Desired state is collected with `sensor`, `node` and `serial`; `apply` then compares it with the current metadata
+    from a `StationMetadataCache`, skips writes that would not change anything and sends the remaining ones
+    concurrently through one `RateLimiter`. Node and serial changes of one station are sent in a single request.
+    The returned `BulkUpdateReport` has an `UpdateResult` for every item:
+
+        update = BulkUpdate(client, RateLimiter(max_concurrency=5))
+        for station_id in station_ids:
+            update.sensor(station_id, channel=1, code=506, name='Air temperature')
+            update.node(station_id, '0', 'Orchard north')
+        report = await update.apply()
+        for result in report.failed:
+            print(result.station_id, result.key, result.error)
+    """
+
+    def __init__(self, client, limiter=None, cache=None):
+        self._client = client
+        self._limiter = limiter if limiter is not None else RateLimiter()
+        self._cache = cache if cache is not None else StationMetadataCache(client, limiter=self._limiter)
+        self._sensors = OrderedDict()
+        self._nodes = OrderedDict()
+        self._serials = OrderedDict()
+
+    def sensor(self, station_id, channel, code, **changes):
+        """Sets fields (e.g. `name`, `unit`, `color`) of the sensor with the given channel and code. The fields are
+        compared with the ones returned by `station_sensors`."""
+        self._sensors.setdefault((station_id, channel, code), {}).update(changes)
+        return self
+
+    def node(self, station_id, node_id, name):
+        self._nodes.setdefault(station_id, OrderedDict())[node_id] = name
+        return self
+
+    def serial(self, station_id, serial, **changes):
+        self._serials.setdefault(station_id, OrderedDict()).setdefault(serial, {}).update(changes)
+        return self
+
+    def __len__(self):
+        return len(self._sensors) + sum(len(nodes) for nodes in self._nodes.values()) + \
+               sum(len(serials) for serials in self._serials.values())
+
+    async def apply(self):
+        """Writes every change that differs from the current state and returns a `BulkUpdateReport`. The desired
+        state is cleared afterwards, and the cached metadata of updated stations is invalidated."""
+        (sensors, nodes, serials) = (self._sensors, self._nodes, self._serials)
+        (self._sensors, self._nodes, self._serials) = (OrderedDict(), OrderedDict(), OrderedDict())
+        report = BulkUpdateReport()
+        station_ids = list(OrderedDict.fromkeys([key[0] for key in sensors] + list(nodes) + list(serials)))
+        metadata = {}
+
+        async def load(station_id):
+            try:
+                metadata[station_id] = await self._cache.get(station_id)
+            except Exception as e:
+                metadata[station_id] = e
+
+        await asyncio.gather(*[load(station_id) for station_id in station_ids])
+
+        writes = []
+        for ((station_id, channel, code), changes) in sensors.items():
+            writes.append(self._sensor_write(report, metadata[station_id], station_id, channel, code, changes))
+        for (station_id, names) in nodes.items():
+            writes.append(self._mapping_write(report, metadata[station_id], 'node', 'nodes', station_id, names,
+                                              self._client.station.change_node_name,
+                                              lambda current, name: current != name))
+        for (station_id, changes) in serials.items():
+            writes.append(self._mapping_write(report, metadata[station_id], 'serial', 'serials', station_id, changes,
+                                              self._client.station.change_serial_name,
+                                              lambda current, fields: _differs(current or {}, fields)))
+        await asyncio.gather(*[write for write in writes if write is not None])
+
+        for station_id in set(result.station_id for result in report.with_status(UPDATED)):
+            self._cache.invalidate(station_id)
+        return report
+
+    async def _put(self, method, station_id, body):
+        async with self._limiter:
+            await method(station_id, body)
+
+    def _sensor_write(self, report, metadata, station_id, channel, code, changes):
+        key = (channel, code)
+        if isinstance(metadata, Exception):
+            report.results.append(UpdateResult('sensor', station_id, key, FAILED, metadata))
+            return None
+        current = [sensor for sensor in metadata.sensors or []
+                   if sensor.get('ch') == channel and sensor.get('code') == code]
+        if not current:
+            report.results.append(UpdateResult('sensor', station_id, key, NOT_FOUND, None))
+            return None
+        if not _differs(current[0], changes):
+            report.results.append(UpdateResult('sensor', station_id, key, UNCHANGED, None))
+            return None
+
+        async def write():
+            body = dict(changes, channel=channel, code=code)
+            try:
+                await self._put(self._client.station.station_sensor_update, station_id, body)
+            except Exception as e:
+                report.results.append(UpdateResult('sensor', station_id, key, FAILED, e))
+            else:
+                report.results.append(UpdateResult('sensor', station_id, key, UPDATED, None))
+
+        return write()
+
+    def _mapping_write(self, report, metadata, kind, field, station_id, desired, method, differs):
+        """Nodes and serials are mappings from their id to their settings, which can be changed for many of them in
+        one request."""
+        if isinstance(metadata, Exception):
+            report.results.extend(UpdateResult(kind, station_id, key, FAILED, metadata) for key in desired)
+            return None
+        current = getattr(metadata, field) or {}
+        changed = OrderedDict()
+        for (key, value) in desired.items():
+            if differs(current.get(key), value):
+                changed[key] = value
+            else:
+                report.results.append(UpdateResult(kind, station_id, key, UNCHANGED, None))
+        if not changed:
+            return None
+
+        async def write():
+            try:
+                await self._put(method, station_id, dict(changed))
+            except Exception as e:
+                report.results.extend(UpdateResult(kind, station_id, key, FAILED, e) for key in changed)
+            else:
+                report.results.extend(UpdateResult(kind, station_id, key, UPDATED, None) for key in changed)
+
+        return write()
@@ -0,0 +1,250 @@
+"""The `fieldclimate` command.
+
+`fieldclimate harvest` downloads the data of many stations over a long period into local files:
+
+    fieldclimate harvest --config harvest.json --stations stations.txt --output data --from 2018-01-01
+
+The period is split into chunks fetched concurrently. Chunks are aligned to multiples of their length (counted from
+the unix epoch), so that their files do not depend on `--from`; only the first one starts at `--from` itself. Each is
+written to its own gzip-compressed JSON file: `OUTPUT/STATION/DATA_GROUP/START-END.json.gz` if it covers its whole
+aligned period, `START.json.gz` (with the aligned start) if it begins after it or still reaches past `--to` (e.g.
+now). Chunks whose complete file exists already are skipped and incomplete ones are fetched again, so an interrupted
+or scheduled pull can simply be run again.
+
+The config file is a JSON object with any of the options below (with dashes replaced by underscores) plus
+`public_key` and `private_key`, which can also be given in the `FIELDCLIMATE_PUBLIC_KEY` and
+`FIELDCLIMATE_PRIVATE_KEY` environment variables. Options given on the command line take precedence.
+
+`fieldclimate benchmark` compares the throughput of the transports (see `fieldclimate.benchmark`).
+"""
+import argparse
+import asyncio
+import calendar
+import gzip
+import json
+import os
+import sys
+import time
+
+from fieldclimate.connection.hmac import HMAC
+from fieldclimate.metrics import percentile
+from fieldclimate.ratelimit import RateLimiter
+
+DEFAULTS = {
+    'data_group': 'raw',
+    'format': 'optimized',
+    'chunk_days': 7,
+    'max_concurrency': 4,
+    'max_rate': None,
+    'compression': True,
+    'api_uri': None,
+    'output': '.',
+}
+
+
+def parse_time(value):
+    """Parses a unix timestamp or a UTC date given as `YYYY-MM-DD` or `YYYY-MM-DD HH:MM:SS`."""
+    if isinstance(value, int) or str(value).isdigit():
+        return int(value)
+    for pattern in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d'):
+        try:
+            return calendar.timegm(time.strptime(value, pattern))
+        except ValueError:
+            pass
+    raise ValueError('Invalid time: {}'.format(value))
+
+
+def read_stations(path):
+    """Reads station ids, one per line; empty lines and lines starting with '#' are skipped."""
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+
+def chunks(from_unix_timestamp, to_unix_timestamp, size):
+    """Splits the period into `(start, end)` chunks (both ends inclusive) of the periods of `size` seconds starting
+    at multiples of `size`. The first chunk starts at `from_unix_timestamp` and the last one ends at
+    `to_unix_timestamp`, so they only cover part of their periods unless these are at period bounds."""
+    result = []
+    start = from_unix_timestamp
+    while start <= to_unix_timestamp:
+        end = min(to_unix_timestamp, start // size * size + size - 1)
+        result.append((start, end))
+        start = end + 1
+    return result
+
+
+def run(coroutine):
+    """Runs a coroutine in a new event loop, with `asyncio.run` where available (Python 3.7+)."""
+    if hasattr(asyncio, 'run'):
+        return asyncio.run(coroutine)
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class HarvestStats:
+    def __init__(self):
+        self.requests = 0
+        self.skipped = 0
+        self.failures = []
+        self.bytes = 0
+        self.latencies = []
+
+    def summary(self, elapsed):
+        lines = ['{} chunks fetched, {} skipped, {} failed in {:.1f}s'.format(
+            self.requests, self.skipped, len(self.failures), elapsed)]
+        if elapsed > 0:
+            lines.append('Throughput: {:.1f} requests/s, {:.1f} kB/s written'.format(
+                self.requests / elapsed, self.bytes / 1024 / elapsed))
+        if self.latencies:
+            lines.append('Latency: p50 {:.0f} ms, p95 {:.0f} ms, max {:.0f} ms'.format(
+                percentile(self.latencies, 0.5) * 1000, percentile(self.latencies, 0.95) * 1000,
+                max(self.latencies) * 1000))
+        for (station_id, start, end, error) in self.failures:
+            lines.append('Failed: {} {}-{}: {!r}'.format(station_id, start, end, error))
+        return lines
+
+
+class Harvester:
+    """Fetches the data of stations chunk by chunk into files under `output`, skipping chunks fetched already."""
+
+    def __init__(self, client, output, data_group='raw', format='optimized', limiter=None):
+        self._client = client
+        self._output = output
+        self._data_group = data_group
+        self._format = format
+        self._limiter = limiter if limiter is not None else RateLimiter()
+        self.stats = HarvestStats()
+
+    def path(self, station_id, start, end=None):
+        """The file of a complete chunk, or of the incomplete one of the period starting at `start` if `end` is
+        None."""
+        name = '{}-{}.json.gz'.format(start, end) if end is not None else '{}.json.gz'.format(start)
+        return os.path.join(self._output, station_id, self._data_group, name)
+
+    async def run(self, station_ids, from_unix_timestamp, to_unix_timestamp, chunk_size):
+        jobs = [(station_id, start, end, chunk_size) for station_id in station_ids
+                for (start, end) in chunks(from_unix_timestamp, to_unix_timestamp, chunk_size)]
+        await asyncio.gather(*[self._fetch(*job) for job in jobs])
+        return self.stats
+
+    async def _fetch(self, station_id, start, end, chunk_size):
+        # Files are named by the period of the chunk, also if the chunk starts later, at `--from`.
+        period = start // chunk_size * chunk_size
+        complete = start == period and end - start + 1 == chunk_size
+        if os.path.exists(self.path(station_id, period, period + chunk_size - 1)) and end == period + chunk_size - 1:
+            # The whole period has been fetched already.
+            self.stats.skipped += 1
+            return
+        path = self.path(station_id, period, end if complete else None)
+        try:
+            async with self._limiter:
+                started = time.monotonic()
+                response = await self._client.data.get_data_between_period(station_id, self._data_group, start, end,
+                                                                           self._format)
+                self.stats.latencies.append(time.monotonic() - started)
+        except Exception as e:
+            self.stats.failures.append((station_id, start, end, e))
+            return
+        self.stats.requests += 1
+        self.stats.bytes += self._write(path, response.response)
+        if complete and os.path.exists(self.path(station_id, period)):
+            # Written while the chunk was incomplete.
+            os.remove(self.path(station_id, period))
+
+    @staticmethod
+    def _write(path, response):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        body = gzip.compress(json.dumps(response).encode('utf-8'))
+        # Written under a temporary name first, so that an interrupted run leaves no partial chunk behind.
+        with open(path + '.tmp', 'wb') as f:
+            f.write(body)
+        os.replace(path + '.tmp', path)
+        return len(body)
+
+
+def load_options(args):
+    options = dict(DEFAULTS)
+    options['public_key'] = os.environ.get('FIELDCLIMATE_PUBLIC_KEY')
+    options['private_key'] = os.environ.get('FIELDCLIMATE_PRIVATE_KEY')
+    if args.config is not None:
+        with open(args.config) as f:
+            options.update(json.load(f))
+    options.update((name, value) for (name, value) in vars(args).items() if value is not None)
+    for name in ('public_key', 'private_key', 'from'):
+        if options.get(name) is None:
+            raise ValueError('Missing option: {}'.format(name.replace('_', '-')))
+    return options
+
+
+async def harvest(options, output=None):
+    connection = HMAC(options['public_key'], options['private_key'])
+    if options['compression']:
+        connection.enable_compression()
+    if options['api_uri']:
+        connection.api_uri = options['api_uri']
+    started = time.monotonic()
+    async with connection as client:
+        if options.get('stations'):
+            station_ids = read_stations(options['stations'])
+        else:
+            devices = await client.user.list_of_user_devices()
+            station_ids = [device['name']['original'] for device in devices.response or []]
+        harvester = Harvester(client, options['output'], options['data_group'], options['format'],
+                              RateLimiter(options['max_concurrency'], options['max_rate']))
+        to_unix_timestamp = parse_time(options['to']) if options.get('to') is not None else int(time.time())
+        stats = await harvester.run(station_ids, parse_time(options['from']), to_unix_timestamp,
+                                    int(options['chunk_days'] * 86400))
+    for line in stats.summary(time.monotonic() - started):
+        print(line, file=output or sys.stdout)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='fieldclimate', description='FieldClimate API tools.')
+    commands = parser.add_subparsers(dest='command')
+    command = commands.add_parser('harvest', help='Download station data into local files.')
+    command.add_argument('--config', help='JSON file with options.')
+    command.add_argument('--stations', help='File with station ids, one per line (default: all your stations).')
+    command.add_argument('--output', help='Directory to write the data into (default: current directory).')
+    command.add_argument('--from', help='Start of the period: unix timestamp or YYYY-MM-DD (UTC).')
+    command.add_argument('--to', help='End of the period (default: now).')
+    command.add_argument('--data-group', help='raw, hourly, daily or monthly (default: raw).')
+    command.add_argument('--chunk-days', type=float, help='Length of the period fetched per request (default: 7).')
+    command.add_argument('--max-concurrency', type=int, help='Requests running at once (default: 4).')
+    command.add_argument('--max-rate', type=float, help='Requests started per second (default: unlimited).')
+    command.add_argument('--api-uri', help='Address of the API, e.g. of a mock server.')
+    command = commands.add_parser('benchmark', help='Compare the throughput of transports against a mock server.')
+    command.add_argument('--transports', nargs='+', help='aiohttp, httpx or in-process (default: all available).')
+    command.add_argument('--requests', type=int, default=500, help='Requests per transport (default: 500).')
+    command.add_argument('--concurrency', type=int, default=50, help='Requests running at once (default: 50).')
+    command.add_argument('--stations', type=int, default=10, help='Stations of the mock server (default: 10).')
+    command.add_argument('--latency', type=float, default=0, help='Delay of mock server responses in seconds.')
+    args = parser.parse_args(argv)
+    if args.command == 'benchmark':
+        # Imported here, so that harvesting does not load the mock server.
+        from fieldclimate.benchmark import TRANSPORTS, compare_transports
+        unknown = set(args.transports or ()) - set(TRANSPORTS)
+        if unknown:
+            parser.error('Unknown or unavailable transports: {}'.format(', '.join(sorted(unknown))))
+        results = run(compare_transports(args.transports or TRANSPORTS, args.requests, args.concurrency,
+                                         args.stations, args.latency))
+        for result in results:
+            print(result.summary())
+        return 0
+    if args.command != 'harvest':
+        parser.print_help()
+        return 2
+    del args.command
+    try:
+        options = load_options(args)
+    except ValueError as e:
+        parser.error(str(e))
+    stats = run(harvest(options))
+    return 1 if stats.failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
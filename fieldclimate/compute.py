@@ -0,0 +1,101 @@
+"""Local computations on data already downloaded with `Data.get_last_data` or `Data.get_data_between_period`.
+
+All functions work on plain sequences aligned with each other (one element per time step), so that long ranges can be
+recomputed without asking the server again. Missing measurements (`None`) propagate to the results.
+"""
+import math
+from collections import OrderedDict
+
+from fieldclimate.resample import aggregate, buckets, from_timestamp
+
+STEFAN_BOLTZMANN = 4.903e-9  # MJ K^-4 m^-2 day^-1
+W_M2_TO_MJ_M2_DAY = 0.0864
+
+
+def sensor_values(response, sensor_tag, aggr='avg'):
+    """Returns the dates and the values of one sensor aggregation from a response in the `optimized` format."""
+    return response['dates'], response['data'][sensor_tag]['aggr'][aggr]
+
+
+def daily_aggregates(dates, values):
+    """Aggregates a series into days.
+
+    Returns a list of days (as `YYYY-MM-DD` strings) and an `OrderedDict` with the `min`, `max`, `avg` and `sum`
+    series for those days. Missing values are skipped; days without any value get `None`.
+    """
+    groups = buckets(dates, 'daily')
+    aggregates = OrderedDict((aggr, aggregate(values, groups, aggr)) for aggr in ('min', 'max', 'avg', 'sum'))
+    return [from_timestamp(start)[:10] for start in groups], aggregates
+
+
+def day_of_year(day):
+    """Returns the day of year (1-366) of a `YYYY-MM-DD` date."""
+    (year, month, day) = (int(part) for part in day[:10].split('-'))
+    days_before = [0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334]
+    leap = year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    return days_before[month - 1] + day + (1 if leap and month > 2 else 0)
+
+
+def extraterrestrial_radiation(day, latitude):
+    """Daily extraterrestrial radiation Ra [MJ m-2 day-1] (FAO-56, eq. 21)."""
+    phi = math.radians(latitude)
+    j = day_of_year(day)
+    dr = 1 + 0.033 * math.cos(2 * math.pi * j / 365)
+    delta = 0.409 * math.sin(2 * math.pi * j / 365 - 1.39)
+    omega = math.acos(max(-1.0, min(1.0, -math.tan(phi) * math.tan(delta))))
+    return 24 * 60 / math.pi * 0.0820 * dr * (
+        omega * math.sin(phi) * math.sin(delta) + math.cos(phi) * math.cos(delta) * math.sin(omega))
+
+
+def _saturation_vapour_pressure(temperature):
+    return 0.6108 * math.exp(17.27 * temperature / (temperature + 237.3))
+
+
+def _penman_monteith(day, tmin, tmax, rh, wind, radiation, latitude, elevation):
+    tmean = (tmax + tmin) / 2
+    delta = 4098 * _saturation_vapour_pressure(tmean) / (tmean + 237.3) ** 2
+    pressure = 101.3 * ((293 - 0.0065 * elevation) / 293) ** 5.26
+    gamma = 0.000665 * pressure
+    es = (_saturation_vapour_pressure(tmax) + _saturation_vapour_pressure(tmin)) / 2
+    ea = rh / 100 * es
+    rs = radiation * W_M2_TO_MJ_M2_DAY
+    rso = (0.75 + 2e-5 * elevation) * extraterrestrial_radiation(day, latitude)
+    # Relative shortwave radiation, at most 1.0 (FAO-56, eq. 39). Without clear-sky radiation (polar night) the
+    # cloudiness cannot be judged from it and a moderate 0.5 is assumed.
+    relative = min(max(rs / rso, 0.0), 1.0) if rso > 0 else 0.5
+    rnl = STEFAN_BOLTZMANN * ((tmax + 273.16) ** 4 + (tmin + 273.16) ** 4) / 2 \
+        * (0.34 - 0.14 * math.sqrt(ea)) * (1.35 * relative - 0.35)
+    rn = 0.77 * rs - rnl
+    return (0.408 * delta * rn + gamma * 900 / (tmean + 273) * wind * (es - ea)) / (delta + gamma * (1 + 0.34 * wind))
+
+
+def eto_penman_monteith(days, tmin, tmax, rh_mean, wind_speed, solar_radiation, latitude, elevation=0):
+    """Daily reference evapotranspiration [mm] with the FAO-56 Penman-Monteith equation.
+
+    Takes daily series of minimum and maximum air temperature [C], mean relative humidity [%], mean wind speed at
+    2 m [m/s] and mean solar radiation [W/m2], as produced by `daily_aggregates`.
+    """
+    return [None if None in values else _penman_monteith(*values, latitude=latitude, elevation=elevation)
+            for values in zip(days, tmin, tmax, rh_mean, wind_speed, solar_radiation)]
+
+
+def eto_hargreaves(days, tmin, tmax, latitude):
+    """Daily reference evapotranspiration [mm] with the Hargreaves equation, which needs air temperature only."""
+    return [None if tn is None or tx is None else
+            0.0023 * ((tx + tn) / 2 + 17.8) * math.sqrt(max(tx - tn, 0.0))
+            * 0.408 * extraterrestrial_radiation(day, latitude)
+            for (day, tn, tx) in zip(days, tmin, tmax)]
+
+
+def daily_eto(response, temperature, humidity, wind_speed, solar_radiation, latitude, elevation=0):
+    """Computes daily ETo from a raw or hourly response in the `optimized` format.
+
+    `temperature`, `humidity`, `wind_speed` and `solar_radiation` are the tags of the sensors to use.
+    Returns a list of days and a list of ETo values for these days.
+    """
+    (days, temperatures) = daily_aggregates(*sensor_values(response, temperature))
+    (_, humidities) = daily_aggregates(*sensor_values(response, humidity))
+    (_, winds) = daily_aggregates(*sensor_values(response, wind_speed))
+    (_, radiations) = daily_aggregates(*sensor_values(response, solar_radiation))
+    return days, eto_penman_monteith(days, temperatures['min'], temperatures['max'], humidities['avg'],
+                                     winds['avg'], radiations['avg'], latitude, elevation)
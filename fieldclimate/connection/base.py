@@ -1,37 +1,209 @@
+import inspect
+import time
 from abc import ABC, abstractmethod
 
-import aiohttp
-
+from fieldclimate import tracing
 from fieldclimate.api import ApiClient
+from fieldclimate.connection import compression
+from fieldclimate.connection.breaker import LoadGuard, route_group
+from fieldclimate.connection.conditional import ValidatorCache
+from fieldclimate.connection.limiter import AdaptiveLimiter
+from fieldclimate.connection.transport import AiohttpTransport
+from fieldclimate.metrics import Metrics
 from fieldclimate.reqresp import Response, Request, ResponseException
+from fieldclimate.streaming import JsonObjectParser, ResponseStream
 
 
 class ConnectionBase(ABC):
+    # Requests go to `ApiClient.api_uri` unless this is set, e.g. to the address of a `MockServer`.
+    api_uri = None
+
+    def __init__(self, transport=None):
+        # Sends the requests; see `fieldclimate.connection.transport`. By default an `AiohttpTransport`.
+        self._transport = transport
+        self._validators = None
+        self._compression = False
+        self._recorder = None
+        self._concurrency = None
+        self.metrics = Metrics()
+        self._load_guard = LoadGuard(self.metrics)
+
     def with_client_session(self, session):
         self._session = session
         return ApiClient(self)
 
+    def enable_conditional_requests(self, max_entries=1024):
+        """Makes GET requests conditional on the `ETag` and `Last-Modified` validators of the previous response to the
+        same route. When the server answers 304 Not Modified, the previous response is returned again, so that
+        unchanged data is neither transferred nor parsed. Up to `max_entries` routes are remembered."""
+        self._validators = ValidatorCache(max_entries)
+        return self
+
+    def enable_compression(self):
+        """Asks the server for compressed responses (gzip, deflate and, if the `brotli` package is installed, brotli)
+        and decompresses them chunk by chunk while reading; bodies are parsed once complete. The sizes of response
+        bodies before and after decompression are counted in `metrics` as `bytes_compressed` and
+        `bytes_decompressed`."""
+        self._compression = True
+        return self
+
+    def enable_circuit_breakers(self, failure_ratio=0.5, slow_call_duration=None, window=20, min_calls=5,
+                                reset_timeout=30.0, group=route_group):
+        """Gives every group of routes (by default their first segment: 'data', 'station', 'disease'...) a circuit
+        breaker. When at least `failure_ratio` of the last `window` requests of a group failed with a server error,
+        429 or a connection error, or took longer than `slow_call_duration` seconds, further requests to the group
+        fail fast with `CircuitOpenException` for `reset_timeout` seconds; then a single probe request decides whether
+        the circuit closes again. Refused requests are counted in `metrics` as `rejected_open_circuit`."""
+        self._load_guard.enable_breakers(group, failure_ratio=failure_ratio, slow_call_duration=slow_call_duration,
+                                         window=window, min_calls=min_calls, reset_timeout=reset_timeout)
+        return self
+
+    def limit_outstanding_requests(self, max_outstanding):
+        """Makes requests fail fast with `OverloadedException` while `max_outstanding` others are awaiting their
+        responses, instead of piling up. Refused requests are counted in `metrics` as `rejected_overload`."""
+        self._load_guard.max_outstanding = max_outstanding
+        return self
+
+    def enable_adaptive_concurrency(self, initial_limit=4, min_limit=1, max_limit=64, tolerance=2.0, backoff=0.7):
+        """Limits the number of requests sent at once with an `AdaptiveLimiter`, which raises the limit while
+        response latency stays stable and backs off when it grows or the server fails or throttles. Requests over the
+        limit wait for their turn. The current limit is published in `metrics` as `concurrency_limit`."""
+        self._concurrency = AdaptiveLimiter(initial_limit, min_limit, max_limit, tolerance, backoff,
+                                            metrics=self.metrics)
+        return self
+
+    def enable_recording(self, path, redact=True):
+        """Records every request and response, with timings and sizes, into a cassette file that
+        `ReplayConnection` can serve back later. Credentials are left out unless `redact` is False. The cassette is
+        closed on leaving `async with`, or by `stop_recording` for clients made with `with_client_session`."""
+        from fieldclimate.connection.cassette import Recorder
+        self._recorder = Recorder(path, redact)
+        return self
+
+    def stop_recording(self):
+        """Closes the cassette file; later requests are not recorded."""
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
+
     async def __aenter__(self):
-        self._session = aiohttp.ClientSession()
+        if self._transport is not None:
+            self._session = self._transport
+        else:
+            # Sessions we create leave decompression to us, so that we can measure it.
+            self._session = AiohttpTransport(auto_decompress=not self._compression)
         return ApiClient(self)
 
     async def __aexit__(self, exc_type, exc_value, traceback):
         await self._session.close()
+        self.stop_recording()
 
     @abstractmethod
     def _modify_request(self, request):
         pass
 
-    async def _make_request(self, method, route, data=None):
+    def _prepare_request(self, method, route, data):
         request = Request(method, route, data, {'Accept': 'application/json'})
-        self._modify_request(request)
-        result = await self._session.request(method,
-                                             '{}/{}'.format(ApiClient.api_uri, request.route),
-                                             headers=request.headers,
-                                             json=request.data)
+        if self._compression:
+            request.headers['Accept-Encoding'] = compression.accept_encoding()
+        return request
+
+    async def _send_request(self, request, permit=None):
+        # `permit` is the concurrency permit entered by the caller, if any; the caller gives it back once the body has
+        # been read.
+        (result, started) = await self._sign_and_transmit(request)
+        if permit is not None:
+            permit.status = result.status
+        self.metrics.increment('requests')
+        if self._recorder is not None:
+            result = await self._recorder.record(request, result, started,
+                                                 getattr(self._session, 'auto_decompress', True))
+        return result
+
+    async def _sign_and_transmit(self, request):
+        # Signed only once the request may go out, so that waiting for a permit cannot leave it with a stale `Date`
+        # or token, and timed from there, so that the wait is not counted as latency.
+        with tracing.span('sign', 'connection'):
+            self._modify_request(request)
+        started = time.monotonic()
+        with tracing.span('http', 'connection'):
+            result = await self._transmit(request)
+        return result, started
+
+    async def _transmit(self, request):
+        return await self._session.request(request.method,
+                                           '{}/{}'.format(self.api_uri or ApiClient.api_uri, request.route),
+                                           headers=request.headers,
+                                           json=request.data)
+
+    async def _read_response(self, result):
+        if self._compression:
+            return await compression.read_json(result, self.metrics, getattr(self._session, 'auto_decompress', True))
         # So that we get None in case of empty server response instead of an exception
-        response = await result.json(content_type=None)
+        return await result.json(content_type=None)
+
+    async def _make_request(self, method, route, data=None):
+        request = self._prepare_request(method, route, data)
+        with self._load_guard.admit(route), tracing.span('_make_request', 'connection'):
+            cached = None
+            if self._validators is not None and method == 'GET':
+                cached = self._validators.get(route)
+                if cached is not None:
+                    request.headers.update(cached.conditional_headers())
+            if self._concurrency is None:
+                return await self._exchange(method, route, request, cached)
+            # The permit is held, and the latency measured, until the whole body has been read.
+            async with self._concurrency.permit() as permit:
+                return await self._exchange(method, route, request, cached, permit)
+
+    async def _exchange(self, method, route, request, cached, permit=None):
+        result = await self._send_request(request, permit)
+        if result.status == 304 and cached is not None:
+            self.metrics.increment('not_modified')
+            result.release()
+            return Response(cached.code, cached.response)
+        with tracing.span('decode', 'connection'):
+            response = await self._read_response(result)
         if result.status >= 300:
+            self.metrics.increment('errors')
             raise ResponseException(result.status, response)
-        else:
-            return Response(result.status, response)
+        if self._validators is not None and method == 'GET':
+            self._validators.store(route, result.headers, result.status, response)
+        return Response(result.status, response)
+
+    async def _stream_request(self, method, route, data=None, split=('data',)):
+        """Like `_make_request`, but returns a `ResponseStream` parsing the body while it is being received. The
+        admission and the concurrency permit of the request are held until the stream is read or closed."""
+        request = self._prepare_request(method, route, data)
+        exits = [self._load_guard.admit(route).__enter__().__exit__]
+        try:
+            with tracing.span('_stream_request', 'connection'):
+                permit = None
+                if self._concurrency is not None:
+                    permit = self._concurrency.permit()
+                    await permit.__aenter__()
+                    exits.append(permit.__aexit__)
+                result = await self._send_request(request, permit)
+                if result.status >= 300:
+                    self.metrics.increment('errors')
+                    raise ResponseException(result.status, await self._read_response(result))
+                decompressor = None
+                if self._compression and not getattr(self._session, 'auto_decompress', True):
+                    decompressor = compression.decompressor(result.headers.get('Content-Encoding'))
+                stream = ResponseStream(result, JsonObjectParser(split), decompressor, self.metrics)
+                if permit is not None:
+                    # Timed until the body starts arriving, as the consumer may take long to read the rest.
+                    stream.add_first_chunk_callback(permit.stop_clock)
+        except BaseException as e:
+            await _leave(exits, type(e), e)
+            raise
+        stream.add_close_callback(lambda exc_type, exc_value: _leave(exits, exc_type, exc_value))
+        return stream
+
+
+async def _leave(exits, exc_type, exc_value):
+    # Leaves context managers entered by hand, the last one first.
+    for exit in reversed(exits):
+        result = exit(exc_type, exc_value, None)
+        if inspect.isawaitable(result):
+            await result
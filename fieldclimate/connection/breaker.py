@@ -0,0 +1,154 @@
+"""Load shedding: circuit breakers per group of routes and a cap on the number of outstanding requests."""
+import asyncio
+import time
+from collections import deque
+
+from fieldclimate.reqresp import CircuitOpenException, OverloadedException, ResponseException
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+def route_group(route):
+    """Groups routes by their first segment, e.g. 'data/{station_id}/raw/last/1d' belongs to 'data'."""
+    return route.split('/', 1)[0]
+
+
+def is_failure_status(code):
+    """Server errors and throttling (429) tell that the API is degraded, other error responses only concern the
+    request itself."""
+    return code >= 500 or code == 429
+
+
+def is_failure(exc_type, exc_value):
+    """Whether a call ending with the given exception tells that the API is degraded."""
+    if exc_type is None:
+        return False
+    if issubclass(exc_type, ResponseException):
+        return is_failure_status(exc_value.code)
+    return True
+
+
+class CircuitBreaker:
+    """Keeps the outcomes of the last `window` calls. Once at least `min_calls` of them are known and the ratio of
+    failed ones (including calls slower than `slow_call_duration` seconds, if given) reaches `failure_ratio`, the
+    circuit opens and calls are refused for `reset_timeout` seconds. Then a single probe call is let through
+    (half-open): if it succeeds the circuit closes again, otherwise it stays open for another `reset_timeout`."""
+
+    def __init__(self, name=None, failure_ratio=0.5, slow_call_duration=None, window=20, min_calls=5,
+                 reset_timeout=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.slow_call_duration = slow_call_duration
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._clock = clock
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = None
+        self._probing = False
+
+    def before_call(self):
+        """Raises `CircuitOpenException` if the call may not be made now; otherwise returns whether it is the probe
+        of a half-open circuit."""
+        if self.state == OPEN:
+            remaining = self._opened_at + self.reset_timeout - self._clock()
+            if remaining > 0:
+                raise CircuitOpenException(self.name, remaining)
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self._probing:
+                raise CircuitOpenException(self.name, 0)
+            self._probing = True
+            return True
+        return False
+
+    def after_call(self, probe, failed, duration):
+        if self.slow_call_duration is not None and duration > self.slow_call_duration:
+            failed = True
+        if probe:
+            self._probing = False
+            if failed:
+                self._open()
+            else:
+                self.state = CLOSED
+                self._outcomes.clear()
+        elif self.state == CLOSED:
+            self._outcomes.append(failed)
+            if len(self._outcomes) >= self.min_calls and \
+                    sum(self._outcomes) >= self.failure_ratio * len(self._outcomes):
+                self._open()
+
+    def cancelled(self, probe):
+        if probe:
+            self._probing = False
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+
+
+class _Admission:
+    def __init__(self, guard, breaker):
+        self._guard = guard
+        self._breaker = breaker
+        self._probe = False
+        self._started = None
+
+    def __enter__(self):
+        guard = self._guard
+        if guard.max_outstanding is not None and guard.outstanding >= guard.max_outstanding:
+            guard.metrics.increment('rejected_overload')
+            raise OverloadedException(guard.outstanding)
+        if self._breaker is not None:
+            try:
+                self._probe = self._breaker.before_call()
+            except CircuitOpenException:
+                guard.metrics.increment('rejected_open_circuit')
+                raise
+        guard.outstanding += 1
+        self._started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._guard.outstanding -= 1
+        if self._breaker is None:
+            return
+        if exc_type is not None and issubclass(exc_type, asyncio.CancelledError):
+            self._breaker.cancelled(self._probe)
+        else:
+            self._breaker.after_call(self._probe, is_failure(exc_type, exc_value), time.monotonic() - self._started)
+
+
+class LoadGuard:
+    """Admits the requests of a connection. Nothing is refused until breakers or a limit are configured."""
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.max_outstanding = None
+        self.outstanding = 0
+        self.breakers = None
+        self._breaker_options = None
+        self._group = route_group
+
+    def enable_breakers(self, group=route_group, **options):
+        self.breakers = {}
+        self._breaker_options = options
+        self._group = group
+
+    def breaker(self, route):
+        """The circuit breaker of the group `route` belongs to, or None if breakers are not enabled."""
+        if self.breakers is None:
+            return None
+        group = self._group(route)
+        breaker = self.breakers.get(group)
+        if breaker is None:
+            breaker = self.breakers[group] = CircuitBreaker(group, **self._breaker_options)
+        return breaker
+
+    def admit(self, route):
+        """Context manager to wrap a request to `route` with; raises `OverloadedException` or
+        `CircuitOpenException` on entry if the request is refused."""
+        return _Admission(self, self.breaker(route))
@@ -0,0 +1,156 @@
+"""Recording of API traffic and its replay.
+
+A connection with recording enabled (`ConnectionBase.enable_recording`) writes every request and the raw response to
+it, together with timings and sizes, into a cassette: a gzip-compressed file with one JSON record per line.
+`ReplayConnection` serves the responses of a cassette back, with their original timing, scaled timing or no delay
+at all, so that parsing and scheduling can be benchmarked offline on real payloads.
+
+By default cassettes hold no credentials: the `Authorization` and `Date` request headers (the HMAC signature or OAuth2
+token) and the values of request body fields like `password` are replaced with `REDACTED`.
+"""
+import asyncio
+import base64
+import gzip
+import json
+import re
+import time
+from collections import deque
+
+from fieldclimate.api import ApiClient
+from fieldclimate.connection.base import ConnectionBase
+from fieldclimate.connection.transport import BufferedResponse, Transport
+
+# Response headers worth keeping; the others are not used by the connections.
+RECORDED_HEADERS = ('Content-Encoding', 'Content-Type', 'ETag', 'Last-Modified', 'Retry-After')
+
+# Request headers and body fields whose values are not written into cassettes.
+REDACTED_HEADERS = ('Authorization', 'Date')
+REDACTED_FIELDS = re.compile(r'password|secret|token', re.IGNORECASE)
+REDACTED = 'REDACTED'
+
+
+def redact(data):
+    """Returns a copy of a request body with the values of fields matching `REDACTED_FIELDS` replaced."""
+    if isinstance(data, dict):
+        return dict((key, REDACTED if REDACTED_FIELDS.search(str(key)) else redact(value))
+                    for (key, value) in data.items())
+    if isinstance(data, list):
+        return [redact(value) for value in data]
+    return data
+
+
+def _encode_body(body):
+    try:
+        return {'text': body.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {'base64': base64.b64encode(body).decode('ascii')}
+
+
+def _decode_body(record):
+    if 'text' in record:
+        return record['text'].encode('utf-8')
+    return base64.b64decode(record['base64'])
+
+
+class Recorder:
+    """Writes requests and responses into a cassette file, which is complete once the recorder is closed (also by
+    leaving `with`). Credentials are redacted unless `redact` is False."""
+
+    def __init__(self, path, redact=True):
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+        self._started = time.monotonic()
+        self._redact = redact
+
+    async def record(self, request, result, started, decompressed):
+        """Reads the whole body of `result`, writes the record and returns a `BufferedResponse` to use instead.
+
+        `started` is the `time.monotonic()` of sending the request and `decompressed` tells whether the session has
+        already decompressed the body, in which case it is recorded without its `Content-Encoding`."""
+        body = await result.read()
+        duration = time.monotonic() - started
+        headers = dict((name, result.headers[name]) for name in RECORDED_HEADERS if name in result.headers)
+        if decompressed:
+            headers.pop('Content-Encoding', None)
+        request_headers = dict(request.headers)
+        data = request.data
+        if self._redact:
+            request_headers.update((name, REDACTED) for name in REDACTED_HEADERS if name in request_headers)
+            data = redact(data)
+        record = {
+            'method': request.method,
+            'route': request.route,
+            'request_headers': request_headers,
+            'data': data,
+            'status': result.status,
+            'headers': headers,
+            'started': round(started - self._started, 6),
+            'duration': round(duration, 6),
+            'size': len(body),
+        }
+        record.update(_encode_body(body))
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+        return BufferedResponse(result.status, headers, body)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_cassette(path):
+    """Returns the records of a cassette file as a list of dicts."""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class ReplaySession(Transport):
+    """A transport answering requests with the recorded responses to the same method and route,
+    in the order they were recorded (the last one is repeated once they run out).
+
+    Every response is delayed by its recorded duration multiplied by `timing`; `timing=None` replays without delays.
+    """
+
+    # Recorded bodies are stored as they were received.
+    auto_decompress = False
+
+    def __init__(self, records, timing=1.0, api_uri=None):
+        self._api_uri = api_uri or ApiClient.api_uri
+        self._timing = timing
+        self._records = {}
+        for record in records:
+            self._records.setdefault((record['method'], record['route']), deque()).append(record)
+
+    async def request(self, method, url, headers=None, json=None, data=None):
+        route = url[len(self._api_uri) + 1:]
+        records = self._records.get((method, route))
+        if not records:
+            raise LookupError('No recorded response to {} {}'.format(method, route))
+        record = records.popleft() if len(records) > 1 else records[0]
+        if self._timing:
+            await asyncio.sleep(record['duration'] * self._timing)
+        return BufferedResponse(record['status'], record['headers'], _decode_body(record))
+
+
+class ReplayConnection(ConnectionBase):
+    """Connection serving the responses of a cassette file instead of sending requests:
+
+        async with ReplayConnection('traffic.cassette', timing=0.5) as client:
+            data = await client.data.get_last_data(station_id, 'raw', '1d')
+    """
+
+    def __init__(self, path, timing=1.0):
+        super().__init__()
+        self._path = path
+        self._timing = timing
+
+    def _modify_request(self, request):
+        pass
+
+    async def __aenter__(self):
+        return self.with_client_session(ReplaySession(read_cassette(self._path), self._timing, self.api_uri))
@@ -0,0 +1,86 @@
+import json
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CHUNK_SIZE = 64 * 1024
+
+
+def accept_encoding():
+    """Returns the encodings we can decompress, in the format of the `Accept-Encoding` header."""
+    return 'gzip, deflate, br' if brotli is not None else 'gzip, deflate'
+
+
+class _Identity:
+    def decompress(self, chunk):
+        return chunk
+
+    def flush(self):
+        return b''
+
+
+class _Deflate:
+    def __init__(self):
+        self._decompressor = None
+
+    def decompress(self, chunk):
+        if self._decompressor is None:
+            # Servers send either zlib-wrapped or raw deflate streams as `deflate`; zlib streams start with 0x78.
+            self._decompressor = zlib.decompressobj(zlib.MAX_WBITS if chunk[:1] == b'\x78' else -zlib.MAX_WBITS)
+        return self._decompressor.decompress(chunk)
+
+    def flush(self):
+        return self._decompressor.flush() if self._decompressor is not None else b''
+
+
+class _Brotli:
+    def __init__(self):
+        self._decompressor = brotli.Decompressor()
+
+    def decompress(self, chunk):
+        return self._decompressor.process(chunk)
+
+    def flush(self):
+        return b''
+
+
+def decompressor(encoding):
+    """Returns an incremental decompressor for the value of a `Content-Encoding` header."""
+    encoding = (encoding or 'identity').strip().lower()
+    if encoding in ('gzip', 'x-gzip'):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == 'deflate':
+        return _Deflate()
+    if encoding == 'br' and brotli is not None:
+        return _Brotli()
+    if encoding == 'identity':
+        return _Identity()
+    raise ValueError('Unsupported content encoding: {}'.format(encoding))
+
+
+async def read_json(result, metrics, decompressed=False):
+    """Reads and decompresses a response body chunk by chunk and parses it once complete, counting the bytes received
+    over the wire as `bytes_compressed` and the decompressed bytes as `bytes_decompressed` in `metrics`. The whole
+    decompressed body is held in memory; the `stream_*` methods parse large responses while they are received.
+
+    `decompressed` tells that the client session has already decompressed the body, in which case the compressed
+    size can only be taken from the `Content-Length` header. Returns `None` for empty bodies, like
+    `ClientResponse.json(content_type=None)` does."""
+    if decompressed:
+        body = await result.read()
+        metrics.increment('bytes_compressed', int(result.headers.get('Content-Length', len(body))))
+    else:
+        decoder = decompressor(result.headers.get('Content-Encoding'))
+        # Appended to one buffer, so that the decompressed chunks are not held a second time when joined.
+        body = bytearray()
+        async for chunk in result.content.iter_chunked(CHUNK_SIZE):
+            metrics.increment('bytes_compressed', len(chunk))
+            body += decoder.decompress(chunk)
+        body += decoder.flush()
+    metrics.increment('bytes_decompressed', len(body))
+    if not body.strip():
+        return None
+    return json.loads(body.decode('utf-8'))
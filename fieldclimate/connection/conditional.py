@@ -0,0 +1,45 @@
+from collections import OrderedDict
+
+
+class CachedResponse:
+    def __init__(self, etag, last_modified, code, response):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.code = code
+        self.response = response
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ValidatorCache:
+    """Remembers the validators (`ETag`, `Last-Modified`) and bodies of the most recent GET responses per route."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, route):
+        entry = self._entries.get(route)
+        if entry is not None:
+            self._entries.move_to_end(route)
+        return entry
+
+    def store(self, route, headers, code, response):
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if etag is None and last_modified is None:
+            self._entries.pop(route, None)
+            return
+        self._entries[route] = CachedResponse(etag, last_modified, code, response)
+        self._entries.move_to_end(route)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
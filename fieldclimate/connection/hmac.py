@@ -7,7 +7,8 @@ from fieldclimate.connection.base import ConnectionBase
 
 class HMAC(ConnectionBase):
 
-    def __init__(self, public_key, private_key):
+    def __init__(self, public_key, private_key, transport=None):
+        super().__init__(transport)
         self._publicKey = public_key
         self._privateKey = private_key
 
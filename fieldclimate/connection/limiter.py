@@ -0,0 +1,116 @@
+import asyncio
+import time
+from collections import deque
+
+from fieldclimate.connection.breaker import is_failure, is_failure_status
+
+
+class _Permit:
+    def __init__(self, limiter):
+        self._limiter = limiter
+        self._started = None
+        self._generation = None
+        self._latency = None
+        # The status of the response, if one was received inside the block.
+        self.status = None
+
+    async def __aenter__(self):
+        await self._limiter.acquire()
+        self._started = time.monotonic()
+        self._generation = self._limiter.generation
+        return self
+
+    def stop_clock(self):
+        """Ends the latency fed back now, e.g. when a streamed body starts arriving, rather than when the permit is
+        given back."""
+        if self._latency is None:
+            self._latency = time.monotonic() - self._started
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None and issubclass(exc_type, asyncio.CancelledError):
+            self._limiter.release()
+        else:
+            failed = is_failure(exc_type, exc_value) or (self.status is not None and is_failure_status(self.status))
+            self.stop_clock()
+            self._limiter.release(self._latency, failed, self._generation)
+
+
+class AdaptiveLimiter:
+    """Concurrency limit adapting to the observed latency (additive increase, multiplicative decrease).
+
+    The limit grows by one per `limit` successful requests while it is actually used and latency stays within
+    `tolerance` times the baseline (the lowest recent latency). It is multiplied by `backoff` when a request fails
+    with a server error, 429 or a connection error, or takes longer than that. Requests started before a decrease
+    do not cause another one, so a burst of slow responses only backs off once. The current limit and the number of
+    requests in flight are published in `metrics` as the `concurrency_limit` and `in_flight` gauges.
+    """
+
+    def __init__(self, initial_limit=4, min_limit=1, max_limit=64, tolerance=2.0, backoff=0.7, baseline_decay=0.01,
+                 metrics=None):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.baseline = None
+        self.in_flight = 0
+        # Increased with every decrease of the limit.
+        self.generation = 0
+        self._baseline_decay = baseline_decay
+        self._metrics = metrics
+        self._waiters = deque()
+        self._publish()
+
+    def permit(self):
+        """Returns an asynchronous context manager holding a permit while inside and feeding the outcome back."""
+        return _Permit(self)
+
+    async def acquire(self):
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self._publish()
+            return
+        waiter = asyncio.get_event_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, latency=None, failed=False, generation=None):
+        """Gives back a permit. `latency` and `failed` describe the finished request; without them, e.g. for
+        cancelled requests, the limit is left alone."""
+        used = self.in_flight
+        self.in_flight -= 1
+        if latency is not None:
+            self._adapt(latency, failed, generation, used)
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+        self._publish()
+
+    def _adapt(self, latency, failed, generation, used):
+        if not failed:
+            if self.baseline is None or latency < self.baseline:
+                self.baseline = latency
+            else:
+                # Lets the baseline follow lasting changes of the server speed.
+                self.baseline += (latency - self.baseline) * self._baseline_decay
+        slow = self.baseline is not None and latency > self.baseline * self.tolerance
+        if failed or slow:
+            if generation == self.generation:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self.generation += 1
+        elif used >= int(self.limit) / 2:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _publish(self):
+        if self._metrics is not None:
+            self._metrics.set('concurrency_limit', int(self.limit))
+            self._metrics.set('in_flight', self.in_flight)
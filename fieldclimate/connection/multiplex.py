@@ -0,0 +1,116 @@
+import weakref
+from collections import OrderedDict
+
+import aiohttp
+
+from fieldclimate.api import ApiClient
+from fieldclimate.connection.hmac import HMAC
+from fieldclimate.connection.transport import AiohttpTransport
+from fieldclimate.ratelimit import RateLimiter
+
+
+class _AccountConnection(HMAC):
+    def __init__(self, public_key, private_key, limiter):
+        super().__init__(public_key, private_key)
+        self.limiter = limiter
+
+    async def _make_request(self, method, route, data=None):
+        async with self.limiter:
+            return await super()._make_request(method, route, data)
+
+    async def _stream_request(self, method, route, data=None, split=('data',)):
+        # The limiter is held until the stream is read or closed.
+        await self.limiter.acquire()
+        try:
+            stream = await super()._stream_request(method, route, data, split)
+        except BaseException:
+            self.limiter.release()
+            raise
+        stream.add_close_callback(self._release_limiter)
+        return stream
+
+    async def _release_limiter(self, exc_type, exc_value):
+        self.limiter.release()
+
+
+class Multiplexer:
+    """Serves many HMAC accounts over one pooled transport.
+
+    Every account gets its own lightweight connection signing requests with its keys and its own `RateLimiter`, but
+    all of them share the transport, and with it the connection pool, so the number of open sockets depends on the
+    traffic (at most `connection_limit` with the default `AiohttpTransport`) rather than on the number of accounts:
+
+        async with Multiplexer(max_concurrency=2) as multiplexer:
+            for (public_key, private_key) in customers:
+                client = multiplexer.client(public_key, private_key)
+                ...
+
+    Up to `max_accounts` accounts are kept; the least recently used ones are dropped beyond that. A dropped account
+    whose connection is still in use (e.g. with requests in flight) gets it back, with its limiter, so that its limits
+    hold; otherwise it gets a new connection and limiter when it is used again.
+
+    Like a connection, the multiplexer creates its transport (or uses the one given) on entering `async with` and
+    closes it on leaving; a session set with `with_session` instead belongs to the caller and is not closed.
+    """
+
+    def __init__(self, max_concurrency=4, max_rate=None, connection_limit=100, transport=None, max_accounts=1024):
+        self._max_concurrency = max_concurrency
+        self._max_rate = max_rate
+        self._connection_limit = connection_limit
+        self._transport = transport
+        self.max_accounts = max_accounts
+        self._session = None
+        # Whether `_session` was created or given to the constructor, and so is closed on leaving `async with`.
+        self._owns_session = False
+        self._accounts = OrderedDict()
+        # Dropped connections, for as long as something else still uses them.
+        self._dropped = weakref.WeakValueDictionary()
+
+    def with_session(self, session):
+        """Sends the requests of all accounts over `session`, which the caller closes, and returns the multiplexer.
+        `async with` is not needed then."""
+        self._session = session
+        self._owns_session = False
+        return self
+
+    async def __aenter__(self):
+        if self._session is None:
+            if self._transport is not None:
+                self._session = self._transport
+            else:
+                self._session = AiohttpTransport(connector=aiohttp.TCPConnector(limit=self._connection_limit))
+            self._owns_session = True
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if self._owns_session:
+            await self._session.close()
+            self._session = None
+            self._owns_session = False
+
+    def client(self, public_key, private_key, max_concurrency=None, max_rate=None):
+        """Returns the `ApiClient` of an account, creating it on first use. The limits default to the ones given to
+        the multiplexer and apply to this account only."""
+        connection = self._accounts.get(public_key)
+        if connection is None:
+            connection = self._dropped.pop(public_key, None)
+            if connection is not None:
+                self._accounts[public_key] = connection
+        if connection is None or connection._privateKey != private_key:
+            limiter = RateLimiter(max_concurrency if max_concurrency is not None else self._max_concurrency,
+                                  max_rate if max_rate is not None else self._max_rate)
+            connection = _AccountConnection(public_key, private_key, limiter)
+            self._accounts[public_key] = connection
+        self._accounts.move_to_end(public_key)
+        while len(self._accounts) > self.max_accounts:
+            (dropped_key, dropped) = self._accounts.popitem(last=False)
+            self._dropped[dropped_key] = dropped
+        connection._session = self._session
+        return ApiClient(connection)
+
+    def remove(self, public_key):
+        self._accounts.pop(public_key, None)
+        self._dropped.pop(public_key, None)
+
+    def __len__(self):
+        return len(self._accounts)
@@ -4,6 +4,7 @@ from abc import ABC, abstractmethod
 
 from aiohttp import web
 
+from fieldclimate import tracing
 from fieldclimate.connection.base import ConnectionBase
 from fieldclimate.reqresp import ResponseException
 from fieldclimate.tools import get_credentials
@@ -61,7 +62,11 @@ class WebBasedProvider(AuthCodeProvider):
 
 
 class OAuth2(ConnectionBase):
-    def __init__(self, auth_code_provider):
+    # Tokens are requested here, unless this is set to e.g. the `token_uri` of a `MockServer`.
+    token_uri = 'https://oauth.fieldclimate.com/token'
+
+    def __init__(self, auth_code_provider, transport=None):
+        super().__init__(transport)
         self._auth_code_provider = auth_code_provider
         self._access_token = None
         self._refresh_token = None
@@ -81,7 +86,7 @@ class OAuth2(ConnectionBase):
                 'grant_type': 'authorization_code',
                 'code': await self._auth_code_provider.get_auth_code()
             }
-        result = await self._session.request('POST', 'https://oauth.fieldclimate.com/token', data=params)
+        result = await self._session.request('POST', self.token_uri, data=params)
         response = await result.json(
             content_type=None)
         if result.status >= 300:
@@ -92,15 +97,23 @@ class OAuth2(ConnectionBase):
     def _modify_request(self, request):
         request.headers['Authorization'] = 'Authorization: Bearer {}'.format(self._access_token)
 
-    async def _make_request(self, method, route, data=None):
+    async def _authorized(self, make_request, *args):
         if self._access_token is None:
-            await self._get_token()
+            with tracing.span('token', 'connection'):
+                await self._get_token()
         try:
-            response = await super()._make_request(method, route, data)
+            response = await make_request(*args)
         except ResponseException as e:
             if e.code == 401:
-                await self._get_token()
-                response = await super()._make_request(method, route, data)
+                with tracing.span('token', 'connection'):
+                    await self._get_token()
+                response = await make_request(*args)
             else:
                 raise
         return response
+
+    async def _make_request(self, method, route, data=None):
+        return await self._authorized(super()._make_request, method, route, data)
+
+    async def _stream_request(self, method, route, data=None, split=('data',)):
+        return await self._authorized(super()._stream_request, method, route, data, split)
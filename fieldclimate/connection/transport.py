@@ -0,0 +1,201 @@
+"""Transports sending the HTTP requests of connections.
+
+A transport offers `request(method, url, headers=None, json=None, data=None)`, returning a response with the parts of
+`aiohttp.ClientResponse` used by the connections (`status`, `headers`, `read()`, `json()`, `content.iter_chunked()`
+and `release()`), and `close()`. Its `auto_decompress` attribute tells whether response bodies arrive decompressed.
+Connections use an `AiohttpTransport` unless given another one:
+
+    async with HMAC(public_key, private_key, transport=HttpxTransport()) as client:
+        ...
+"""
+import asyncio
+import json as json_module
+from abc import ABC, abstractmethod
+
+import aiohttp
+
+from fieldclimate.api import ApiClient
+from fieldclimate.connection import compression
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class Transport(ABC):
+    # Whether response bodies are decompressed by the transport.
+    auto_decompress = True
+
+    @abstractmethod
+    async def request(self, method, url, headers=None, json=None, data=None):
+        pass
+
+    async def close(self):
+        pass
+
+
+class _ChunkIterator:
+    def __init__(self, body, size):
+        self._body = body
+        self._size = size
+        self._position = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._position >= len(self._body):
+            raise StopAsyncIteration
+        chunk = self._body[self._position:self._position + self._size]
+        self._position += self._size
+        return chunk
+
+
+class _Content:
+    def __init__(self, body):
+        self._body = body
+
+    def iter_chunked(self, size):
+        return _ChunkIterator(self._body, size)
+
+
+class BufferedResponse:
+    """A response whose body has been read completely, offering the parts of `aiohttp.ClientResponse` used by the
+    connections."""
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.content = _Content(body)
+
+    async def read(self):
+        return self.body
+
+    async def json(self, content_type=None):
+        decoder = compression.decompressor(self.headers.get('Content-Encoding'))
+        body = decoder.decompress(self.body) + decoder.flush()
+        if not body.strip():
+            return None
+        return json_module.loads(body.decode('utf-8'))
+
+    def release(self):
+        pass
+
+
+class AiohttpTransport(Transport):
+    """Sends requests with an `aiohttp.ClientSession`, created on first use with the given options."""
+
+    def __init__(self, auto_decompress=True, **session_options):
+        self.auto_decompress = auto_decompress
+        self._session_options = session_options
+        self._session = None
+
+    async def request(self, method, url, headers=None, json=None, data=None):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(auto_decompress=self.auto_decompress, **self._session_options)
+        return await self._session.request(method, url, headers=headers, json=json, data=data)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class _HttpxContent:
+    def __init__(self, response, decompress):
+        self._response = response
+        self._decompress = decompress
+
+    def iter_chunked(self, size):
+        if self._decompress:
+            return self._response.aiter_bytes(size)
+        return self._response.aiter_raw(size)
+
+
+class _HttpxResponse:
+    def __init__(self, response, decompress, closing):
+        self._response = response
+        self._decompress = decompress
+        self._closing = closing
+        self._body = None
+        self.status = response.status_code
+        self.headers = response.headers
+        self.content = _HttpxContent(response, decompress)
+
+    async def read(self):
+        if self._body is None:
+            chunks = []
+            async for chunk in self.content.iter_chunked(compression.CHUNK_SIZE):
+                chunks.append(chunk)
+            self._body = b''.join(chunks)
+        return self._body
+
+    async def json(self, content_type=None):
+        # Bodies read raw are decompressed according to their `Content-Encoding`, like buffered ones.
+        headers = {} if self._decompress else self.headers
+        return await BufferedResponse(self.status, headers, await self.read()).json()
+
+    def release(self):
+        """Closes the response in the background, like `aiohttp.ClientResponse.release` returning without waiting;
+        the transport waits for the close (and raises its errors) when it is closed itself."""
+        if not self._response.is_closed:
+            task = asyncio.ensure_future(self._response.aclose())
+            self._closing.add(task)
+            task.add_done_callback(self._closed)
+
+    def _closed(self, task):
+        if not task.cancelled() and task.exception() is None:
+            self._closing.discard(task)
+
+    async def aclose(self):
+        await self._response.aclose()
+
+
+class HttpxTransport(Transport):
+    """Sends requests with an `httpx.AsyncClient`, created on first use with the given options. `http2=True` lets
+    httpx negotiate HTTP/2, which needs the `h2` package (`pip install fieldclimate[http2]`)."""
+
+    def __init__(self, http2=False, auto_decompress=True, **client_options):
+        if httpx is None:
+            raise ImportError('HttpxTransport needs the httpx package (pip install fieldclimate[httpx])')
+        self.auto_decompress = auto_decompress
+        self._client_options = dict(client_options, http2=http2)
+        self._client = None
+        # Closes of released responses still running.
+        self._closing = set()
+
+    async def request(self, method, url, headers=None, json=None, data=None):
+        if self._client is None:
+            self._client = httpx.AsyncClient(**self._client_options)
+        request = self._client.build_request(method, url, headers=headers, json=json, data=data)
+        return _HttpxResponse(await self._client.send(request, stream=True), self.auto_decompress, self._closing)
+
+    async def close(self):
+        closing = list(self._closing)
+        self._closing.clear()
+        try:
+            await asyncio.gather(*closing)
+        finally:
+            if self._client is not None:
+                await self._client.aclose()
+                self._client = None
+
+
+class InProcessTransport(Transport):
+    """Answers requests by calling `handler(method, route, headers, body)` in the same event loop, without sockets.
+    The handler returns `(status, headers, response)`, `response` being JSON data or None for an empty body;
+    `MockServer.respond` is one. Requests must go to `api_uri` (by default `ApiClient.api_uri`)."""
+
+    def __init__(self, handler, api_uri=None):
+        self._handler = handler
+        self._api_uri = api_uri or ApiClient.api_uri
+
+    async def request(self, method, url, headers=None, json=None, data=None):
+        if not url.startswith(self._api_uri + '/'):
+            raise ValueError('{} is not served in process'.format(url))
+        (status, response_headers, response) = await self._handler(method, url[len(self._api_uri) + 1:],
+                                                                  dict(headers or {}), json)
+        body = json_module.dumps(response).encode('utf-8') if response is not None else b''
+        return BufferedResponse(status, dict(response_headers, **{'Content-Type': 'application/json'}), body)
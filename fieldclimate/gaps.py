@@ -0,0 +1,154 @@
+"""Finding and filling holes in stored station data.
+
+Data kept locally in the `optimized` format (as returned by `get_data_between_period(..., format='optimized')`)
+can miss dates, e.g. after a failed request or because a station transmitted late. `missing_intervals` finds them and
+`GapFiller` fetches only the missing ranges and merges them into the stored data. The API returns dates in the local
+time of the station, so they are shifted by its `timezone_offset` before being compared with unix timestamps.
+"""
+import asyncio
+from collections import Counter, OrderedDict
+
+from fieldclimate.metadata import station_timezone_offset
+from fieldclimate.ratelimit import RateLimiter
+from fieldclimate.resample import INTERVALS, from_timestamp, to_timestamp
+
+
+def typical_step(timestamps):
+    """The most common distance between consecutive timestamps, or None if there are less than two."""
+    steps = Counter(second - first for (first, second) in zip(timestamps, timestamps[1:]) if second > first)
+    return steps.most_common(1)[0][0] if steps else None
+
+
+def missing_intervals(timestamps, step, from_unix_timestamp, to_unix_timestamp):
+    """Returns `(start, end)` pairs (both inclusive) of the periods between the two timestamps where measurements
+    `step` seconds apart are expected but missing. `timestamps` must be sorted."""
+    intervals = []
+    expected = from_unix_timestamp
+    for timestamp in timestamps:
+        if timestamp < from_unix_timestamp:
+            continue
+        if timestamp > to_unix_timestamp:
+            break
+        if timestamp - expected >= step:
+            intervals.append((expected, timestamp - 1))
+        expected = max(expected, timestamp + step)
+    if expected <= to_unix_timestamp:
+        intervals.append((expected, to_unix_timestamp))
+    return intervals
+
+
+def plan_requests(intervals, merge_within=0, max_span=None):
+    """Turns missing intervals into as few period requests as possible: intervals at most `merge_within` seconds
+    apart are fetched together (refetching what lies between them), and no request spans more than `max_span`
+    seconds."""
+    merged = []
+    for (start, end) in sorted(intervals):
+        if merged and start - merged[-1][1] - 1 <= merge_within:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    if max_span is None:
+        return merged
+    requests = []
+    for (start, end) in merged:
+        while end - start + 1 > max_span:
+            requests.append((start, start + max_span - 1))
+            start += max_span
+        requests.append((start, end))
+    return requests
+
+
+def merge_data(*responses):
+    """Merges responses in the `optimized` format into a new one, ordered by date. Where several have a date, the
+    values of the last one win; sensors missing from some of them get None for their dates."""
+    positions = {}
+    for (index, response) in enumerate(responses):
+        for (position, date) in enumerate(response.get('dates') or []):
+            positions.setdefault(to_timestamp(date), {})[index] = position
+    timestamps = sorted(positions)
+    data = OrderedDict()
+    for (index, response) in enumerate(responses):
+        for (tag, sensor) in (response.get('data') or {}).items():
+            merged = data.setdefault(tag, dict(sensor, aggr=OrderedDict()))
+            for (aggr, values) in sensor.get('aggr', {}).items():
+                series = merged['aggr'].setdefault(aggr, [None] * len(timestamps))
+                for (i, timestamp) in enumerate(timestamps):
+                    position = positions[timestamp].get(index)
+                    if position is not None and position < len(values):
+                        series[i] = values[position]
+    return {'dates': [from_timestamp(timestamp) for timestamp in timestamps], 'data': data}
+
+
+class GapFiller:
+    """Fills the holes in stored data of stations with as few requests as possible.
+
+    Missing intervals closer than `merge_within` seconds are fetched in one request, requests span at most `max_span`
+    seconds and all of them go through one `RateLimiter`:
+
+        filler = GapFiller(client, merge_within=3600)
+        data = await filler.fill(station_id, 'raw', stored, from_unix_timestamp, to_unix_timestamp)
+    """
+
+    def __init__(self, client, limiter=None, merge_within=0, max_span=7 * 86400):
+        self._client = client
+        self._limiter = limiter if limiter is not None else RateLimiter()
+        self._merge_within = merge_within
+        self._max_span = max_span
+        # Futures of the timezone offsets of stations, so that each is fetched once.
+        self._timezone_offsets = {}
+        # `(station_id, data_group, from_unix_timestamp, to_unix_timestamp)` of every request made.
+        self.requests = []
+
+    async def timezone_offset(self, station_id):
+        """The offset of the dates of a station from UTC in minutes, read from its station information."""
+        if station_id not in self._timezone_offsets:
+            self._timezone_offsets[station_id] = asyncio.ensure_future(self._fetch_timezone_offset(station_id))
+        try:
+            return await self._timezone_offsets[station_id]
+        except Exception:
+            self._timezone_offsets.pop(station_id, None)
+            raise
+
+    async def _fetch_timezone_offset(self, station_id):
+        async with self._limiter:
+            return station_timezone_offset((await self._client.station.station_information(station_id)).response)
+
+    def plan(self, data_group, stored, from_unix_timestamp, to_unix_timestamp, step=None, timezone_offset=0):
+        """Returns the period requests that would fill the holes in `stored`, whose dates are `timezone_offset`
+        minutes ahead of UTC. The expected distance between dates is `step` seconds; by default that of `hourly` and
+        `daily` data, or the most common one in `stored`."""
+        timestamps = sorted(to_timestamp(date) - timezone_offset * 60 for date in stored.get('dates') or [])
+        step = step or INTERVALS.get(data_group) or typical_step(timestamps)
+        if step is None:
+            return [(from_unix_timestamp, to_unix_timestamp)]
+        intervals = missing_intervals(timestamps, step, from_unix_timestamp, to_unix_timestamp)
+        return plan_requests(intervals, self._merge_within, self._max_span)
+
+    async def fill(self, station_id, data_group, stored, from_unix_timestamp, to_unix_timestamp, step=None,
+                   timezone_offset=None):
+        """Fetches the missing parts of `stored` between the two timestamps and returns the merged data. Periods the
+        server has no data for stay missing. The timezone offset is read from the station information unless
+        given."""
+        if timezone_offset is None:
+            timezone_offset = await self.timezone_offset(station_id)
+        planned = self.plan(data_group, stored, from_unix_timestamp, to_unix_timestamp, step, timezone_offset)
+
+        async def fetch(start, end):
+            async with self._limiter:
+                self.requests.append((station_id, data_group, start, end))
+                response = await self._client.data.get_data_between_period(station_id, data_group, start, end,
+                                                                           'optimized')
+            return response.response or {}
+
+        if not planned:
+            return stored
+        return merge_data(stored, *await asyncio.gather(*[fetch(start, end) for (start, end) in planned]))
+
+    async def fill_many(self, stored, from_unix_timestamp, to_unix_timestamp):
+        """Fills the data of many stations concurrently. `stored` maps `(station_id, data_group)` to the stored data;
+        a dict of the same keys with the merged data is returned."""
+        keys = list(stored)
+        results = await asyncio.gather(*[self.fill(station_id, data_group, stored[(station_id, data_group)],
+                                                   from_unix_timestamp, to_unix_timestamp)
+                                          for (station_id, data_group) in keys])
+        return OrderedDict(zip(keys, results))
@@ -0,0 +1,253 @@
+"""Transmission history and events of stations, stored column by column.
+
+`HistoryStore` fetches transmission history and events over long ranges in concurrent windows and keeps them on disk
+as typed arrays, so that later queries only fetch the part of the range that is not stored yet. The functions below
+work on whole columns of a `ColumnTable`: transmission gaps, uptime, daily trends of e.g. battery or solar panel
+voltage and events per day.
+"""
+import array
+import asyncio
+import json
+import math
+import os
+import sys
+from bisect import bisect_left
+from collections import OrderedDict
+
+from fieldclimate.metadata import station_timezone_offset
+from fieldclimate.ratelimit import RateLimiter
+from fieldclimate.resample import aggregate, buckets, from_timestamp, to_timestamp
+
+TIME = 'time'
+
+
+def _typecode(values):
+    if all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        return 'q'
+    return 'd'
+
+
+class ColumnTable:
+    """Numeric fields of records, each in a typed `array.array`, sorted by the `time` column (unix timestamps).
+
+    Integer fields are stored as 64-bit integers, all the others as doubles with NaN for missing values; fields that
+    are not numeric (e.g. descriptions) are left out.
+    """
+
+    def __init__(self, columns=None, meta=None):
+        self.columns = columns if columns is not None else OrderedDict([(TIME, array.array('q'))])
+        self.meta = meta if meta is not None else {}
+
+    @classmethod
+    def from_records(cls, records, date_field='date', timezone_offset=0):
+        """Builds a table from records as returned by the API, whose dates are `timezone_offset` minutes ahead of
+        UTC (the local time of the station)."""
+        records = sorted(records, key=lambda record: to_timestamp(record[date_field]))
+        columns = OrderedDict([(TIME, array.array('q', [to_timestamp(record[date_field]) - timezone_offset * 60
+                                                        for record in records]))])
+        names = OrderedDict()
+        for record in records:
+            for (name, value) in record.items():
+                if name != date_field and isinstance(value, (int, float)) and not isinstance(value, bool):
+                    names[name] = True
+        for name in names:
+            values = [record.get(name) for record in records]
+            typecode = _typecode(values)
+            columns[name] = array.array(typecode, [float('nan') if value is None else value for value in values]
+                                        if typecode == 'd' else values)
+        return cls(columns)
+
+    def __len__(self):
+        return len(self.columns[TIME])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def select(self, from_unix_timestamp=None, to_unix_timestamp=None):
+        """Returns the rows within the given range (both ends inclusive) as a new table."""
+        times = self.columns[TIME]
+        start = 0 if from_unix_timestamp is None else bisect_left(times, from_unix_timestamp)
+        end = len(times) if to_unix_timestamp is None else bisect_left(times, to_unix_timestamp + 1)
+        return ColumnTable(OrderedDict((name, column[start:end]) for (name, column) in self.columns.items()),
+                           dict(self.meta))
+
+    def merge(self, other):
+        """Returns a table with the rows of both tables, ordered by time. Columns missing from one table are filled
+        with NaN (or converted to doubles, if they held integers)."""
+        names = list(self.columns) + [name for name in other.columns if name not in self.columns]
+        order = sorted(range(len(self) + len(other)),
+                       key=lambda i: self.columns[TIME][i] if i < len(self) else other.columns[TIME][i - len(self)])
+        columns = OrderedDict()
+        for name in names:
+            (mine, theirs) = (self.columns.get(name), other.columns.get(name))
+            typecode = 'q' if all(column is not None and column.typecode == 'q' for column in (mine, theirs)) else 'd'
+            values = list(mine if mine is not None else [float('nan')] * len(self)) + \
+                list(theirs if theirs is not None else [float('nan')] * len(other))
+            columns[name] = array.array(typecode, [values[i] for i in order])
+        return ColumnTable(columns, dict(self.meta))
+
+    def save(self, path):
+        """Writes the table into a file: a JSON header line followed by the raw bytes of every column."""
+        header = {'byteorder': sys.byteorder, 'meta': self.meta,
+                  'columns': [[name, column.typecode, len(column)] for (name, column) in self.columns.items()]}
+        with open(path + '.tmp', 'wb') as f:
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            for column in self.columns.values():
+                f.write(column.tobytes())
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            header = json.loads(f.readline().decode('utf-8'))
+            columns = OrderedDict()
+            for (name, typecode, length) in header['columns']:
+                column = array.array(typecode)
+                column.frombytes(f.read(length * column.itemsize))
+                if header['byteorder'] != sys.byteorder:
+                    column.byteswap()
+                columns[name] = column
+        return cls(columns, header['meta'])
+
+
+def transmission_gaps(table, max_interval):
+    """Returns `(last, next)` timestamp pairs of consecutive transmissions more than `max_interval` seconds apart."""
+    times = table[TIME]
+    return [(times[i - 1], times[i]) for i in range(1, len(times)) if times[i] - times[i - 1] > max_interval]
+
+
+def uptime(table, interval, from_unix_timestamp, to_unix_timestamp):
+    """Ratio of the `interval`-long slots between the two timestamps in which at least one transmission arrived."""
+    slots = (to_unix_timestamp - from_unix_timestamp) // interval + 1
+    if slots <= 0:
+        return 0.0
+    times = table.select(from_unix_timestamp, to_unix_timestamp)[TIME]
+    received = set((time - from_unix_timestamp) // interval for time in times)
+    return len(received) / slots
+
+
+def daily(table, column, aggr='avg', offset=0):
+    """Aggregates a column per day. Returns the dates of the days and the aggregated values."""
+    groups = buckets(table[TIME], 'daily', offset)
+    values = [None if isinstance(value, float) and math.isnan(value) else value for value in table[column]]
+    return [from_timestamp(start) for start in groups], aggregate(values, groups, aggr)
+
+
+def trend(table, column):
+    """Least squares slope of a column in units per day, e.g. how fast the battery discharges. None if the column has
+    less than two values."""
+    points = [(time / 86400.0, value) for (time, value) in zip(table[TIME], table[column])
+              if not (isinstance(value, float) and math.isnan(value))]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for (x, _) in points) / len(points)
+    mean_y = sum(y for (_, y) in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for (x, _) in points)
+    if not variance:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for (x, y) in points) / variance
+
+
+def events_per_day(table, code=None, offset=0):
+    """Counts events per day, optionally only those with the given `code`. Returns an `OrderedDict` of date to
+    count. A table without a `code` column (e.g. without any events) has no events of a code."""
+    times = table[TIME]
+    if code is not None:
+        if 'code' not in table.columns:
+            return OrderedDict()
+        times = [time for (time, event_code) in zip(times, table['code']) if event_code == code]
+    return OrderedDict((from_timestamp(start), len(indices))
+                       for (start, indices) in buckets(times, 'daily', offset).items())
+
+
+class HistoryStore:
+    """Fetches transmission history and events of stations and keeps them in `directory`.
+
+    Ranges are fetched in windows of `window` seconds, concurrently through one `RateLimiter`. Every station has one
+    file per kind, remembering which range it covers, so asking for an overlapping range again fetches only what is
+    missing. Dates are converted to unix timestamps with the timezone offset from the station information:
+
+        store = HistoryStore(client, 'history')
+        history = await store.history(station_id, from_unix_timestamp, to_unix_timestamp)
+        print(trend(history, 'battery'), transmission_gaps(history, 1800))
+    """
+
+    def __init__(self, client, directory, limiter=None, window=7 * 86400):
+        self._client = client
+        self._directory = directory
+        self._limiter = limiter if limiter is not None else RateLimiter()
+        self._window = window
+        # One lock per file, so that concurrent queries of a station do not fetch and write its file twice.
+        self._locks = {}
+        # Futures of the timezone offsets of stations, so that each is fetched once.
+        self._timezone_offsets = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, station_id, kind):
+        return os.path.join(self._directory, '{}.{}'.format(station_id, kind))
+
+    async def history(self, station_id, from_unix_timestamp, to_unix_timestamp):
+        """Transmission history of a station between two unix timestamps, as a `ColumnTable`."""
+        return await self._get(self._client.station.station_transmission_history_between, 'history', station_id,
+                               from_unix_timestamp, to_unix_timestamp)
+
+    async def events(self, station_id, from_unix_timestamp, to_unix_timestamp):
+        """Events of a station between two unix timestamps, as a `ColumnTable`."""
+        return await self._get(self._client.station.station_events_between, 'events', station_id, from_unix_timestamp,
+                               to_unix_timestamp)
+
+    async def timezone_offset(self, station_id):
+        """The offset of the dates of a station from UTC in minutes, read from its station information."""
+        if station_id not in self._timezone_offsets:
+            self._timezone_offsets[station_id] = asyncio.ensure_future(self._fetch_timezone_offset(station_id))
+        try:
+            return await self._timezone_offsets[station_id]
+        except Exception:
+            self._timezone_offsets.pop(station_id, None)
+            raise
+
+    async def _fetch_timezone_offset(self, station_id):
+        async with self._limiter:
+            return station_timezone_offset((await self._client.station.station_information(station_id)).response)
+
+    async def _get(self, method, kind, station_id, from_unix_timestamp, to_unix_timestamp):
+        path = self.path(station_id, kind)
+        if path not in self._locks:
+            self._locks[path] = asyncio.Lock()
+        async with self._locks[path]:
+            return await self._update(method, path, station_id, from_unix_timestamp, to_unix_timestamp)
+
+    async def _update(self, method, path, station_id, from_unix_timestamp, to_unix_timestamp):
+        stored = ColumnTable.load(path) if os.path.exists(path) else None
+        if stored is None:
+            (start, end) = (from_unix_timestamp, to_unix_timestamp)
+            missing = [(start, end)]
+        else:
+            # The gap between the stored and the requested range is fetched as well, to keep a single covered range.
+            (start, end) = (min(from_unix_timestamp, stored.meta['from']), max(to_unix_timestamp, stored.meta['to']))
+            missing = [(first, last) for (first, last) in ((start, stored.meta['from'] - 1),
+                                                           (stored.meta['to'] + 1, end)) if first <= last]
+        if missing:
+            records = await self._fetch(method, station_id, missing)
+            table = ColumnTable.from_records(records, timezone_offset=await self.timezone_offset(station_id))
+            if stored is not None:
+                table = stored.merge(table)
+            table.meta = {'from': start, 'to': end}
+            table.save(path)
+            stored = table
+        return stored.select(from_unix_timestamp, to_unix_timestamp)
+
+    async def _fetch(self, method, station_id, ranges):
+        windows = []
+        for (start, end) in ranges:
+            while start <= end:
+                windows.append((start, min(end, start + self._window - 1)))
+                start += self._window
+
+        async def fetch(start, end):
+            async with self._limiter:
+                response = await method(station_id, start, end)
+            return response.response or []
+
+        pages = await asyncio.gather(*[fetch(start, end) for (start, end) in windows])
+        return [record for page in pages for record in page]
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import time
+
+from fieldclimate.ratelimit import RateLimiter
+
+
+def station_fingerprint(information):
+    """Identifies a version of station metadata by the last communication date and the configuration of the station."""
+    dates = information.get('dates') or {}
+    return dates.get('last_communication'), json.dumps(information.get('config'), sort_keys=True)
+
+
+def station_timezone_offset(information):
+    """The offset from UTC, in minutes, of the local time of a station, in which the API returns its dates."""
+    return ((information or {}).get('config') or {}).get('timezone_offset') or 0
+
+
+class StationMetadata:
+    def __init__(self, information, sensors, nodes, serials, fingerprint, checked_at):
+        self.information = information
+        self.sensors = sensors
+        self.nodes = nodes
+        self.serials = serials
+        self.fingerprint = fingerprint
+        self.checked_at = checked_at
+
+
+class StationMetadataCache:
+    """Caches station information, sensors, nodes and serials.
+
+    Station information is re-read at most every `max_age` seconds; sensors, nodes and serials are fetched again only
+    when the fingerprint of the information (by default: last communication date and configuration) changes. `hits`,
+    `misses` and `hit_ratio` tell how many `get` calls were answered without re-fetching the station metadata.
+    """
+
+    def __init__(self, client, max_age=0, limiter=None, fingerprint=station_fingerprint):
+        self._client = client
+        self._max_age = max_age
+        self._limiter = limiter if limiter is not None else RateLimiter()
+        self._fingerprint = fingerprint
+        self._entries = {}
+        self._pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def client(self):
+        return self._client
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    async def _fetch(self, method, station_id):
+        async with self._limiter:
+            response = await method(station_id)
+        return response.response
+
+    async def _load(self, station_id, information=None):
+        entry = self._entries.get(station_id)
+        now = time.monotonic()
+        if information is None:
+            if entry is not None and now - entry.checked_at < self._max_age:
+                self.hits += 1
+                return entry
+            information = await self._fetch(self._client.station.station_information, station_id)
+        fingerprint = self._fingerprint(information)
+        if entry is not None and entry.fingerprint == fingerprint:
+            self.hits += 1
+            entry.information = information
+            entry.checked_at = now
+            return entry
+        self.misses += 1
+        station = self._client.station
+        (sensors, nodes, serials) = await asyncio.gather(self._fetch(station.station_sensors, station_id),
+                                                         self._fetch(station.station_nodes, station_id),
+                                                         self._fetch(station.station_serials, station_id))
+        entry = StationMetadata(information, sensors, nodes, serials, fingerprint, now)
+        self._entries[station_id] = entry
+        return entry
+
+    async def get(self, station_id, information=None):
+        """Returns the `StationMetadata` of a station.
+
+        `information` can be passed when the station information is already at hand (e.g. from
+        `list_of_user_devices`), saving the request that would read it.
+        """
+        if station_id not in self._pending:
+            self._pending[station_id] = asyncio.ensure_future(self._load(station_id, information))
+        try:
+            return await asyncio.shield(self._pending[station_id])
+        finally:
+            if station_id in self._pending and self._pending[station_id].done():
+                del self._pending[station_id]
+
+    async def warm_up(self, station_ids=None):
+        """Loads the metadata of many stations concurrently, by default of all stations of the user.
+
+        Station information returned by `list_of_user_devices` is reused, so no `station_information` requests are
+        made for these stations.
+        """
+        devices = (await self._client.user.list_of_user_devices()).response or []
+        informations = {device['name']['original']: device for device in devices}
+        if station_ids is None:
+            station_ids = list(informations)
+        await asyncio.gather(*[self.get(station_id, informations.get(station_id)) for station_id in station_ids])
+
+    def invalidate(self, station_id=None):
+        """Drops the cached metadata of a station, or of all stations."""
+        if station_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(station_id, None)
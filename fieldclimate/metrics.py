@@ -0,0 +1,34 @@
+from collections import Counter
+
+
+def percentile(values, fraction):
+    """The value below which `fraction` of `values` lie, or None if there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Metrics:
+    """Counters collected by a connection, e.g. the number of requests made or bytes received, and gauges holding its
+    current state, e.g. the concurrency limit."""
+
+    def __init__(self):
+        self.counters = Counter()
+        self.gauges = {}
+
+    def increment(self, name, value=1):
+        self.counters[name] += value
+
+    def set(self, name, value):
+        self.gauges[name] = value
+
+    def __getitem__(self, name):
+        if name in self.gauges:
+            return self.gauges[name]
+        return self.counters[name]
+
+    def snapshot(self):
+        snapshot = dict(self.counters)
+        snapshot.update(self.gauges)
+        return snapshot
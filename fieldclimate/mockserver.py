@@ -0,0 +1,435 @@
+"""A local stand-in for the FieldClimate API, for offline development and load testing.
+
+`MockServer` serves the routes used by `ApiClient` with synthetic data of configurable size, deterministic for a fixed
+`now`. It verifies HMAC signatures and OAuth2 bearer tokens, issues tokens for OAuth2 connections (see `token_uri`) and
+can inject latency, server errors and rate limiting (429 responses):
+
+    async with MockServer(credentials={public_key: private_key}, latency=0.05, rate_limit=20) as server:
+        connection = HMAC(public_key, private_key)
+        connection.api_uri = server.api_uri
+        async with connection as client:
+            ...
+
+It can also be started from the command line: `python -m fieldclimate.mockserver --port 8080`.
+"""
+import argparse
+import asyncio
+import math
+import random
+import re
+import time
+import zlib
+from collections import Counter
+
+from aiohttp import web
+from Crypto.Hash import SHA256, HMAC as HASH_HMAC
+
+from fieldclimate.resample import from_timestamp
+
+SENSOR_TYPES = [
+    (506, 'HC Air temperature', '°C', ['avg', 'max', 'min']),
+    (507, 'HC Relative humidity', '%', ['avg', 'max', 'min']),
+    (6, 'Precipitation', 'mm', ['sum']),
+    (600, 'Solar radiation', 'W/m2', ['avg']),
+    (5, 'Wind speed', 'm/s', ['avg', 'max']),
+    (4, 'Leaf Wetness', 'min', ['time']),
+]
+
+DATA_GROUP_STEPS = {
+    'raw': 300,
+    'hourly': 3600,
+    'daily': 86400,
+    'monthly': 30 * 86400,
+}
+
+PERIOD_UNITS = {
+    'h': 3600,
+    'd': 86400,
+    'w': 7 * 86400,
+    'm': 30 * 86400,
+}
+
+
+def hmac_signature(private_key, method, route, date_stamp, public_key):
+    msg = '{}/{}{}{}'.format(method, route, date_stamp, public_key).encode(encoding='utf-8')
+    return HASH_HMAC.new(private_key.encode(encoding='utf-8'), msg, SHA256).hexdigest()
+
+
+class MockServer:
+    """Serves synthetic FieldClimate data.
+
+    * `credentials` maps HMAC public keys to private keys and `tokens` lists valid OAuth2 access tokens; requests
+      with neither are rejected with 401. If both are empty and no tokens are issued, authentication is not checked.
+    * `stations` is the number of stations of the account, each having `sensors` sensors, measured every
+      `raw_interval` seconds.
+    * `latency` is the delay in seconds before every response (or a function of the route returning it),
+      `error_rate` the fraction of requests answered with 500, and `rate_limit` the number of requests per second
+      allowed per account before answering 429.
+    * `compress` enables gzip/deflate compression of responses for clients accepting it.
+    * `now` is the unix timestamp the latest data is generated for (by default the current time) and
+      `timezone_offset` the offset of the stations from UTC in minutes; like the API, dates are returned in the
+      local time of the station while the timestamps of routes are unix timestamps.
+    * `auth_codes` are the authorization codes exchanged for OAuth2 tokens at `token_uri`.
+
+    `requests` counts the requests served per route pattern.
+    """
+
+    def __init__(self, credentials=None, tokens=(), stations=10, sensors=6, raw_interval=300, latency=0,
+                 error_rate=0, rate_limit=None, compress=False, seed=0, now=None, timezone_offset=0, auth_codes=()):
+        self.credentials = dict(credentials or {})
+        self.tokens = set(tokens)
+        self.auth_codes = set(auth_codes)
+        self.now = now
+        self.timezone_offset = timezone_offset
+        self.station_ids = ['0020{:04X}'.format(i) for i in range(stations)]
+        self.sensors = sensors
+        self.raw_interval = raw_interval
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.compress = compress
+        self.requests = Counter()
+        self._random = random.Random(seed)
+        self._buckets = {}
+        self._runner = None
+        self._refresh_tokens = set()
+        self.api_uri = None
+        self.token_uri = None
+        self.app = web.Application()
+        self.app.router.add_route('*', '/v1/{route:.*}', self._handle)
+        self.app.router.add_route('POST', '/token', self._token)
+        self._routes = [(re.compile(pattern + '$'), methods, handler) for (pattern, methods, handler) in [
+            (r'user', ('GET', 'PUT', 'DELETE'), self._user),
+            (r'user/stations', ('GET',), self._user_stations),
+            (r'user/licenses', ('GET',), self._empty_list),
+            (r'system/diseases', ('GET',), self._diseases),
+            (r'system/(?:status|sensors|groups|group/sensors|types|countries|timezones)', ('GET',), self._empty_list),
+            (r'station/(?P<station>[^/]+)/sensors', ('GET', 'PUT'), self._station_sensors),
+            (r'station/(?P<station>[^/]+)/nodes', ('GET', 'PUT'), self._empty_dict),
+            (r'station/(?P<station>[^/]+)/serials', ('GET', 'PUT'), self._no_content),
+            (r'station/(?P<station>[^/]+)/proximity/(?P<radius>[^/]+)', ('GET',), self._proximity),
+            (r'station/(?P<station>[^/]+)/events/(?:last/(?P<last>\d+)|from/(?P<from>\d+)/to/(?P<to>\d+))'
+             r'(?:/(?P<sort>asc|desc))?', ('GET',), self._events),
+            (r'station/(?P<station>[^/]+)/history(?:/(?P<filter>[^/]+))?/(?:last/(?P<last>\d+)|from/(?P<from>\d+)'
+             r'/to/(?P<to>\d+))(?:/(?P<sort>asc|desc))?', ('GET',), self._history),
+            (r'station/(?P<station>[^/]+)/licenses', ('GET',), self._empty_dict),
+            (r'station/(?P<station>[^/]+)', ('GET', 'PUT'), self._station),
+            (r'station/(?P<station>[^/]+)/(?P<key>[^/]+)', ('POST', 'DELETE'), self._empty_dict),
+            (r'data/(?P<station>[^/]+)', ('GET',), self._data_dates),
+            (r'data/(?:(?P<format>optimized|normal)/)?(?P<station>[^/]+)/(?P<group>raw|hourly|daily|monthly)/'
+             r'(?:last/(?P<last>[^/]+)|from/(?P<from>\d+)(?:/to/(?P<to>\d+))?)', ('GET', 'POST'), self._data),
+            (r'disease/(?P<station>[^/]+)/(?:last/(?P<last>[^/]+)|from/(?P<from>\d+)(?:/to/(?P<to>\d+))?)',
+             ('GET', 'POST'), self._disease),
+            (r'dev/applications', ('GET',), self._applications),
+            (r'dev/users/(?P<app>[^/]+)', ('GET',), self._application_users),
+            (r'dev/stations/(?P<app>[^/]+)', ('GET',), self._user_stations),
+            (r'dev/user/(?P<user>[^/]+)/stations', ('GET',), self._dev_user_stations),
+            (r'dev/user/activate/(?P<key>[^/]+)', ('GET',), self._empty_dict),
+            (r'dev/user/(?P<app>[^/]+)/password-reset', ('POST',), self._empty_dict),
+            (r'dev/user/(?P<app>[^/]+)/password-update/(?P<key>[^/]+)', ('POST',), self._empty_dict),
+            (r'dev/user/(?P<app>[^/]+)', ('POST',), self._empty_dict),
+            (r'dev/user/(?P<user>[^/]+)/(?P<station>[^/]+)/(?P<key>[^/]+)', ('POST',), self._empty_dict),
+            (r'dev/user/(?P<user>[^/]+)/(?P<station>[^/]+)', ('DELETE',), self._empty_dict),
+            (r'forecast/(?P<station>[^/]+)/(?P<option>[^/]+)', ('GET',), self._forecast),
+            (r'chart/(?:(?P<type>[^/]+)/)?(?P<station>[^/]+)/(?P<group>raw|hourly|daily|monthly)/'
+             r'(?:last/(?P<last>[^/]+)|from/(?P<from>\d+)(?:/to/(?P<to>\d+))?)', ('GET', 'POST'), self._chart),
+            (r'camera/(?P<station>[^/]+)/photos/info', ('GET',), self._photo_dates),
+            (r'camera/(?P<station>[^/]+)/photos/last/(?P<last>\d+)(?:/(?P<camera>\d+))?', ('GET',), self._photos),
+            (r'camera/(?P<station>[^/]+)/photos(?:/from/(?P<from>\d+))?(?:/to/(?P<to>\d+))?(?:/(?P<camera>\d+))?',
+             ('GET',), self._photos_between),
+        ]]
+
+    async def start(self, host='127.0.0.1', port=0):
+        """Starts serving and returns the URI to use as `api_uri` of connections."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        port = self._runner.addresses[0][1]
+        self.api_uri = 'http://{}:{}/v1'.format(host, port)
+        self.token_uri = 'http://{}:{}/token'.format(host, port)
+        return self.api_uri
+
+    async def close(self):
+        await self._runner.cleanup()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    # Request handling
+
+    def _authenticate(self, method, route, headers):
+        """Returns the account making the request, or `None` if it is not authenticated."""
+        if not self.credentials and not self.tokens and not self.auth_codes and not self._refresh_tokens:
+            return 'anonymous'
+        authorization = headers.get('Authorization', '')
+        if authorization.startswith('hmac '):
+            (public_key, _, signature) = authorization[5:].partition(':')
+            private_key = self.credentials.get(public_key)
+            date_stamp = headers.get('Date', '')
+            if private_key is not None and signature == hmac_signature(private_key, method, route,
+                                                                       date_stamp, public_key):
+                return public_key
+        # OAuth2 connections send the header value prefixed with `Authorization: `.
+        token = authorization.split('Bearer ')[-1] if 'Bearer ' in authorization else None
+        if token is not None and token in self.tokens:
+            return token
+        return None
+
+    def _rate_limited(self, account):
+        if self.rate_limit is None:
+            return False
+        now = time.monotonic()
+        (tokens, updated) = self._buckets.get(account, (self.rate_limit, now))
+        tokens = min(self.rate_limit, tokens + (now - updated) * self.rate_limit)
+        if tokens < 1:
+            self._buckets[account] = (tokens, now)
+            return True
+        self._buckets[account] = (tokens - 1, now)
+        return False
+
+    async def respond(self, method, route, headers, body=None):
+        """Answers a request to `route` (relative to `api_uri`) with `(status, headers, response)`, `response` being
+        JSON data or None for an empty body. Used for HTTP requests and by `InProcessTransport`."""
+        for (pattern, methods, handler) in self._routes:
+            match = pattern.match(route)
+            if match is not None and method in methods:
+                break
+        else:
+            return 404, {}, {'message': 'Route not found'}
+        self.requests[pattern.pattern] += 1
+        latency = self.latency(route) if callable(self.latency) else self.latency
+        if latency:
+            await asyncio.sleep(latency)
+        account = self._authenticate(method, route, headers)
+        if account is None:
+            return 401, {}, {'message': 'Unauthorized'}
+        if self._rate_limited(account):
+            return 429, {'Retry-After': '1'}, {'message': 'Too many requests'}
+        if self.error_rate and self._random.random() < self.error_rate:
+            return 500, {}, {'message': 'Internal server error'}
+        result = handler(body=body, **match.groupdict())
+        return (204 if result is None else 200), {}, result
+
+    async def _token(self, request):
+        """Issues OAuth2 tokens for authorization codes in `auth_codes` and for refresh tokens issued before."""
+        params = await request.post()
+        if params.get('grant_type') == 'authorization_code' and params.get('code') in self.auth_codes:
+            self.auth_codes.discard(params['code'])
+        elif params.get('grant_type') != 'refresh_token' or params.get('refresh_token') not in self._refresh_tokens:
+            return web.json_response({'error': 'invalid_grant'}, status=400)
+        self._refresh_tokens.discard(params.get('refresh_token'))
+        (access_token, refresh_token) = ('{:032x}'.format(self._random.getrandbits(128)) for _ in range(2))
+        self.tokens.add(access_token)
+        self._refresh_tokens.add(refresh_token)
+        return web.json_response({'access_token': access_token, 'refresh_token': refresh_token,
+                                  'token_type': 'Bearer', 'expires_in': 3600})
+
+    async def _handle(self, request):
+        body = await request.json() if request.can_read_body else None
+        (status, headers, result) = await self.respond(request.method, request.match_info['route'], request.headers,
+                                                       body)
+        if status == 204:
+            return web.Response(status=204)
+        response = web.json_response(result, status=status, headers=headers)
+        if self.compress and status < 300:
+            response.enable_compression()
+        return response
+
+    # Synthetic data
+
+    def _station_index(self, station):
+        # A stable hash, so that other stations get the same data in every process (unlike `hash` of a string).
+        return self.station_ids.index(station) if station in self.station_ids else \
+            zlib.crc32(station.encode('utf-8')) % 1000
+
+    def _now(self):
+        return int(self.now if self.now is not None else time.time())
+
+    def _date(self, timestamp):
+        """A date as returned by the API: in the local time of the station."""
+        return from_timestamp(timestamp + self.timezone_offset * 60)
+
+    def _information(self, station):
+        index = self._station_index(station)
+        now = self._now() // self.raw_interval * self.raw_interval
+        return {
+            'name': {'original': station, 'custom': 'Station {}'.format(index)},
+            'info': {'device_name': 'iMetos 3.3'},
+            'position': {'geo': {'coordinates': [15 + index % 10 * 0.5, 50 + index // 10 * 0.5]}, 'altitude': 100},
+            'dates': {'min_date': self._date(now - 365 * 86400), 'max_date': self._date(now),
+                      'last_communication': self._date(now)},
+            'config': {'upload': {'transfer_interval': 15}, 'timezone_offset': self.timezone_offset},
+        }
+
+    def _sensor_list(self):
+        result = []
+        for i in range(self.sensors):
+            (code, name, unit, aggr) = SENSOR_TYPES[i % len(SENSOR_TYPES)]
+            result.append({'ch': i + 1, 'code': code, 'name': name, 'unit': unit, 'aggr': aggr, 'mac': 'X',
+                           'serial': 'X'})
+        return result
+
+    def _value(self, sensor, aggr, timestamp, station_index):
+        phase = 2 * math.pi * (timestamp % 86400) / 86400
+        base = {506: 15 + 8 * math.sin(phase), 507: 70 - 20 * math.sin(phase), 6: 0.2 if timestamp % 7200 == 0 else 0,
+                600: max(0.0, 800 * math.sin(phase - math.pi / 2)), 5: 2 + math.sin(phase * 3),
+                4: 5 * (1 + math.cos(phase))}[sensor['code']] + station_index * 0.01
+        return round(base + {'min': -1, 'max': 1}.get(aggr, 0), 2)
+
+    def _range(self, group, last=None, from_=None, to=None):
+        step = self.raw_interval if group == 'raw' else DATA_GROUP_STEPS.get(group, 3600)
+        end = (int(to) if to else self._now()) // step * step
+        if last is not None:
+            unit = last[-1]
+            count = int(last[:-1]) * PERIOD_UNITS[unit] // step if unit in PERIOD_UNITS else int(last)
+            start = end - (count - 1) * step
+        else:
+            start = -(-int(from_) // step) * step
+        return range(start, end + 1, step)
+
+    def _data(self, station, group, format=None, last=None, to=None, body=None, **kwargs):
+        timestamps = self._range(group, last, kwargs.get('from'), to)
+        index = self._station_index(station)
+        sensors = self._sensor_list()
+        if body and body.get('sensors'):
+            wanted = set((sensor.get('code'), sensor.get('ch')) for sensor in body['sensors'])
+            sensors = [sensor for sensor in sensors if (sensor['code'], sensor['ch']) in wanted]
+        dates = [self._date(timestamp) for timestamp in timestamps]
+        if format == 'optimized':
+            data = {}
+            for sensor in sensors:
+                tag = '{}_{}_{}_{}'.format(sensor['ch'], sensor['mac'], sensor['serial'], sensor['code'])
+                data[tag] = {'name': sensor['name'], 'unit': sensor['unit'],
+                             'aggr': {aggr: [self._value(sensor, aggr, timestamp, index) for timestamp in timestamps]
+                                      for aggr in sensor['aggr']}}
+        else:
+            data = [dict(sensor, values={aggr: [self._value(sensor, aggr, timestamp, index)
+                                                for timestamp in timestamps] for aggr in sensor['aggr']})
+                    for sensor in sensors]
+        return {'dates': dates, 'data': data}
+
+    def _data_dates(self, station, **kwargs):
+        dates = self._information(station)['dates']
+        return {'min_date': dates['min_date'], 'max_date': dates['max_date']}
+
+    def _disease(self, station, last=None, to=None, body=None, **kwargs):
+        timestamps = self._range('daily', last or None, kwargs.get('from'), to)
+        dates = [self._date(timestamp) for timestamp in timestamps]
+        if body is None:
+            return {'dates': dates, 'data': [{'name': 'ETo', 'values': [3.5] * len(dates)}]}
+        return {'dates': dates, 'data': [{'name': body.get('name', 'Model'),
+                                          'values': [round(10 * (1 + math.sin(timestamp / 86400)), 2)
+                                                     for timestamp in timestamps]}]}
+
+    def _items(self, last, from_, to, sort, item):
+        if last is not None:
+            end = self._now() // 900 * 900
+            timestamps = [end - i * 900 for i in range(int(last))]
+        else:
+            timestamps = list(range(-(-int(from_) // 900) * 900, int(to) + 1, 900))
+        timestamps.sort(reverse=sort == 'desc')
+        return [item(timestamp) for timestamp in timestamps]
+
+    def _events(self, station, last=None, to=None, sort=None, **kwargs):
+        return self._items(last, kwargs.get('from'), to, sort, lambda timestamp: {
+            'date': self._date(timestamp), 'code': 100 + timestamp // 900 % 7, 'description': 'Event'})
+
+    def _history(self, station, last=None, to=None, sort=None, **kwargs):
+        return self._items(last, kwargs.get('from'), to, sort, lambda timestamp: {
+            'date': self._date(timestamp),
+            'battery': 6500 - timestamp // 86400 % 30 * 10,
+            'solar_panel': int(max(0.0, 6000 * math.sin(2 * math.pi * (timestamp % 86400) / 86400 - math.pi / 2))),
+            'rssi': -70})
+
+    def _photos(self, station, last, camera=None, **kwargs):
+        end = self._now() // 3600 * 3600
+        return [self._photo(station, end - i * 3600, camera) for i in range(int(last))]
+
+    def _photo(self, station, timestamp, camera):
+        return {'time': self._date(timestamp), 'filename': '{}_{}.jpg'.format(station, timestamp),
+                'camera': int(camera or 1)}
+
+    def _photos_between(self, station, to=None, camera=None, **kwargs):
+        end = min(int(to), self._now()) if to else self._now()
+        start = int(kwargs.get('from') or end - 7 * 86400)
+        return [self._photo(station, timestamp, camera) for timestamp in range(-(-start // 3600) * 3600, end + 1, 3600)]
+
+    def _photo_dates(self, station, **kwargs):
+        now = self._now() // 3600 * 3600
+        return {'min_date': self._date(now - 30 * 86400), 'max_date': self._date(now)}
+
+    def _forecast(self, station, option, **kwargs):
+        start = self._now() // 86400 * 86400 + 86400
+        index = self._station_index(station)
+        timestamps = range(start, start + 7 * 86400, 86400)
+        return {'option': option, 'dates': [self._date(timestamp) for timestamp in timestamps],
+                'data': {'temperature': [round(15 + 5 * math.sin(timestamp / 86400) + index * 0.01, 2)
+                                         for timestamp in timestamps],
+                         'precipitation': [round(max(0.0, 3 * math.cos(timestamp / 43200)), 1)
+                                           for timestamp in timestamps]}}
+
+    def _chart(self, station, group, type=None, last=None, to=None, body=None, **kwargs):
+        data = self._data(station, group, None, last, to, body, **kwargs)
+        return [{'type': type or 'highchart', 'title': sensor['name'], 'unit': sensor['unit'], 'dates': data['dates'],
+                 'series': sensor['values']} for sensor in data['data']]
+
+    def _user(self, body=None, **kwargs):
+        return {'username': 'mock', 'info': {'name': 'Mock', 'lastname': 'User'}}
+
+    def _user_stations(self, body=None, **kwargs):
+        return [self._information(station) for station in self.station_ids]
+
+    def _station(self, station, body=None, **kwargs):
+        return self._information(station)
+
+    def _station_sensors(self, station, body=None, **kwargs):
+        return self._sensor_list()
+
+    def _proximity(self, station, radius, body=None):
+        return [dict(self._information(other), distance=1.0) for other in self.station_ids if other != station]
+
+    def _diseases(self, body=None, **kwargs):
+        return [{'group': 'Apple', 'models': [{'key': 'GeneralAPIs/Apple Scab'}, {'key': 'GeneralAPIs/Fire Blight'}]}]
+
+    def _applications(self, body=None, **kwargs):
+        return [{'_id': 'app'}]
+
+    def _application_users(self, app, body=None):
+        return [{'_id': 'user{}'.format(i), 'username': 'user{}'.format(i)} for i in range(len(self.station_ids))]
+
+    def _dev_user_stations(self, user, body=None):
+        index = int(user[4:]) if user[4:].isdigit() else 0
+        return [self._information(station) for station in self.station_ids[index:index + 1]]
+
+    def _empty_list(self, body=None, **kwargs):
+        return []
+
+    def _empty_dict(self, body=None, **kwargs):
+        return {}
+
+    def _no_content(self, body=None, **kwargs):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs a mock FieldClimate API server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--stations', type=int, default=10)
+    parser.add_argument('--sensors', type=int, default=6)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--rate-limit', type=float, default=None)
+    parser.add_argument('--compress', action='store_true')
+    args = parser.parse_args()
+    server = MockServer(stations=args.stations, sensors=args.sensors, latency=args.latency,
+                        error_rate=args.error_rate, rate_limit=args.rate_limit, compress=args.compress)
+    web.run_app(server.app, host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""Paginated reading of the 'last N' endpoints.
+
+Events, transmission history and photos can only be asked for as the last `amount` items or for a time period. The
+paginators below read the last page and then walk backwards in time with period requests, yielding items newest
+first, so that a long history can be consumed without one giant request:
+
+    async for event in paginate.events(client, station_id, limit=5000):
+        ...
+"""
+import time
+from collections import deque
+
+from fieldclimate.metadata import station_timezone_offset
+from fieldclimate.resample import to_timestamp
+
+
+class BackwardPaginator:
+    """Asynchronous iterator over items, newest first.
+
+    `last(amount)` reads the newest items and `between(from_unix_timestamp, to_unix_timestamp)` the items of a period;
+    both return an `ApiResponse` with a list of items, whose time is in `date_field`. Dates are in the local time of the
+    station, `timezone_offset` minutes ahead of UTC; it can also be given as a coroutine function returning it.
+
+    The page size starts at `page_size` and is doubled while pages arrive faster than half of `target_latency`
+    seconds or halved when they take longer than it, staying between `min_page_size` and `max_page_size`. The period of
+    the next request is chosen so that it holds about one page, judging by the density of the items seen so far. Only
+    the newest page of a period holding more items is queued, and the rest is asked for again with a shorter period.
+    Periods overlap by their boundary second and items seen already, told apart by their time and `key_fields`, are
+    skipped.
+
+    Iteration stops after `limit` items, at items older than the `until` timestamp, or once `max_empty_span` seconds
+    in a row contained no items.
+    """
+
+    def __init__(self, last, between, date_field='date', page_size=100, min_page_size=10, max_page_size=1000,
+                 target_latency=1.0, limit=None, until=None, max_empty_span=30 * 86400, clock=time.monotonic,
+                 key_fields=(), timezone_offset=0):
+        self._last = last
+        self._between = between
+        self._date_field = date_field
+        self._key_fields = key_fields
+        self._timezone_offset = timezone_offset
+        self.page_size = page_size
+        self._min_page_size = min_page_size
+        self._max_page_size = max_page_size
+        self._target_latency = target_latency
+        self._limit = limit
+        self._until = until
+        self._max_empty_span = max_empty_span
+        self._clock = clock
+        self._items = deque()
+        self._count = 0
+        self._done = False
+        self._newest = None
+        self._oldest = None
+        self._seen = 0
+        self._boundary = set()
+        self._to = None
+        self._span = None
+        self._empty_span = 0
+        self.pages = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._items:
+            if self._done:
+                raise StopAsyncIteration
+            await self._next_page()
+        item = self._items.popleft()
+        self._count += 1
+        if self._limit is not None and self._count >= self._limit:
+            self._done = True
+            self._items.clear()
+        return item
+
+    def _timestamp(self, item):
+        date = item[self._date_field]
+        if isinstance(date, str):
+            return to_timestamp(date) - self._timezone_offset * 60
+        return date
+
+    async def _fetch(self, request, *args):
+        started = self._clock()
+        response = await request(*args)
+        latency = self._clock() - started
+        self.pages += 1
+        if latency > self._target_latency:
+            self.page_size = max(self._min_page_size, self.page_size // 2)
+        elif latency < self._target_latency / 2:
+            self.page_size = min(self._max_page_size, self.page_size * 2)
+        return sorted(response.response or [], key=self._timestamp, reverse=True)
+
+    async def _next_page(self):
+        if callable(self._timezone_offset):
+            self._timezone_offset = await self._timezone_offset()
+        if self._oldest is None:
+            requested = self.page_size
+            items = await self._fetch(self._last, requested)
+            if len(items) < requested:
+                # There is no more history than that.
+                self._done = True
+            from_unix_timestamp = None
+            (new, capped) = self._accept(items, requested)
+        else:
+            from_unix_timestamp = self._to - self._span
+            if self._until is not None:
+                from_unix_timestamp = max(from_unix_timestamp, self._until)
+            items = await self._fetch(self._between, from_unix_timestamp, self._to)
+            (new, capped) = self._accept(items, self.page_size)
+
+        if from_unix_timestamp is not None:
+            if capped:
+                # The rest of the period is read by the next requests, with the period shrunk to about one page.
+                self._to = self._oldest
+                self._span = max(1, self._span * new // len(items))
+                return
+            if new:
+                self._empty_span = 0
+                self._to = self._oldest
+            else:
+                self._empty_span += self._to - from_unix_timestamp
+                self._to = from_unix_timestamp - 1
+                self._span *= 2
+            if self._empty_span >= self._max_empty_span or \
+                    (self._until is not None and from_unix_timestamp <= self._until):
+                self._done = True
+        if self._oldest is None:
+            self._done = True
+            return
+        if self._to is None:
+            self._to = self._oldest
+        if new:
+            self._estimate_span()
+
+    def _accept(self, items, cap):
+        """Queues the items not seen yet, at most `cap` of them, and returns how many there were and whether some
+        were left out."""
+        new = 0
+        for item in items:
+            timestamp = self._timestamp(item)
+            if self._until is not None and timestamp < self._until:
+                self._done = True
+                continue
+            key = tuple(item.get(field) for field in self._key_fields)
+            if self._oldest is not None and (timestamp > self._oldest or
+                                             (timestamp == self._oldest and key in self._boundary)):
+                continue
+            if new >= cap:
+                self._seen += new
+                return new, True
+            if self._oldest is None or timestamp < self._oldest:
+                self._oldest = timestamp
+                self._boundary = set()
+            if self._newest is None:
+                self._newest = timestamp
+            self._boundary.add(key)
+            self._items.append(item)
+            new += 1
+        self._seen += new
+        return new, False
+
+    def _estimate_span(self):
+        if self._seen > 1 and self._newest > self._oldest:
+            self._span = max(1, int(self.page_size * (self._newest - self._oldest) / (self._seen - 1)))
+        elif self._span is None:
+            self._span = 86400
+
+
+async def _timezone_offset(client, station_id):
+    return station_timezone_offset((await client.station.station_information(station_id)).response)
+
+
+def _options(client, station_id, options, key_fields):
+    # Unless given, the timezone offset is read from the station information before the first page.
+    options.setdefault('timezone_offset', lambda: _timezone_offset(client, station_id))
+    options.setdefault('key_fields', key_fields)
+    return options
+
+
+def events(client, station_id, **options):
+    """Events of a station, newest first. Options are those of `BackwardPaginator`."""
+    return BackwardPaginator(lambda amount: client.station.station_last_events(station_id, amount),
+                             lambda start, end: client.station.station_events_between(station_id, start, end),
+                             **_options(client, station_id, options, ('code', 'description')))
+
+
+def transmission_history(client, station_id, filter=None, **options):
+    """Transmission history of a station, newest first. Options are those of `BackwardPaginator`."""
+    station = client.station
+    return BackwardPaginator(lambda amount: station.station_transmission_history_last(station_id, amount, filter),
+                             lambda start, end: station.station_transmission_history_between(station_id, start, end,
+                                                                                             filter),
+                             **_options(client, station_id, options, ()))
+
+
+def photos(client, station_id, camera=None, **options):
+    """Photos of a station, newest first. Options are those of `BackwardPaginator`."""
+    cameras = client.cameras
+    return BackwardPaginator(lambda amount: cameras.get_last_photos(station_id, amount, camera),
+                             lambda start, end: cameras.get_photos_between_period(station_id, start, end, camera),
+                             date_field='time', **_options(client, station_id, options, ('filename', 'camera')))
@@ -0,0 +1,119 @@
+import heapq
+import json
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def distance_km(latitude1, longitude1, latitude2, longitude2):
+    """Great-circle distance between two points, in kilometres."""
+    (phi1, phi2) = (math.radians(latitude1), math.radians(latitude2))
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(longitude2 - longitude1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def station_coordinates(information):
+    """Returns the `(latitude, longitude)` of a station from its information, or `None` if it has no position."""
+    position = information.get('position') or {}
+    coordinates = (position.get('geo') or {}).get('coordinates')
+    if not coordinates or None in coordinates[:2]:
+        return None
+    # GeoJSON order: longitude first.
+    return coordinates[1], coordinates[0]
+
+
+class ProximityIndex:
+    """Spatial index of stations, answering radius and nearest-neighbour queries locally.
+
+    Stations are bucketed in a grid of `cell_size` degrees, so radius queries only look at nearby cells. Stations that
+    are not in the index (e.g. stations of other accounts) are looked up with `stations_in_proximity` instead.
+    """
+
+    def __init__(self, client=None, cell_size=0.5):
+        self._client = client
+        self._cell_size = cell_size
+        self._coordinates = {}
+        self._cells = {}
+
+    def _cell(self, latitude, longitude):
+        # Wrapped like the columns looked at by `within`, so that longitude 180 lands in the cell of -180.
+        return int(math.floor(latitude / self._cell_size)), self._wrap(int(math.floor(longitude / self._cell_size)))
+
+    def add(self, station_id, latitude, longitude):
+        self.remove(station_id)
+        self._coordinates[station_id] = (latitude, longitude)
+        self._cells.setdefault(self._cell(latitude, longitude), set()).add(station_id)
+
+    def remove(self, station_id):
+        coordinates = self._coordinates.pop(station_id, None)
+        if coordinates is not None:
+            cell = self._cells[self._cell(*coordinates)]
+            cell.discard(station_id)
+            if not cell:
+                del self._cells[self._cell(*coordinates)]
+
+    def __contains__(self, station_id):
+        return station_id in self._coordinates
+
+    def __len__(self):
+        return len(self._coordinates)
+
+    async def build(self):
+        """Indexes all stations of the account, using the positions returned by `list_of_user_devices`."""
+        devices = (await self._client.user.list_of_user_devices()).response or []
+        for device in devices:
+            coordinates = station_coordinates(device)
+            if coordinates is not None:
+                self.add(device['name']['original'], *coordinates)
+
+    def within(self, latitude, longitude, radius_km):
+        """Returns `(station_id, distance_km)` pairs of the stations within `radius_km` of a point, nearest first."""
+        lat_cells = int(math.ceil(math.degrees(radius_km / EARTH_RADIUS_KM) / self._cell_size))
+        cos_latitude = math.cos(math.radians(min(89.0, abs(latitude) + lat_cells * self._cell_size)))
+        lon_cells = int(math.ceil(math.degrees(radius_km / EARTH_RADIUS_KM) / max(cos_latitude, 1e-6)
+                                  / self._cell_size))
+        (row, column) = self._cell(latitude, longitude)
+        if 2 * lon_cells + 1 >= 360 / self._cell_size:
+            candidates = self._coordinates
+        else:
+            candidates = [station_id for r in range(row - lat_cells, row + lat_cells + 1)
+                          for c in range(column - lon_cells, column + lon_cells + 1)
+                          for station_id in self._cells.get((r, self._wrap(c)), ())]
+        result = []
+        for station_id in candidates:
+            distance = distance_km(latitude, longitude, *self._coordinates[station_id])
+            if distance <= radius_km:
+                result.append((station_id, distance))
+        return sorted(result, key=lambda pair: pair[1])
+
+    def _wrap(self, column):
+        columns = int(round(360 / self._cell_size))
+        return (column + columns // 2) % columns - columns // 2
+
+    def nearest(self, latitude, longitude, k):
+        """Returns `(station_id, distance_km)` pairs of the `k` stations nearest to a point, nearest first."""
+        return heapq.nsmallest(k, ((station_id, distance_km(latitude, longitude, *coordinates))
+                                   for (station_id, coordinates) in self._coordinates.items()),
+                               key=lambda pair: pair[1])
+
+    async def neighbours(self, station_id, radius_km):
+        """Returns `(station_id, distance_km)` pairs of the stations within `radius_km` of a station, excluding itself.
+
+        Stations outside the index are looked up with `stations_in_proximity`; the distances are then taken from the
+        `distance` field of the response, if present."""
+        if station_id in self._coordinates:
+            return [pair for pair in self.within(*self._coordinates[station_id], radius_km=radius_km)
+                    if pair[0] != station_id]
+        response = (await self._client.station.stations_in_proximity(station_id, radius_km)).response or []
+        return [(station['name']['original'], station.get('distance')) for station in response]
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self._coordinates, f)
+
+    def load(self, path):
+        with open(path) as f:
+            for (station_id, coordinates) in json.load(f).items():
+                self.add(station_id, *coordinates)
@@ -0,0 +1,98 @@
+from collections import OrderedDict, namedtuple
+
+from fieldclimate.metadata import StationMetadataCache
+
+# How long the sensors of a station are used before its station information is read again, when `SensorQuery`
+# creates its own cache. Sensors are rarely added, so a query does not cost an extra request every time.
+METADATA_MAX_AGE = 300
+
+SensorSelector = namedtuple('SensorSelector', ['code', 'channel', 'aggr', 'name'])
+
+
+def _supported(sensor):
+    aggr = sensor.get('aggr')
+    if isinstance(aggr, dict):
+        return list(aggr)
+    return aggr
+
+
+class SensorQuery:
+    """Builds `custom_data` bodies asking only for selected sensors and aggregations, so that the customized data
+    endpoints return a fraction of what `get_last_data` does.
+
+    Sensors are selected by code, channel, aggregations and (a part of) the name, and resolved against the sensors of
+    each station, as cached by a `StationMetadataCache`. Given an `ApiClient` instead of a cache, the query creates
+    one keeping the metadata for `METADATA_MAX_AGE` seconds:
+
+        query = SensorQuery(client).sensor(code=506, aggr='avg').sensor(code=6, aggr='sum')
+        response = await query.get_last_data(station_id, 'hourly', '7d', format='optimized')
+    """
+
+    def __init__(self, cache):
+        if not isinstance(cache, StationMetadataCache):
+            cache = StationMetadataCache(cache, max_age=METADATA_MAX_AGE)
+        self._cache = cache
+        self._selectors = []
+
+    def sensor(self, code=None, channel=None, aggr=None, name=None):
+        """Selects the sensors matching all the given criteria. `aggr` is an aggregation or a list of them; by
+        default all aggregations of the sensor are returned."""
+        if isinstance(aggr, str):
+            aggr = [aggr]
+        self._selectors.append(SensorSelector(code, channel, tuple(aggr) if aggr is not None else None, name))
+        return self
+
+    @staticmethod
+    def _matches(selector, sensor):
+        return (selector.code is None or sensor.get('code') == selector.code) and \
+               (selector.channel is None or sensor.get('ch') == selector.channel) and \
+               (selector.name is None or selector.name.lower() in (sensor.get('name') or '').lower())
+
+    def body(self, sensors):
+        """Returns the `custom_data` body for a station with the given `station_sensors`. Raises `LookupError` if a
+        selection matches no sensor, or none of the requested aggregations of a matching sensor."""
+        selected = OrderedDict()
+        for selector in self._selectors:
+            matching = [sensor for sensor in sensors or [] if self._matches(selector, sensor)]
+            if not matching:
+                raise LookupError('No sensor matches {}'.format(selector))
+            for sensor in matching:
+                supported = _supported(sensor)
+                aggr = list(selector.aggr) if selector.aggr is not None else supported
+                if selector.aggr is not None and supported is not None:
+                    aggr = [name for name in aggr if name in supported]
+                    if not aggr:
+                        raise LookupError('Sensor {} on channel {} has none of {}'.format(
+                            sensor.get('code'), sensor.get('ch'), list(selector.aggr)))
+                key = (sensor.get('code'), sensor.get('ch'))
+                item = selected.get(key)
+                if item is None:
+                    item = selected[key] = {'code': key[0], 'ch': key[1]}
+                    for field in ('mac', 'serial'):
+                        if field in sensor:
+                            item[field] = sensor[field]
+                    if aggr is not None:
+                        item['aggr'] = list(aggr)
+                elif aggr is None:
+                    # A selection of all aggregations widens the ones asked for by earlier selections.
+                    item.pop('aggr', None)
+                elif 'aggr' in item:
+                    # Selections overlapping on one sensor ask for it once, with all their aggregations.
+                    item['aggr'].extend(name for name in aggr if name not in item['aggr'])
+        return {'sensors': list(selected.values())}
+
+    async def station_body(self, station_id):
+        metadata = await self._cache.get(station_id)
+        return self.body(metadata.sensors)
+
+    async def get_last_data(self, station_id, data_group, time_period, format=None):
+        """Like `Data.get_last_data`, but only for the selected sensors."""
+        return await self._cache.client.data.get_last_data_customized(
+            station_id, data_group, time_period, await self.station_body(station_id), format)
+
+    async def get_data_between_period(self, station_id, data_group, from_unix_timestamp, to_unix_timestamp=None,
+                                      format=None):
+        """Like `Data.get_data_between_period`, but only for the selected sensors."""
+        return await self._cache.client.data.get_data_between_period_customized(
+            station_id, data_group, from_unix_timestamp, await self.station_body(station_id), to_unix_timestamp,
+            format)
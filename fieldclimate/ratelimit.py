@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+
+class RateLimiter:
+    """Limits how many requests run at once and, optionally, how many are started per second.
+
+    A single limiter can be shared by any number of coroutines, so that all of them together stay within the limits:
+
+        limiter = RateLimiter(max_concurrency=10, max_rate=20)
+        async with limiter:
+            await client.data.get_last_data(station_id, 'raw', '1')
+    """
+
+    def __init__(self, max_concurrency=10, max_rate=None):
+        self.max_concurrency = max_concurrency
+        self.max_rate = max_rate
+        self._semaphore = None
+        self._next_start = 0.0
+
+    async def acquire(self):
+        # Created lazily, so that the limiter is bound to the loop it is actually used in.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        await self._semaphore.acquire()
+        if self.max_rate:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + 1.0 / self.max_rate
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    def release(self):
+        self._semaphore.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.release()
@@ -23,3 +23,20 @@ class ResponseException(Exception):
 
 class AuthorizationException(ResponseException):
     pass
+
+
+class CircuitOpenException(Exception):
+    """Raised without making the request while the circuit breaker of its route group is open."""
+
+    def __init__(self, group, retry_after):
+        super().__init__('Circuit of {} is open, retry after {:.1f}s'.format(group, retry_after))
+        self.group = group
+        self.retry_after = retry_after
+
+
+class OverloadedException(Exception):
+    """Raised without making the request when the connection already has its maximum of outstanding requests."""
+
+    def __init__(self, outstanding):
+        super().__init__('{} requests are outstanding'.format(outstanding))
+        self.outstanding = outstanding
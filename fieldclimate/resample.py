@@ -0,0 +1,96 @@
+"""Client-side resampling of station time series.
+
+Lets you download only the finest data group (usually `raw`) and derive `hourly`, `daily` or any custom interval
+locally, instead of requesting every data group from the server.
+"""
+import calendar
+import time
+from collections import OrderedDict
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+INTERVALS = {
+    'hourly': 3600,
+    'daily': 86400,
+}
+
+
+def to_timestamp(date):
+    """Converts a date as returned by the API into a unix timestamp. Timestamps are returned unchanged."""
+    if isinstance(date, str):
+        return calendar.timegm(time.strptime(date, DATE_FORMAT))
+    return date
+
+
+def from_timestamp(timestamp):
+    return time.strftime(DATE_FORMAT, time.gmtime(timestamp))
+
+
+def _present(values):
+    return [value for value in values if value is not None]
+
+
+def _avg(values):
+    return sum(values) / len(values)
+
+
+def _last(values):
+    return values[-1]
+
+
+AGGREGATIONS = {
+    'min': min,
+    'max': max,
+    'avg': _avg,
+    'sum': sum,
+    # Durations, e.g. leaf wetness in minutes.
+    'time': sum,
+    'last': _last,
+}
+
+
+def buckets(dates, interval, offset=0):
+    """Groups dates into intervals of `interval` seconds (or `'hourly'`/`'daily'`), aligned to `offset` seconds.
+
+    Returns an `OrderedDict` mapping the start timestamp of every non-empty interval to the indices of its dates.
+    """
+    interval = INTERVALS.get(interval, interval)
+    groups = OrderedDict()
+    for (index, date) in enumerate(dates):
+        timestamp = to_timestamp(date)
+        start = (timestamp - offset) // interval * interval + offset
+        groups.setdefault(start, []).append(index)
+    return groups
+
+
+def aggregate(values, groups, aggr='avg'):
+    """Aggregates `values` within each group of indices returned by `buckets`. Groups without values give `None`."""
+    function = AGGREGATIONS.get(aggr, _last)
+    result = []
+    for indices in groups.values():
+        present = _present(values[index] for index in indices)
+        result.append(function(present) if present else None)
+    return result
+
+
+def resample(dates, values, interval, aggr='avg', offset=0):
+    """Resamples a single series. Returns the start dates of the intervals and the aggregated values."""
+    groups = buckets(dates, interval, offset)
+    return [from_timestamp(start) for start in groups], aggregate(values, groups, aggr)
+
+
+def resample_response(response, interval, offset=0):
+    """Resamples a whole response in the `optimized` format.
+
+    Every aggregation a sensor reports is aggregated with its own kind, i.e. hourly minima are the minima of the raw
+    minima, sums are summed and so on. Aggregations without a known kind keep their last value. The returned dict has
+    the same shape as the response, so it can be used in its place.
+    """
+    groups = buckets(response['dates'], interval, offset)
+    data = OrderedDict()
+    for (sensor_tag, sensor) in response['data'].items():
+        resampled = dict(sensor)
+        resampled['aggr'] = OrderedDict((aggr, aggregate(values, groups, aggr))
+                                        for (aggr, values) in sensor['aggr'].items())
+        data[sensor_tag] = resampled
+    return {'dates': [from_timestamp(start) for start in groups], 'data': data}
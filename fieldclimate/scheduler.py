@@ -0,0 +1,87 @@
+import asyncio
+from collections import OrderedDict, deque
+
+INTERACTIVE = 0
+BATCH = 1
+
+
+class _Slot:
+    def __init__(self, scheduler, priority, tenant):
+        self._scheduler = scheduler
+        self._priority = priority
+        self._tenant = tenant
+
+    async def __aenter__(self):
+        await self._scheduler.acquire(self._priority, self._tenant)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self._scheduler.release(self._priority)
+
+
+class PriorityScheduler:
+    """Runs requests of different priority classes with separate concurrency budgets.
+
+    `limits` maps every priority class to the number of its requests that may run at once, so that e.g. interactive
+    requests never queue behind a large batch job. Within a class, waiting requests of different tenants are started
+    in turn (round robin), so that one tenant with many queued requests does not starve the others.
+
+    Use it through `ApiClient.scheduled`:
+
+        scheduler = PriorityScheduler({INTERACTIVE: 8, BATCH: 2})
+        async with HMAC(public_key, private_key) as client:
+            dashboard = client.scheduled(scheduler, INTERACTIVE)
+            backfill = client.scheduled(scheduler, BATCH, tenant='customer-1')
+    """
+
+    def __init__(self, limits=None):
+        self._limits = dict(limits if limits is not None else {INTERACTIVE: 8, BATCH: 2})
+        self._running = dict((priority, 0) for priority in self._limits)
+        self._waiting = dict((priority, OrderedDict()) for priority in self._limits)
+
+    def running(self, priority):
+        return self._running[priority]
+
+    def waiting(self, priority):
+        return sum(len(waiters) for waiters in self._waiting[priority].values())
+
+    def slot(self, priority, tenant=None):
+        """Returns an asynchronous context manager holding a slot of the given priority class while inside."""
+        return _Slot(self, priority, tenant)
+
+    async def acquire(self, priority, tenant=None):
+        if self._running[priority] < self._limits[priority] and not self._waiting[priority]:
+            self._running[priority] += 1
+            return
+        waiter = asyncio.get_event_loop().create_future()
+        self._waiting[priority].setdefault(tenant, deque()).append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before the cancellation; pass it on.
+                self.release(priority)
+            else:
+                self._discard(priority, tenant, waiter)
+            raise
+
+    def _discard(self, priority, tenant, waiter):
+        waiters = self._waiting[priority].get(tenant)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del self._waiting[priority][tenant]
+
+    def release(self, priority):
+        tenants = self._waiting[priority]
+        while tenants:
+            (tenant, waiters) = tenants.popitem(last=False)
+            waiter = waiters.popleft()
+            if waiters:
+                # The tenant goes to the end of the line.
+                tenants[tenant] = waiters
+            if not waiter.done():
+                # The running count does not change: the slot passes from the releasing request to the waiter.
+                waiter.set_result(None)
+                return
+        self._running[priority] -= 1
@@ -0,0 +1,164 @@
+import array
+import asyncio
+import math
+from collections import OrderedDict
+
+from fieldclimate.metadata import station_timezone_offset
+from fieldclimate.ratelimit import RateLimiter
+from fieldclimate.resample import to_timestamp
+
+
+class Snapshot:
+    """Latest values of many stations in a table preallocated as one `array.array` of doubles, with a row per station
+    and a column per projected sensor aggregation. Missing values are NaN in `values` and None when read through the
+    methods. `times` holds the unix timestamp of the last date of every station and `value_times` that of every
+    value, which is older than the last date where the newest slot of its series is missing (0 if unknown)."""
+
+    def __init__(self, station_ids, columns):
+        self.station_ids = list(station_ids)
+        self.columns = list(columns)
+        self._rows = dict((station_id, row) for (row, station_id) in enumerate(self.station_ids))
+        self._columns = dict((column, index) for (index, column) in enumerate(self.columns))
+        self.values = array.array('d', [math.nan]) * (len(self.station_ids) * len(self.columns))
+        self.times = array.array('q', [0]) * len(self.station_ids)
+        self.value_times = array.array('q', [0]) * len(self.values)
+        self.errors = {}
+
+    def __len__(self):
+        return len(self.station_ids)
+
+    def _index(self, station_id, column):
+        return self._rows[station_id] * len(self.columns) + self._columns[column]
+
+    def set(self, station_id, column, value, timestamp=0):
+        index = self._index(station_id, column)
+        self.values[index] = math.nan if value is None else value
+        self.value_times[index] = timestamp
+
+    def set_time(self, station_id, timestamp):
+        self.times[self._rows[station_id]] = timestamp
+
+    def value(self, station_id, column):
+        value = self.values[self._index(station_id, column)]
+        return None if math.isnan(value) else value
+
+    def time(self, station_id, column):
+        """The unix timestamp of a value, or None if it is missing or its date is unknown."""
+        return self.value_times[self._index(station_id, column)] or None
+
+    def row(self, station_id):
+        return OrderedDict((column, self.value(station_id, column)) for column in self.columns)
+
+    def column(self, column):
+        return [self.value(station_id, column) for station_id in self.station_ids]
+
+
+def _sensor_key(item, sensor):
+    """Code and channel of a sensor of a data response, either listed with them or keyed by its tag
+    (CHANNEL_MAC_SERIAL_CODE) in the `optimized` format."""
+    if 'code' in sensor:
+        return sensor['code'], sensor.get('ch')
+    parts = str(item).split('_')
+    try:
+        return int(parts[-1]), int(parts[0])
+    except ValueError:
+        return None, None
+
+
+def _latest(values):
+    """The position and value of the last value that is not missing, or `(None, None)`."""
+    values = values or []
+    for position in range(len(values) - 1, -1, -1):
+        if values[position] is not None:
+            return position, values[position]
+    return None, None
+
+
+class SnapshotCollector:
+    """Builds a `Snapshot` of the current conditions at many stations from their last data.
+
+    `projection` maps column names to `(code, aggr)` or `(code, aggr, channel)` of the sensor aggregation to keep; of
+    every response only these latest values are extracted, as it is being received, and the rest is dropped, so
+    memory use does not grow with the size of the responses. The dates of the responses, in the local time of the
+    stations, are converted to unix timestamps with the timezone offset from the station information:
+
+        collector = SnapshotCollector(client, {'temperature': (506, 'avg'), 'rain': (6, 'sum')})
+        snapshot = await collector.collect(station_ids)
+        print(snapshot.row(station_ids[0]))
+    """
+
+    def __init__(self, client, projection, limiter=None, data_group='raw', time_period='1', stream=True):
+        self._client = client
+        self._projection = OrderedDict(projection)
+        self._limiter = limiter if limiter is not None else RateLimiter()
+        self._data_group = data_group
+        self._time_period = time_period
+        self._stream = stream
+        # Futures of the timezone offsets of stations, so that each is fetched once.
+        self._timezone_offsets = {}
+        self._lookup = {}
+        for (column, selection) in self._projection.items():
+            (code, aggr) = selection[:2]
+            channel = selection[2] if len(selection) > 2 else None
+            self._lookup.setdefault(code, []).append((channel, aggr, column))
+
+    async def collect(self, station_ids):
+        """Fetches the last data of every station and returns the `Snapshot`. Stations whose request failed keep
+        missing values and have their exception in `errors`."""
+        snapshot = Snapshot(station_ids, self._projection)
+
+        async def fetch(station_id):
+            try:
+                async with self._limiter:
+                    await self._fetch(snapshot, station_id)
+            except Exception as e:
+                snapshot.errors[station_id] = e
+
+        await asyncio.gather(*[fetch(station_id) for station_id in snapshot.station_ids])
+        return snapshot
+
+    async def timezone_offset(self, station_id):
+        """The offset of the dates of a station from UTC in minutes, read from its station information."""
+        if station_id not in self._timezone_offsets:
+            self._timezone_offsets[station_id] = asyncio.ensure_future(self._fetch_timezone_offset(station_id))
+        try:
+            return await self._timezone_offsets[station_id]
+        except Exception:
+            self._timezone_offsets.pop(station_id, None)
+            raise
+
+    async def _fetch_timezone_offset(self, station_id):
+        return station_timezone_offset((await self._client.station.station_information(station_id)).response)
+
+    async def _fetch(self, snapshot, station_id):
+        data = self._client.data
+        # The timestamps of the response, to date the values picked from the series.
+        timestamps = []
+        offset = await self.timezone_offset(station_id) * 60
+        if self._stream:
+            async with await data.stream_last_data(station_id, self._data_group, self._time_period,
+                                                   'optimized') as events:
+                async for (key, item, value) in events:
+                    self._extract(snapshot, station_id, timestamps, offset, key, item, value)
+        else:
+            response = (await data.get_last_data(station_id, self._data_group, self._time_period,
+                                                 'optimized')).response or {}
+            self._extract(snapshot, station_id, timestamps, offset, 'dates', None, response.get('dates'))
+            sensors = response.get('data') or {}
+            for (item, sensor) in (sensors.items() if isinstance(sensors, dict) else enumerate(sensors)):
+                self._extract(snapshot, station_id, timestamps, offset, 'data', item, sensor)
+
+    def _extract(self, snapshot, station_id, timestamps, offset, key, item, value):
+        if key == 'dates':
+            if value:
+                timestamps.extend(to_timestamp(date) - offset for date in value)
+                snapshot.set_time(station_id, timestamps[-1])
+        elif key == 'data' and isinstance(value, dict):
+            (code, channel) = _sensor_key(item, value)
+            aggregations = value.get('aggr', value.get('values')) or {}
+            for (wanted_channel, aggr, column) in self._lookup.get(code, ()):
+                if (wanted_channel is None or wanted_channel == channel) and aggr in aggregations:
+                    (position, latest) = _latest(aggregations[aggr])
+                    if latest is not None:
+                        snapshot.set(station_id, column, latest,
+                                     timestamps[position] if position < len(timestamps) else 0)
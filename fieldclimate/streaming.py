@@ -0,0 +1,258 @@
+"""Incremental parsing of large JSON responses.
+
+`JsonObjectParser` consumes the body of a response chunk by chunk and emits the members of its top-level object as
+soon as they are complete. Members listed in `split` (by default `data`, which holds the sensors of data responses)
+are not emitted whole, but element by element, so that only one sensor series has to be held in memory at a time.
+"""
+import codecs
+import json
+import re
+from collections import deque
+
+from fieldclimate.connection.compression import CHUNK_SIZE
+
+_WHITESPACE = ' \t\r\n'
+_SCALAR_END = re.compile(r'[,}\]\s]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_STRUCTURE = re.compile(r'["{}\[\]]')
+_INCOMPLETE = object()
+
+
+class JsonObjectParser:
+    """Emits `(key, item, value)` events for the members of a JSON object fed to it in chunks.
+
+    For members split into elements, `item` is the key (for objects) or index (for arrays) of every element and
+    `value` is the element. For other members, `item` is `None` and `value` is the whole member.
+    """
+
+    def __init__(self, split=('data',)):
+        self._split = frozenset(split)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._state = 'start'
+        self._key = None
+        self._container = None
+        self._item = None
+        self._scan = None
+
+    def feed(self, chunk):
+        """Parses a chunk of the body and returns the list of events completed by it."""
+        self._buffer += self._decoder.decode(chunk)
+        return self._parse(False)
+
+    def close(self):
+        """Finishes parsing and returns the remaining events. Raises `ValueError` if the body is incomplete."""
+        self._buffer += self._decoder.decode(b'', True)
+        events = self._parse(True)
+        if self._state != 'end':
+            raise ValueError('Incomplete JSON object')
+        return events
+
+    def _expect(self, char, state):
+        if self._buffer[self._pos] != char:
+            raise ValueError('Expected {!r} at {!r}'.format(char, self._buffer[self._pos:self._pos + 20]))
+        self._pos += 1
+        self._state = state
+
+    def _parse(self, final):
+        events = []
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos >= len(self._buffer):
+                break
+            char = self._buffer[self._pos]
+            state = self._state
+            if state == 'start':
+                self._expect('{', 'key')
+            elif state in ('key', 'item_key') and char == '}':
+                self._pos += 1
+                self._state = 'end' if state == 'key' else 'next'
+            elif state in ('key', 'item_key'):
+                key = self._read_value(final)
+                if key is _INCOMPLETE:
+                    break
+                if state == 'key':
+                    self._key = key
+                else:
+                    self._item = key
+                self._state = 'colon' if state == 'key' else 'item_colon'
+            elif state == 'colon':
+                self._expect(':', 'value')
+            elif state == 'item_colon':
+                self._expect(':', 'item')
+            elif state == 'value' and self._key in self._split and char in '{[':
+                self._pos += 1
+                self._container = '}' if char == '{' else ']'
+                self._item = 0
+                self._state = 'item_key' if char == '{' else 'item'
+            elif state == 'value':
+                value = self._read_value(final)
+                if value is _INCOMPLETE:
+                    break
+                events.append((self._key, None, value))
+                self._state = 'next'
+            elif state == 'item' and char == ']' and self._container == ']':
+                self._pos += 1
+                self._state = 'next'
+            elif state == 'item':
+                value = self._read_value(final)
+                if value is _INCOMPLETE:
+                    break
+                events.append((self._key, self._item, value))
+                self._state = 'item_next'
+            elif state == 'item_next' and char == self._container:
+                self._pos += 1
+                self._state = 'next'
+            elif state == 'item_next':
+                self._expect(',', 'item_key' if self._container == '}' else 'item')
+                if self._container == ']':
+                    self._item += 1
+            elif state == 'next' and char == '}':
+                self._pos += 1
+                self._state = 'end'
+            elif state == 'next':
+                self._expect(',', 'key')
+            else:
+                raise ValueError('Unexpected data after the end of the JSON object')
+        # Everything before the current position has been consumed.
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
+        return events
+
+    def _read_value(self, final):
+        """Parses the JSON value starting at the current position, or returns `_INCOMPLETE` if it has not been fully
+        received yet. The scan for the end of the value is resumed where it stopped when more data arrives."""
+        buffer = self._buffer
+        start = self._pos
+        (offset, depth, in_string) = self._scan or (0, 0, False)
+        i = start + offset
+        end = None
+        if buffer[start] not in '{["':
+            match = _SCALAR_END.search(buffer, i)
+            if match is not None:
+                end = match.start()
+            elif final:
+                end = len(buffer)
+            else:
+                i = len(buffer)
+        else:
+            while end is None:
+                match = (_STRING_SPECIAL if in_string else _STRUCTURE).search(buffer, i)
+                if match is None:
+                    i = max(i, len(buffer))
+                    break
+                char = match.group()
+                # Skips the escaped character too, even if it has not been received yet.
+                i = match.end() + 1 if char == '\\' else match.end()
+                if char == '"':
+                    in_string = not in_string
+                    if not in_string and depth == 0:
+                        end = i
+                elif char in '{[':
+                    depth += 1
+                elif char in '}]':
+                    depth -= 1
+                    if depth == 0:
+                        end = i
+        if end is None:
+            self._scan = (i - start, depth, in_string)
+            return _INCOMPLETE
+        self._scan = None
+        self._pos = end
+        return json.loads(buffer[start:end])
+
+
+class ResponseStream:
+    """Asynchronous iterator over the events of a response body, parsed while it is being received:
+
+        async with await client.data.stream_data_between_period(station_id, 'raw', from_unix_timestamp) as stream:
+            async for (key, sensor_tag, sensor) in stream:
+                ...
+
+    The response is released once the body has been read. A stream left before that has to be closed, with
+    `async with` or `aclose()`, so that the connection and the permits held for the request are given back.
+    """
+
+    def __init__(self, result, parser, decompressor=None, metrics=None):
+        # `metrics` counts the sizes before and after decompression and is required with a `decompressor`.
+        self._result = result
+        self._parser = parser
+        self._decompressor = decompressor
+        self._metrics = metrics
+        self._chunks = result.content.iter_chunked(CHUNK_SIZE)
+        self._events = deque()
+        self._done = False
+        self._closed = False
+        self._close_callbacks = []
+        self._first_chunk_callbacks = []
+
+    def add_close_callback(self, callback):
+        """Awaits `callback(exc_type, exc_value)` once the body has been read, reading it failed or the stream was
+        closed. Callbacks are called in reverse order of adding them."""
+        self._close_callbacks.append(callback)
+
+    def add_first_chunk_callback(self, callback):
+        """Calls `callback()` once the first chunk of the body has arrived, or the body turned out to be empty."""
+        self._first_chunk_callbacks.append(callback)
+
+    async def aclose(self):
+        """Releases the response, also if the body has not been read completely, and ends the iteration."""
+        self._events.clear()
+        await self._close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._events:
+            if self._done:
+                raise StopAsyncIteration
+            try:
+                await self._read()
+            except BaseException as e:
+                await self._close(type(e), e)
+                raise
+        return self._events.popleft()
+
+    async def _read(self):
+        try:
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            self._first_chunk()
+            self._done = True
+            tail = self._decompressor.flush() if self._decompressor is not None else b''
+            self._events.extend(self._parser.feed(tail))
+            self._events.extend(self._parser.close())
+            await self._close()
+            return
+        self._first_chunk()
+        if self._decompressor is not None:
+            self._metrics.increment('bytes_compressed', len(chunk))
+            chunk = self._decompressor.decompress(chunk)
+            self._metrics.increment('bytes_decompressed', len(chunk))
+        self._events.extend(self._parser.feed(chunk))
+
+    def _first_chunk(self):
+        (callbacks, self._first_chunk_callbacks) = (self._first_chunk_callbacks, [])
+        for callback in callbacks:
+            callback()
+
+    async def _close(self, exc_type=None, exc_value=None):
+        if self._closed:
+            return
+        self._closed = True
+        self._done = True
+        if hasattr(self._result, 'aclose'):
+            await self._result.aclose()
+        else:
+            self._result.release()
+        for callback in reversed(self._close_callbacks):
+            await callback(exc_type, exc_value)
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+
+from fieldclimate.api import ApiClient
+
+
+class _SyncRoute:
+    def __init__(self, facade, route, wait):
+        self._facade = facade
+        self._route = route
+        self._wait = wait
+
+    def __getattr__(self, name):
+        method = getattr(self._route, name)
+
+        def call(*args, **kwargs):
+            future = self._facade.submit(method(*args, **kwargs))
+            return future.result() if self._wait else future
+
+        return call
+
+
+class _Routes:
+    def __init__(self, facade, wait):
+        self._facade = facade
+        self._wait = wait
+
+    def __getattr__(self, name):
+        route = getattr(self._facade.client, name)
+        if not isinstance(route, ApiClient.ClientRoute):
+            raise AttributeError(name)
+        return _SyncRoute(self._facade, route, self._wait)
+
+
+class SyncApiClient:
+    """Synchronous facade over `ApiClient`.
+
+    One event loop runs in a background thread for the whole lifetime of the facade, together with one connection and
+    its pooled client session. Route methods can be called from any thread; they block until the response arrives,
+    or, when accessed through `futures`, return a `concurrent.futures.Future` right away, so that many calls can be
+    issued concurrently:
+
+        with SyncApiClient(HMAC(public_key, private_key)) as client:
+            print(client.user.user_information().response['username'])
+            futures = [client.futures.data.get_last_data(station_id, 'raw', '1') for station_id in station_ids]
+            responses = [future.result() for future in futures]
+
+    Do not call the facade from coroutines running in its own loop, as they would wait for themselves.
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name='fieldclimate-loop', daemon=True)
+        self._thread.start()
+        self.client = self.run(connection.__aenter__())
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def submit(self, coroutine):
+        """Schedules a coroutine in the background loop and returns a `concurrent.futures.Future` of its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def run(self, coroutine):
+        """Runs a coroutine in the background loop and waits for its result."""
+        return self.submit(coroutine).result()
+
+    @property
+    def futures(self):
+        return _Routes(self, False)
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name == 'client':
+            raise AttributeError(name)
+        return getattr(_Routes(self, True), name)
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        try:
+            self.run(self._connection.__aexit__(None, None, None))
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,169 @@
+"""Tracing of API calls, for finding out where the time of a slow job goes.
+
+A client returned by `ApiClient.traced(tracer)` records a span for every call and, nested in it, spans for the
+stages of the request (`_make_request`, `sign`, `http`, `decode`...). Spans are kept per asyncio task, so concurrent
+calls do not get mixed up, and your own code can add spans as well:
+
+    tracer = Tracer()
+    traced = client.traced(tracer)
+    with tracer.span('job'):
+        response = await traced.data.get_last_data(station_id, 'raw', '1d')
+        with tracer.span('process'):
+            ...
+    tracer.save_chrome_trace('job.json')        # open in chrome://tracing or Perfetto
+    tracer.save_collapsed_stacks('job.folded')  # feed to flamegraph.pl or speedscope
+"""
+import asyncio
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+
+# Stacks of open spans per task (None outside of tasks); an entry is removed when its stack becomes empty.
+_stacks = {}
+
+
+def _current_task():
+    try:
+        if hasattr(asyncio, 'current_task'):
+            return asyncio.current_task()
+        return asyncio.Task.current_task()
+    except RuntimeError:
+        # No running event loop.
+        return None
+
+
+def route_name(method, route):
+    """Names a call by its method and route, with path segments holding ids or amounts replaced by `{}`, so that
+    calls to the same endpoint share a name."""
+    return '{} {}'.format(method, '/'.join('{}' if re.search(r'\d', segment) else segment
+                                           for segment in route.split('/')))
+
+
+class Span:
+    def __init__(self, name, category, parent, task_id, start):
+        self.name = name
+        self.category = category
+        self.parent = parent
+        # `id` of the task the span ran in (None outside of tasks); finished spans must not keep the task, and with
+        # it its result, alive.
+        self.task_id = task_id
+        self.start = start
+        self.end = None
+        # Time spent in child spans, which is not part of the span's own time.
+        self.children_duration = 0.0
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    @property
+    def stack(self):
+        names = []
+        span = self
+        while span is not None:
+            names.append(span.name)
+            span = span.parent
+        return tuple(reversed(names))
+
+
+class _SpanContext:
+    def __init__(self, tracer, name, category):
+        self._tracer = tracer
+        self._name = name
+        self._category = category
+        self._span = None
+        self._task = None
+
+    def __enter__(self):
+        task = self._task = _current_task()
+        stack = _stacks.setdefault(task, [])
+        parent = next((context for context in reversed(stack) if context.tracer is self._tracer), None)
+        self._span = Span(self._name, self._category, parent.span if parent is not None else None,
+                          id(task) if task is not None else None, self._tracer.clock())
+        stack.append(self)
+        return self._span
+
+    @property
+    def tracer(self):
+        return self._tracer
+
+    @property
+    def span(self):
+        return self._span
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        span = self._span
+        span.end = self._tracer.clock()
+        if span.parent is not None:
+            span.parent.children_duration += span.duration
+        stack = _stacks[self._task]
+        stack.remove(self)
+        if not stack:
+            del _stacks[self._task]
+        self._task = None
+        self._tracer.spans.append(span)
+
+
+class _NoSpan:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name, category='client'):
+    """Context manager recording a span in the tracer of the innermost open span of the current task. Does nothing
+    if no span is open, i.e. outside of traced calls."""
+    stack = _stacks.get(_current_task())
+    if not stack:
+        return _NO_SPAN
+    return stack[-1].tracer.span(name, category)
+
+
+class Tracer:
+    """Collects finished spans, timed by `clock` (in seconds)."""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.spans = []
+
+    def span(self, name, category='user'):
+        """Context manager recording a span, nested in the current span of this tracer in the current task."""
+        return _SpanContext(self, name, category)
+
+    def clear(self):
+        self.spans = []
+
+    def chrome_trace(self):
+        """Returns the spans in the Chrome trace event format, with every asyncio task as a separate thread."""
+        threads = OrderedDict()
+        events = []
+        for span in sorted(self.spans, key=lambda span: span.start):
+            thread = threads.setdefault(span.task_id, len(threads) + 1)
+            events.append({'name': span.name, 'cat': span.category, 'ph': 'X', 'pid': os.getpid(), 'tid': thread,
+                           'ts': round(span.start * 1e6, 3), 'dur': round(span.duration * 1e6, 3)})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+    def collapsed_stacks(self):
+        """Returns the own time of every stack of spans in the collapsed format of flame graph tools: one line per
+        stack, its span names joined by ';' followed by the time in microseconds."""
+        totals = OrderedDict()
+        for span in self.spans:
+            stack = ';'.join(span.stack)
+            totals[stack] = totals.get(stack, 0.0) + span.duration - span.children_duration
+        return ['{} {}'.format(stack, int(round(total * 1e6))) for (stack, total) in sorted(totals.items())]
+
+    def save_collapsed_stacks(self, path):
+        with open(path, 'w') as f:
+            for line in self.collapsed_stacks():
+                f.write(line + '\n')
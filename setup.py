@@ -7,7 +7,9 @@ setup(
     name='fieldclimate',
     version='1.1',
     install_requires=required,
+    extras_require={'httpx': ['httpx'], 'http2': ['httpx[http2]']},
     packages=find_packages(exclude=["*.tests", "*.tests.*", "tests.*", "tests"]),
     url='https://github.com/SatAgro/fieldclimate',
     description='A Python client for the Pessl Instruments GmbH RESTful API.',
+    entry_points={'console_scripts': ['fieldclimate=fieldclimate.cli:main']},
 )
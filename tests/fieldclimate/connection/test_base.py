@@ -24,3 +24,76 @@ class TestOneSession(unittest.TestCase):
                                  'https://api.fieldclimate.com/v1/user/stations')
 
         asyncio.get_event_loop().run_until_complete(actual_test())
+
+
+class ScriptedSession:
+    """Returns prepared responses in order and records the headers of every request."""
+
+    class ScriptedResponse:
+        def __init__(self, status, body, headers):
+            self.status = status
+            self.body = body
+            self.headers = headers
+            self.released = False
+
+        async def json(self, content_type=None):
+            return self.body
+
+        def release(self):
+            self.released = True
+
+    def __init__(self, *responses):
+        self.responses = [ScriptedSession.ScriptedResponse(*response) for response in responses]
+        self.requests = []
+
+    async def request(self, method, url, json=None, headers=None):
+        self.requests.append((method, url, dict(headers)))
+        return self.responses[len(self.requests) - 1]
+
+
+class TestConditionalRequests(unittest.TestCase):
+    def run_async(self, coroutine):
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    def test_not_modified_returns_cached_response(self):
+        session = ScriptedSession((200, {'username': 'foo'}, {'ETag': '"v1"', 'Last-Modified': 'Sat, 01 Dec 2018'}),
+                                  (304, None, {}))
+        client = MockConnection().enable_conditional_requests().with_client_session(session)
+        first = self.run_async(client.user.user_information())
+        second = self.run_async(client.user.user_information())
+        self.assertEqual(first.response, {'username': 'foo'})
+        self.assertEqual((second.code, second.response), (200, {'username': 'foo'}))
+        self.assertEqual(session.requests[0][2], {'Accept': 'application/json'})
+        self.assertEqual(session.requests[1][2], {'Accept': 'application/json', 'If-None-Match': '"v1"',
+                                                  'If-Modified-Since': 'Sat, 01 Dec 2018'})
+        self.assertTrue(session.responses[1].released)
+
+    def test_modified_response_replaces_cached_one(self):
+        session = ScriptedSession((200, 1, {'ETag': '"v1"'}), (200, 2, {'ETag': '"v2"'}), (304, None, {}))
+        client = MockConnection().enable_conditional_requests().with_client_session(session)
+        responses = [self.run_async(client.user.user_information()).response for _ in range(3)]
+        self.assertEqual(responses, [1, 2, 2])
+        self.assertEqual(session.requests[2][2]['If-None-Match'], '"v2"')
+
+    def test_only_get_requests_are_conditional(self):
+        session = ScriptedSession((200, 1, {'ETag': '"v1"'}), (200, 2, {'ETag': '"v2"'}))
+        client = MockConnection().enable_conditional_requests().with_client_session(session)
+        self.run_async(client.user.update_user_information({}))
+        self.run_async(client.user.update_user_information({}))
+        self.assertNotIn('If-None-Match', session.requests[1][2])
+
+    def test_disabled_by_default(self):
+        session = ScriptedSession((200, 1, {'ETag': '"v1"'}), (200, 1, {'ETag': '"v1"'}))
+        client = MockConnection().with_client_session(session)
+        self.run_async(client.user.user_information())
+        self.run_async(client.user.user_information())
+        self.assertEqual(session.requests[1][2], {'Accept': 'application/json'})
+
+    def test_cache_is_bounded(self):
+        session = ScriptedSession(*[(200, i, {'ETag': str(i)}) for i in range(3)])
+        connection = MockConnection().enable_conditional_requests(max_entries=2)
+        client = connection.with_client_session(session)
+        for station_id in ['a', 'b', 'c']:
+            self.run_async(client.station.station_information(station_id))
+        self.assertEqual(len(connection._validators), 2)
+        self.assertIsNone(connection._validators.get('station/a'))
@@ -0,0 +1,126 @@
+import asyncio
+import unittest
+
+from fieldclimate.connection.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from fieldclimate.reqresp import CircuitOpenException, OverloadedException, ResponseException
+from tests.fieldclimate.connection.test_base import ScriptedSession
+from tests.fieldclimate.test_api import MockConnection
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker('data', failure_ratio=0.5, window=4, min_calls=4, reset_timeout=10,
+                                      clock=self.clock)
+
+    def call(self, failed, duration=0.0):
+        probe = self.breaker.before_call()
+        self.breaker.after_call(probe, failed, duration)
+
+    def test_opens_on_failure_ratio(self):
+        for failed in (False, True, False):
+            self.call(failed)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.call(True)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.clock.now = 4
+        with self.assertRaises(CircuitOpenException) as context:
+            self.breaker.before_call()
+        self.assertEqual(context.exception.group, 'data')
+        self.assertEqual(context.exception.retry_after, 6)
+
+    def test_slow_calls_count_as_failures(self):
+        self.breaker.slow_call_duration = 1.0
+        for duration in (0.1, 2.0, 0.1, 3.0):
+            self.call(False, duration)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_half_open_lets_one_probe_through(self):
+        for _ in range(4):
+            self.call(True)
+        self.clock.now = 10
+        self.assertTrue(self.breaker.before_call())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        with self.assertRaises(CircuitOpenException):
+            self.breaker.before_call()
+        self.breaker.after_call(True, True, 0)
+        self.assertEqual(self.breaker.state, OPEN)
+
+        self.clock.now = 20
+        self.call(False)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertFalse(self.breaker.before_call())
+
+    def test_cancelled_probe_frees_the_half_open_circuit(self):
+        for _ in range(4):
+            self.call(True)
+        self.clock.now = 10
+        self.breaker.cancelled(self.breaker.before_call())
+        self.assertTrue(self.breaker.before_call())
+
+
+class TestLoadShedding(unittest.TestCase):
+    def run_async(self, coroutine):
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    def test_open_circuit_fails_fast_per_group(self):
+        session = ScriptedSession(*([(503, None, {})] * 2 + [(200, {'username': 'foo'}, {})]))
+        connection = MockConnection().enable_circuit_breakers(min_calls=2, window=2)
+        client = connection.with_client_session(session)
+
+        async def actual_test():
+            for _ in range(2):
+                with self.assertRaises(ResponseException):
+                    await client.data.get_last_data('00000146', 'raw', '1')
+            with self.assertRaises(CircuitOpenException):
+                await client.data.get_data_between_period('00000146', 'raw', 0, 1)
+            return await client.user.user_information()
+
+        self.assertEqual(self.run_async(actual_test()).response, {'username': 'foo'})
+        self.assertEqual(len(session.requests), 3)
+        self.assertEqual(connection.metrics['rejected_open_circuit'], 1)
+
+    def test_client_errors_do_not_open_the_circuit(self):
+        session = ScriptedSession(*([(404, None, {})] * 3))
+        connection = MockConnection().enable_circuit_breakers(min_calls=2, window=2)
+        client = connection.with_client_session(session)
+
+        async def actual_test():
+            for _ in range(3):
+                with self.assertRaises(ResponseException):
+                    await client.station.station_information('00000146')
+
+        self.run_async(actual_test())
+        self.assertEqual(len(session.requests), 3)
+
+    def test_outstanding_requests_are_capped(self):
+        release = asyncio.Event()
+
+        class SlowSession(ScriptedSession):
+            async def request(self, method, url, json=None, headers=None):
+                await release.wait()
+                return await super().request(method, url, json, headers)
+
+        session = SlowSession(*([(200, {}, {})] * 2))
+        connection = MockConnection().limit_outstanding_requests(2)
+        client = connection.with_client_session(session)
+
+        async def actual_test():
+            running = [asyncio.ensure_future(client.user.user_information()) for _ in range(2)]
+            await asyncio.sleep(0)
+            with self.assertRaises(OverloadedException):
+                await client.user.user_information()
+            release.set()
+            await asyncio.gather(*running)
+            self.assertEqual(connection._load_guard.outstanding, 0)
+
+        self.run_async(actual_test())
+        self.assertEqual(connection.metrics['rejected_overload'], 1)
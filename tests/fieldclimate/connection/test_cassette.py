@@ -0,0 +1,112 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+
+from fieldclimate.connection.cassette import ReplayConnection, read_cassette
+from fieldclimate.connection.hmac import HMAC
+from fieldclimate.connection.transport import InProcessTransport
+from fieldclimate.mockserver import MockServer
+from fieldclimate.reqresp import ResponseException
+
+
+class TestCassette(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'traffic.cassette')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_async(self, coroutine):
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    def record(self, compression=False, **kwargs):
+        async def actual_test():
+            async with MockServer(credentials={'public': 'private'}, compress=compression, **kwargs) as server:
+                connection = HMAC('public', 'private').enable_recording(self.path)
+                if compression:
+                    connection.enable_compression()
+                connection.api_uri = server.api_uri
+                async with connection as client:
+                    first = await client.user.user_information()
+                    data = await client.data.get_data_between_period('00200000', 'hourly', 1543622400, 1543708800)
+                    try:
+                        await client.station.station_information('missing/route')
+                    except ResponseException:
+                        pass
+                    return first, data
+
+        return self.run_async(actual_test())
+
+    def test_record_and_replay(self):
+        (user, data) = self.record(latency=0.02)
+        records = read_cassette(self.path)
+        self.assertEqual([(record['method'], record['route'], record['status']) for record in records], [
+            ('GET', 'user', 200),
+            ('GET', 'data/00200000/hourly/from/1543622400/to/1543708800', 200),
+            ('GET', 'station/missing/route', 404),
+        ])
+        self.assertGreaterEqual(records[0]['duration'], 0.02)
+        self.assertGreater(records[1]['size'], records[0]['size'])
+
+        async def replay(timing):
+            async with ReplayConnection(self.path, timing) as client:
+                loop = asyncio.get_event_loop()
+                start = loop.time()
+                replayed_data = await client.data.get_data_between_period('00200000', 'hourly', 1543622400,
+                                                                          1543708800)
+                replayed_user = await client.user.user_information()
+                with self.assertRaises(ResponseException) as context:
+                    await client.station.station_information('missing/route')
+                self.assertEqual(context.exception.code, 404)
+                return replayed_user, replayed_data, loop.time() - start
+
+        (replayed_user, replayed_data, elapsed) = self.run_async(replay(None))
+        self.assertEqual(replayed_user.response, user.response)
+        self.assertEqual(replayed_data.response, data.response)
+        self.assertLess(elapsed, 0.02)
+        self.assertGreaterEqual(self.run_async(replay(1.0))[2], 0.04)
+
+    def test_credentials_are_redacted(self):
+        server = MockServer(credentials={'public': 'private'})
+        for redact in (True, False):
+            connection = HMAC('public', 'private').enable_recording(self.path, redact=redact)
+            client = connection.with_client_session(InProcessTransport(server.respond))
+            self.run_async(client.user.update_user_information({'info': {'name': 'Jane'}, 'password': 'secret'}))
+            self.run_async(client.dev.setting_new_password('app', 'key', {'password': 'secret'}))
+            # Clients made with `with_client_session` are not left with `async with`.
+            connection.stop_recording()
+            records = read_cassette(self.path)
+            self.assertEqual(len(records), 2)
+            self.assertEqual(records[0]['data']['info'], {'name': 'Jane'})
+            if redact:
+                self.assertEqual([record['data']['password'] for record in records], ['REDACTED'] * 2)
+                self.assertEqual(records[0]['request_headers']['Authorization'], 'REDACTED')
+                self.assertEqual(records[0]['request_headers']['Date'], 'REDACTED')
+            else:
+                self.assertEqual(records[0]['data']['password'], 'secret')
+                self.assertTrue(records[0]['request_headers']['Authorization'].startswith('hmac public:'))
+
+    def test_compressed_bodies_are_recorded_raw(self):
+        (_, data) = self.record(compression=True)
+        records = read_cassette(self.path)
+        self.assertIn(records[1]['headers']['Content-Encoding'], ('gzip', 'deflate'))
+        self.assertIn('base64', records[1])
+
+        async def replay():
+            async with ReplayConnection(self.path, None) as client:
+                return await client.data.get_data_between_period('00200000', 'hourly', 1543622400, 1543708800)
+
+        self.assertEqual(self.run_async(replay()).response, data.response)
+
+    def test_unknown_route(self):
+        self.record()
+
+        async def replay():
+            async with ReplayConnection(self.path, None) as client:
+                await client.user.list_of_user_devices()
+
+        with self.assertRaises(LookupError):
+            self.run_async(replay())
@@ -0,0 +1,93 @@
+import asyncio
+import gzip
+import json
+import unittest
+import zlib
+from unittest.mock import patch
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from fieldclimate.api import ApiClient
+from fieldclimate.connection.base import ConnectionBase
+from fieldclimate.connection.compression import read_json
+from fieldclimate.metrics import Metrics
+
+
+class ChunkedResponse:
+    class Content:
+        def __init__(self, body):
+            self._chunks = [body[i:i + 3] for i in range(0, len(body), 3)]
+
+        def iter_chunked(self, size):
+            return self
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            if not self._chunks:
+                raise StopAsyncIteration
+            return self._chunks.pop(0)
+
+    def __init__(self, body, encoding=None):
+        self.headers = {'Content-Encoding': encoding} if encoding else {}
+        self.content = ChunkedResponse.Content(body)
+
+
+class TestReadJson(unittest.TestCase):
+    body = {'dates': ['2018-12-01 00:00:00'] * 50, 'data': {'14_X_X_506': {'aggr': {'avg': [1.5] * 50}}}}
+
+    def read(self, result):
+        metrics = Metrics()
+        response = asyncio.get_event_loop().run_until_complete(read_json(result, metrics))
+        return response, metrics
+
+    def test_gzip(self):
+        raw = json.dumps(self.body).encode()
+        (response, metrics) = self.read(ChunkedResponse(gzip.compress(raw), 'gzip'))
+        self.assertEqual(response, self.body)
+        self.assertEqual(metrics['bytes_decompressed'], len(raw))
+        self.assertEqual(metrics['bytes_compressed'], len(gzip.compress(raw)))
+        self.assertLess(metrics['bytes_compressed'], metrics['bytes_decompressed'])
+
+    def test_deflate(self):
+        raw = json.dumps(self.body).encode()
+        self.assertEqual(self.read(ChunkedResponse(zlib.compress(raw), 'deflate'))[0], self.body)
+        raw_deflate = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        compressed = raw_deflate.compress(raw) + raw_deflate.flush()
+        self.assertEqual(self.read(ChunkedResponse(compressed, 'deflate'))[0], self.body)
+
+    def test_identity_and_empty_body(self):
+        self.assertEqual(self.read(ChunkedResponse(b'{"a": 1}'))[0], {'a': 1})
+        self.assertIsNone(self.read(ChunkedResponse(b''))[0])
+
+
+class PlainConnection(ConnectionBase):
+    def _modify_request(self, request):
+        pass
+
+
+class TestCompressedConnection(unittest.TestCase):
+    def test_connection_negotiates_and_measures_compression(self):
+        body = json.dumps({'items': list(range(1000))}).encode()
+
+        async def handle(request):
+            self.assertIn('gzip', request.headers['Accept-Encoding'])
+            return web.Response(body=gzip.compress(body), headers={'Content-Encoding': 'gzip'},
+                                content_type='application/json')
+
+        async def actual_test():
+            app = web.Application()
+            app.router.add_get('/v1/user', handle)
+            async with TestServer(app) as server:
+                connection = PlainConnection().enable_compression()
+                with patch.object(ApiClient, 'api_uri', str(server.make_url('/v1'))):
+                    async with connection as client:
+                        return connection, await client.user.user_information()
+
+        (connection, response) = asyncio.get_event_loop().run_until_complete(actual_test())
+        self.assertEqual(response.response, {'items': list(range(1000))})
+        self.assertEqual(connection.metrics['bytes_decompressed'], len(body))
+        self.assertEqual(connection.metrics['bytes_compressed'], len(gzip.compress(body)))
+        self.assertEqual(connection.metrics['requests'], 1)
@@ -83,3 +83,21 @@ class TestHMAC(unittest.TestCase):
             loop = asyncio.get_event_loop()
             loop.run_until_complete(self.hmac._make_request(method, route, data))
             mock.assert_called_once_with(method, '{}/{}'.format(ApiClient.api_uri, route), json=data, headers=headers)
+
+    def test_conditional_headers_do_not_change_signature(self):
+        with freeze_time('2012-01-14 12:00:01'):
+            returned = SimpleNamespace()
+            returned.status = 200
+            returned.headers = {'ETag': '"v1"'}
+            returned.json = AsyncMock(return_value={})
+            mock = AsyncMock(return_value=returned)
+            self.hmac.enable_conditional_requests()
+            self.hmac._session = SimpleNamespace()
+            self.hmac._session.request = mock
+            loop = asyncio.get_event_loop()
+            loop.run_until_complete(self.hmac._make_request('GET', 'station/info'))
+            loop.run_until_complete(self.hmac._make_request('GET', 'station/info'))
+            mock.assert_called_with('GET', '{}/station/info'.format(ApiClient.api_uri), json=None, headers={
+                'Accept': 'application/json', 'If-None-Match': '"v1"', 'Date': 'Sat, 14 Jan 2012 12:00:01 GMT',
+                'Authorization': 'hmac {}:ca27b4017cb435c690f0724ead14c5a1b795f9fade04a80200bdc9b8cfeb1aef'.format(
+                    TestHMAC.public_key)})
@@ -0,0 +1,157 @@
+import asyncio
+import unittest
+
+from fieldclimate.connection.hmac import HMAC
+from fieldclimate.connection.limiter import AdaptiveLimiter
+from fieldclimate.connection.transport import InProcessTransport
+from fieldclimate.metrics import Metrics
+from fieldclimate.mockserver import MockServer
+from tests.fieldclimate.test_api import MockConnection, MockSession
+
+
+class LoadSession(MockSession):
+    """Answers quickly up to `capacity` concurrent requests and slowly (or with 429 if `throttle`) above it."""
+
+    def __init__(self, capacity, throttle=False):
+        self.capacity = capacity
+        self.throttle = throttle
+        self.running = 0
+        self.max_running = 0
+
+    async def request(self, method, url, json=None, headers=None):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        overloaded = self.running > self.capacity
+        await asyncio.sleep(0.02 if overloaded and not self.throttle else 0.002)
+        self.running -= 1
+        response = await super().request(method, url, json, headers)
+        if overloaded and self.throttle:
+            response.status = 429
+        return response
+
+
+class SlowBodySession(MockSession):
+    """Sends the headers at once and the body after `delay` seconds."""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    async def request(self, method, url, json=None, headers=None):
+        response = await super().request(method, url, json, headers)
+        read = response.json
+
+        async def slow_json(content_type=None):
+            await asyncio.sleep(self.delay)
+            return await read(content_type)
+
+        response.json = slow_json
+        return response
+
+
+def record_latencies(limiter):
+    latencies = []
+    release = limiter.release
+
+    def recording(latency=None, failed=False, generation=None):
+        latencies.append(latency)
+        release(latency, failed, generation)
+
+    limiter.release = recording
+    return latencies
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def run_async(self, coroutine):
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    def test_increases_while_latency_is_stable(self):
+        limiter = AdaptiveLimiter(initial_limit=2, max_limit=4, metrics=Metrics())
+        for _ in range(20):
+            self.run_async(limiter.acquire())
+            self.run_async(limiter.acquire())
+            limiter.release(0.1, False, limiter.generation)
+            limiter.release(0.1, False, limiter.generation)
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter._metrics['concurrency_limit'], 4)
+
+    def test_backs_off_once_per_burst(self):
+        limiter = AdaptiveLimiter(initial_limit=10, backoff=0.5)
+        for _ in range(10):
+            self.run_async(limiter.acquire())
+        generation = limiter.generation
+        limiter.release(0.1, False, generation)
+        for _ in range(9):
+            limiter.release(1.0, False, generation)
+        self.assertAlmostEqual(limiter.limit, 10.1 * 0.5)
+        self.run_async(limiter.acquire())
+        limiter.release(0.1, True, limiter.generation)
+        self.assertAlmostEqual(limiter.limit, 10.1 * 0.25)
+
+    def test_waiters_are_admitted_in_order(self):
+        limiter = AdaptiveLimiter(initial_limit=1)
+        order = []
+
+        async def job(name):
+            async with limiter.permit():
+                order.append(name)
+                await asyncio.sleep(0)
+
+        self.run_async(asyncio.gather(*[job(i) for i in range(3)]))
+        self.assertEqual(order, [0, 1, 2])
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_connection_converges_below_capacity(self):
+        for throttle in (False, True):
+            session = LoadSession(capacity=6, throttle=throttle)
+            connection = MockConnection().enable_adaptive_concurrency(initial_limit=2, max_limit=32)
+            client = connection.with_client_session(session)
+
+            async def actual_test():
+                for _ in range(10):
+                    await asyncio.gather(*[client.user.user_information() for _ in range(40)],
+                                         return_exceptions=True)
+
+            self.run_async(actual_test())
+            self.assertLessEqual(connection.metrics['concurrency_limit'], 8)
+            self.assertGreaterEqual(connection.metrics['concurrency_limit'], 3)
+            self.assertEqual(connection.metrics['in_flight'], 0)
+
+    def test_requests_are_signed_after_waiting_for_a_permit(self):
+        session = LoadSession(capacity=10)
+        connection = MockConnection().enable_adaptive_concurrency(initial_limit=1, max_limit=1)
+        client = connection.with_client_session(session)
+        events = []
+        modify_request = connection._modify_request
+
+        def signing(request):
+            events.append(('sign', connection._concurrency.in_flight, session.running))
+            modify_request(request)
+
+        connection._modify_request = signing
+        self.run_async(asyncio.gather(*[client.user.user_information() for _ in range(3)]))
+        # Every request is signed holding the only permit, so no other request is running meanwhile.
+        self.assertEqual(events, [('sign', 1, 0)] * 3)
+
+    def test_permit_is_held_while_the_body_is_read(self):
+        connection = MockConnection().enable_adaptive_concurrency(initial_limit=1, max_limit=1)
+        client = connection.with_client_session(SlowBodySession(0.02))
+        latencies = record_latencies(connection._concurrency)
+        self.run_async(asyncio.gather(*[client.user.user_information() for _ in range(2)]))
+        self.assertEqual(len(latencies), 2)
+        self.assertTrue(all(latency >= 0.02 for latency in latencies))
+
+    def test_streams_are_timed_until_the_first_chunk(self):
+        server = MockServer(credentials={'public': 'private'})
+        connection = HMAC('public', 'private', transport=InProcessTransport(server.respond))
+        connection.enable_adaptive_concurrency()
+        latencies = record_latencies(connection._concurrency)
+
+        async def actual_test():
+            async with connection as client:
+                async with await client.data.stream_last_data(server.station_ids[0], 'raw', '6') as stream:
+                    async for _ in stream:
+                        await asyncio.sleep(0.01)
+
+        self.run_async(actual_test())
+        self.assertEqual(len(latencies), 1)
+        self.assertLess(latencies[0], 0.01)
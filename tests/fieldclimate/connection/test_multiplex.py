@@ -0,0 +1,125 @@
+import asyncio
+import unittest
+
+from fieldclimate.connection.multiplex import Multiplexer
+from fieldclimate.connection.transport import InProcessTransport
+from fieldclimate.mockserver import MockServer
+from tests.fieldclimate.test_api import MockSession
+
+
+class SlowSession(MockSession):
+    def __init__(self):
+        self.running = {}
+        self.max_running = {}
+
+    async def request(self, method, url, json=None, headers=None):
+        account = headers['Authorization'].split(':')[0]
+        self.running[account] = self.running.get(account, 0) + 1
+        self.max_running[account] = max(self.max_running.get(account, 0), self.running[account])
+        await asyncio.sleep(0.001)
+        self.running[account] -= 1
+        return await super().request(method, url, json, headers)
+
+
+class TestMultiplexer(unittest.TestCase):
+    def run_async(self, coroutine):
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    def test_accounts_share_session_and_sign_with_own_keys(self):
+        session = MockSession()
+        multiplexer = Multiplexer().with_session(session)
+        first = multiplexer.client('public1', 'private1')
+        second = multiplexer.client('public2', 'private2')
+        self.assertIs(first._auth._session, second._auth._session)
+        responses = self.run_async(asyncio.gather(first.user.user_information(), second.user.user_information()))
+        self.assertTrue(responses[0].response['headers']['Authorization'].startswith('hmac public1:'))
+        self.assertTrue(responses[1].response['headers']['Authorization'].startswith('hmac public2:'))
+        self.assertNotEqual(responses[0].response['headers']['Authorization'].split(':')[1],
+                            responses[1].response['headers']['Authorization'].split(':')[1])
+
+    def test_accounts_are_reused(self):
+        multiplexer = Multiplexer().with_session(MockSession())
+        self.assertIs(multiplexer.client('public1', 'private1')._auth, multiplexer.client('public1', 'private1')._auth)
+        self.assertIsNot(multiplexer.client('public1', 'private1')._auth,
+                         multiplexer.client('public1', 'rotated')._auth)
+        self.assertEqual(len(multiplexer), 1)
+        multiplexer.remove('public1')
+        self.assertEqual(len(multiplexer), 0)
+
+    def test_least_recently_used_accounts_are_dropped(self):
+        multiplexer = Multiplexer(max_accounts=2).with_session(MockSession())
+        first = multiplexer.client('public1', 'private1')._auth
+        multiplexer.client('public2', 'private2')
+        self.assertIs(multiplexer.client('public1', 'private1')._auth, first)
+        multiplexer.client('public3', 'private3')
+        self.assertEqual(len(multiplexer), 2)
+        self.assertIs(multiplexer.client('public1', 'private1')._auth, first)
+        self.assertEqual(list(multiplexer._accounts), ['public3', 'public1'])
+
+    def test_dropped_accounts_in_use_keep_their_limiter(self):
+        session = SlowSession()
+        multiplexer = Multiplexer(max_concurrency=2, max_accounts=1).with_session(session)
+
+        async def actual_test():
+            calls = [multiplexer.client('public1', 'private1').user.user_information() for _ in range(5)]
+            running = asyncio.ensure_future(asyncio.gather(*calls))
+            await asyncio.sleep(0)
+            # Drops public1 while its requests are in flight, then asks for it again.
+            multiplexer.client('public2', 'private2')
+            calls = [multiplexer.client('public1', 'private1').user.user_information() for _ in range(5)]
+            await asyncio.gather(running, *calls)
+
+        self.run_async(actual_test())
+        self.assertEqual(session.max_running['hmac public1'], 2)
+
+    def test_given_session_is_kept_and_not_closed(self):
+        class ClosableSession(MockSession):
+            closed = False
+
+            async def close(self):
+                self.closed = True
+
+        session = ClosableSession()
+        multiplexer = Multiplexer().with_session(session)
+
+        async def actual_test():
+            async with multiplexer:
+                return multiplexer.client('public1', 'private1')._auth._session
+
+        self.assertIs(self.run_async(actual_test()), session)
+        self.assertFalse(session.closed)
+
+    def test_limits_are_per_account(self):
+        session = SlowSession()
+        multiplexer = Multiplexer(max_concurrency=2).with_session(session)
+        first = multiplexer.client('public1', 'private1')
+        second = multiplexer.client('public2', 'private2', max_concurrency=5)
+        calls = [first.user.user_information() for _ in range(10)] + \
+                [second.user.user_information() for _ in range(10)]
+        self.run_async(asyncio.gather(*calls))
+        self.assertEqual(session.max_running, {'hmac public1': 2, 'hmac public2': 5})
+
+    def test_uses_given_transport(self):
+        server = MockServer(credentials={'public1': 'private1', 'public2': 'private2'})
+
+        async def actual_test():
+            async with Multiplexer(transport=InProcessTransport(server.respond)) as multiplexer:
+                return await asyncio.gather(*[multiplexer.client(public_key, private_key).user.list_of_user_devices()
+                                              for (public_key, private_key) in server.credentials.items()])
+
+        self.assertEqual([len(response.response) for response in self.run_async(actual_test())], [10, 10])
+
+    def test_streams_hold_the_limiter_until_closed(self):
+        server = MockServer(credentials={'public': 'private'})
+
+        async def actual_test():
+            async with Multiplexer(max_concurrency=1, transport=InProcessTransport(server.respond)) as multiplexer:
+                client = multiplexer.client('public', 'private')
+                stream = await client.data.stream_last_data(server.station_ids[0], 'raw', '6')
+                second = asyncio.ensure_future(client.user.list_of_user_devices())
+                await asyncio.sleep(0.01)
+                waiting = not second.done()
+                await stream.aclose()
+                return waiting, len((await second).response)
+
+        self.assertEqual(self.run_async(actual_test()), (True, 10))
@@ -6,6 +6,7 @@ from unittest.mock import MagicMock
 from parameterized import parameterized
 
 from fieldclimate.api import ApiClient
+from fieldclimate.mockserver import MockServer
 from fieldclimate.reqresp import Request, ResponseException
 
 from test.support import EnvironmentVarGuard
@@ -158,3 +159,19 @@ class TestOAuth2(unittest.TestCase):
         loop.run_until_complete(self.oauth2._make_request(method, route, data))
         mock_request.assert_called_with(method, '{}/{}'.format(ApiClient.api_uri, route), json=data, headers=headers)
         mock_get_token.assert_called_once_with()
+
+    def test_tokens_from_mock_server(self):
+        async def actual_test():
+            async with MockServer(auth_codes=[TestOAuth2.auth_code]) as server:
+                self.oauth2.api_uri = server.api_uri
+                self.oauth2.token_uri = server.token_uri
+                async with self.oauth2 as client:
+                    first = await client.user.user_information()
+                    # Expired access tokens are renewed with the refresh token.
+                    server.tokens.clear()
+                    second = await client.user.user_information()
+                    return first, second, server.tokens
+
+        (first, second, tokens) = asyncio.get_event_loop().run_until_complete(actual_test())
+        self.assertEqual((first.code, second.code), (200, 200))
+        self.assertEqual(tokens, {self.oauth2._access_token})
@@ -0,0 +1,221 @@
+import asyncio
+import gzip
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from fieldclimate.connection.hmac import HMAC
+from fieldclimate.connection.transport import AiohttpTransport, HttpxTransport, InProcessTransport, httpx
+from fieldclimate.mockserver import MockServer
+from fieldclimate.reqresp import ResponseException
+
+
+async def fetch(connection, station_id):
+    async with connection as client:
+        response = await client.data.get_last_data(station_id, 'hourly', '6', 'optimized')
+        stream = await client.data.stream_last_data(station_id, 'hourly', '6', 'optimized')
+        events = []
+        async for event in stream:
+            events.append(event)
+        return response.response, events
+
+
+class TestInProcessTransport(unittest.TestCase):
+    def run_async(self, coroutine):
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    def test_serves_without_sockets(self):
+        server = MockServer(credentials={'public': 'private'}, stations=2)
+        connection = HMAC('public', 'private', transport=InProcessTransport(server.respond))
+        (response, events) = self.run_async(fetch(connection, server.station_ids[0]))
+        self.assertEqual(len(response['dates']), 6)
+        self.assertEqual(dict((item, value) for (key, item, value) in events if key == 'data'), response['data'])
+        self.assertEqual(connection.metrics['requests'], 2)
+
+    def test_errors_and_empty_responses(self):
+        server = MockServer(credentials={'public': 'private'})
+
+        async def actual_test(private_key):
+            async with HMAC('public', private_key, transport=InProcessTransport(server.respond)) as client:
+                return await client.station.station_serials(server.station_ids[0])
+
+        self.assertIsNone(self.run_async(actual_test('private')).response)
+        with self.assertRaises(ResponseException) as context:
+            self.run_async(actual_test('wrong'))
+        self.assertEqual(context.exception.code, 401)
+
+    def test_rejects_other_addresses(self):
+        transport = InProcessTransport(MockServer().respond, 'http://localhost/v1')
+        with self.assertRaises(ValueError):
+            self.run_async(transport.request('GET', 'https://api.fieldclimate.com/v1/user'))
+
+
+class StubHttpx:
+    """Stands in for the `httpx` module, answering every request with `body`, sent compressed with `encoding`."""
+
+    class Chunks:
+        def __init__(self, response, body, size):
+            self._response = response
+            self._chunks = [body[i:i + size] for i in range(0, len(body), size)]
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            if not self._chunks:
+                self._response.is_closed = True
+                raise StopAsyncIteration
+            return self._chunks.pop(0)
+
+    class Response:
+        def __init__(self, body, encoding):
+            self.status_code = 200
+            self.body = body
+            self.raw = gzip.compress(body) if encoding == 'gzip' else body
+            self.headers = {'Content-Encoding': encoding} if encoding else {}
+            self.is_closed = False
+
+        def aiter_bytes(self, size):
+            return StubHttpx.Chunks(self, self.body, size)
+
+        def aiter_raw(self, size):
+            return StubHttpx.Chunks(self, self.raw, size)
+
+        async def aclose(self):
+            await asyncio.sleep(0)
+            self.is_closed = True
+
+    def __init__(self, body, encoding=None):
+        self.body = body
+        self.encoding = encoding
+        self.clients = []
+        self.responses = []
+
+    def AsyncClient(self, **options):
+        stub = self
+
+        class Client:
+            def __init__(self):
+                self.options = options
+                self.closed = False
+                stub.clients.append(self)
+
+            def build_request(self, method, url, headers=None, json=None, data=None):
+                return SimpleNamespace(method=method, url=url, headers=headers)
+
+            async def send(self, request, stream=False):
+                stub.responses.append(StubHttpx.Response(stub.body, stub.encoding))
+                return stub.responses[-1]
+
+            async def aclose(self):
+                self.closed = True
+
+        return Client()
+
+
+class TestHttpxTransport(unittest.TestCase):
+    body = json.dumps({'dates': ['2018-12-01 00:00:00'] * 20, 'data': {}}).encode()
+
+    def run_async(self, coroutine):
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    def test_decoded_bodies(self):
+        stub = StubHttpx(self.body, 'gzip')
+        with patch('fieldclimate.connection.transport.httpx', stub):
+            transport = HttpxTransport(timeout=5)
+
+            async def actual_test():
+                response = await transport.request('GET', 'https://api.fieldclimate.com/v1/user')
+                chunks = []
+                async for chunk in response.content.iter_chunked(100):
+                    chunks.append(chunk)
+                second = await transport.request('GET', 'https://api.fieldclimate.com/v1/user')
+                return chunks, await second.read(), await second.json()
+
+            (chunks, body, parsed) = self.run_async(actual_test())
+        self.assertEqual(stub.clients[0].options, {'timeout': 5, 'http2': False})
+        self.assertEqual([len(chunk) for chunk in chunks][:-1], [100] * (len(self.body) // 100))
+        self.assertEqual(b''.join(chunks), self.body)
+        self.assertEqual(body, self.body)
+        self.assertEqual(parsed, json.loads(self.body.decode()))
+
+    def test_raw_bodies_are_decompressed_by_json(self):
+        stub = StubHttpx(self.body, 'gzip')
+        with patch('fieldclimate.connection.transport.httpx', stub):
+            transport = HttpxTransport(auto_decompress=False)
+
+            async def actual_test():
+                response = await transport.request('GET', 'https://api.fieldclimate.com/v1/user')
+                return await response.read(), await response.json()
+
+            (body, parsed) = self.run_async(actual_test())
+        self.assertEqual(body, gzip.compress(self.body))
+        self.assertEqual(parsed, json.loads(self.body.decode()))
+
+    def test_released_responses_are_closed_with_the_transport(self):
+        stub = StubHttpx(self.body)
+        with patch('fieldclimate.connection.transport.httpx', stub):
+            transport = HttpxTransport()
+
+            async def actual_test():
+                (await transport.request('GET', 'https://api.fieldclimate.com/v1/user')).release()
+                await (await transport.request('GET', 'https://api.fieldclimate.com/v1/user')).aclose()
+                await transport.close()
+
+            self.run_async(actual_test())
+        self.assertEqual([response.is_closed for response in stub.responses], [True, True])
+        self.assertTrue(stub.clients[0].closed)
+        self.assertIsNone(transport._client)
+
+    def test_connection_over_stub(self):
+        stub = StubHttpx(self.body, 'gzip')
+        with patch('fieldclimate.connection.transport.httpx', stub):
+            connection = HMAC('public', 'private', transport=HttpxTransport(auto_decompress=False))
+            connection.enable_compression()
+
+            async def actual_test():
+                async with connection as client:
+                    return await client.data.get_last_data('00000146', 'raw', '20')
+
+            response = self.run_async(actual_test())
+        self.assertEqual(response.response, json.loads(self.body.decode()))
+        self.assertEqual(connection.metrics['bytes_decompressed'], len(self.body))
+        self.assertTrue(stub.clients[0].closed)
+
+
+class TestNetworkTransports(unittest.TestCase):
+    def run_async(self, coroutine):
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    def fetch_over(self, make_transport, compress=False):
+        async def actual_test():
+            async with MockServer(credentials={'public': 'private'}, stations=2, compress=compress) as server:
+                transport = make_transport()
+                connection = HMAC('public', 'private', transport=transport)
+                connection.api_uri = server.api_uri
+                if compress:
+                    connection.enable_compression()
+                first = await fetch(connection, server.station_ids[1])
+                # The transport is closed on leaving the connection and can be used again.
+                second = await fetch(connection, server.station_ids[1])
+                return first, second, connection.metrics
+
+        return self.run_async(actual_test())
+
+    def test_aiohttp(self):
+        (first, second, metrics) = self.fetch_over(lambda: AiohttpTransport(auto_decompress=False), compress=True)
+        self.assertEqual(first, second)
+        self.assertEqual(len(first[0]['dates']), 6)
+        self.assertGreater(metrics['bytes_decompressed'], metrics['bytes_compressed'])
+
+    @unittest.skipIf(httpx is None, 'httpx is not installed')
+    def test_httpx_matches_aiohttp(self):
+        (expected, _, _) = self.fetch_over(AiohttpTransport)
+        (first, second, _) = self.fetch_over(lambda: HttpxTransport(http2=False))
+        self.assertEqual(first, expected)
+        self.assertEqual(second, expected)
+        (compressed, _, metrics) = self.fetch_over(lambda: HttpxTransport(http2=False, auto_decompress=False),
+                                                   compress=True)
+        self.assertEqual(compressed, expected)
+        self.assertGreater(metrics['bytes_decompressed'], metrics['bytes_compressed'])
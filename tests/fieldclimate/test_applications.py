@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from fieldclimate.applications import ApplicationIndex
+from fieldclimate.reqresp import Response
+
+
+def station(name):
+    return {'name': {'original': name}}
+
+
+class MockClient:
+    def __init__(self):
+        self.users = {'app1': [{'_id': 'u1'}, {'_id': 'u2'}], 'app2': [{'_id': 'u3'}]}
+        self.stations = {'u1': [station('s1'), station('s2')], 'u2': [station('s2')], 'u3': []}
+        self.crawled = []
+        self.dev = SimpleNamespace(list_of_applications=self.list_of_applications,
+                                   application_users=self.application_users,
+                                   application_stations=self.application_stations,
+                                   user_stations=self.user_stations)
+
+    async def list_of_applications(self):
+        return Response(200, [{'_id': 'app1'}, {'_id': 'app2'}])
+
+    async def application_users(self, app_id):
+        return Response(200, self.users[app_id])
+
+    async def application_stations(self, app_id):
+        return Response(200, [station(name) for user in self.users[app_id] for name in ['s1', 's2']
+                              if user['_id'] == 'u1'])
+
+    async def user_stations(self, user_id):
+        self.crawled.append(user_id)
+        return Response(200, self.stations[user_id])
+
+
+class TestApplicationIndex(unittest.TestCase):
+    def run_async(self, coroutine):
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    def setUp(self):
+        self.client = MockClient()
+        self.index = ApplicationIndex(self.client)
+
+    def test_lookups(self):
+        self.run_async(self.index.refresh())
+        self.assertEqual(self.index.stations_of_user('u1'), {'s1', 's2'})
+        self.assertEqual(self.index.users_of_station('s2'), {'u1', 'u2'})
+        self.assertEqual(self.index.stations_of_user('u3'), frozenset())
+        self.assertEqual(self.index.users_of_application('app1'), {'u1', 'u2'})
+        self.assertEqual(self.index.stations_of_application('app1'), {'s1', 's2'})
+        self.assertEqual(self.index.users_of_station('unknown'), frozenset())
+
+    def test_refresh_is_incremental(self):
+        self.run_async(self.index.refresh())
+        self.assertEqual(sorted(self.client.crawled), ['u1', 'u2', 'u3'])
+        self.client.users['app2'].append({'_id': 'u4'})
+        self.client.stations['u4'] = [station('s3')]
+        self.client.stations['u1'] = [station('s1')]
+        self.assertEqual(self.run_async(self.index.refresh()), ['u4'])
+        self.assertEqual(self.index.users_of_station('s3'), {'u4'})
+        self.assertEqual(self.index.users_of_station('s2'), {'u1', 'u2'})
+        self.assertEqual(sorted(self.run_async(self.index.refresh(max_age=0))), ['u1', 'u2', 'u3', 'u4'])
+        self.assertEqual(self.index.users_of_station('s2'), {'u2'})
+
+    def test_removed_users_are_dropped(self):
+        self.run_async(self.index.refresh())
+        self.client.users['app1'] = [{'_id': 'u2'}]
+        self.run_async(self.index.refresh())
+        self.assertEqual(self.index.stations_of_user('u1'), frozenset())
+        self.assertEqual(self.index.users_of_station('s1'), frozenset())
+        self.assertEqual(self.index.users_of_station('s2'), {'u2'})
+
+    def test_schedule(self):
+        async def scheduled():
+            task = self.index.schedule(3600)
+            await asyncio.sleep(0.01)
+            task.cancel()
+        self.run_async(scheduled())
+        self.assertEqual(self.index.stations_of_user('u2'), {'s2'})
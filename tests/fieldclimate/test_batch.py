@@ -0,0 +1,75 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from fieldclimate.batch import DiseaseBatch, DiseaseRow
+from fieldclimate.ratelimit import RateLimiter
+from fieldclimate.reqresp import Response, ResponseException
+
+
+class MockClient:
+    def __init__(self):
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+        self.system = SimpleNamespace(system_diseases_support=self.system_diseases_support)
+        self.disease = SimpleNamespace(get_last_disease=self.get_last_disease,
+                                       get_disease_between=self.get_disease_between)
+
+    async def system_diseases_support(self):
+        self.calls.append(('system_diseases_support',))
+        return Response(200, [{'group': 'Apple', 'models': [{'key': 'Apple/Scab'}, {'key': 'Apple/Mildew'}]}])
+
+    async def get_last_disease(self, station_id, time_period, disease_data):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0)
+        self.running -= 1
+        self.calls.append(('get_last_disease', station_id, time_period, disease_data))
+        if station_id == 'broken':
+            raise ResponseException(500, None)
+        return Response(200, {'dates': ['2018-06-01', '2018-06-02'],
+                              'data': [{'name': 'Infection', 'values': [10, 20]}]})
+
+    async def get_disease_between(self, station_id, from_unix_timestamp, disease_data, to_unix_timestamp=None):
+        self.calls.append(('get_disease_between', station_id, from_unix_timestamp, disease_data, to_unix_timestamp))
+        return Response(200, {'dates': ['2018-06-01'],
+                              'data': [{'name': 'Risk', 'values': {'min': [1], 'max': [2]}}]})
+
+
+class TestDiseaseBatch(unittest.TestCase):
+    def run_async(self, coroutine):
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    def test_all_models_are_evaluated_for_all_stations(self):
+        client = MockClient()
+        batch = DiseaseBatch(client, RateLimiter(max_concurrency=2))
+        result = self.run_async(batch.get_last_disease(['a', 'b'], '7d'))
+        self.assertEqual(len(result.rows), 8)
+        self.assertIn(DiseaseRow('b', 'Apple/Mildew', '2018-06-02', 'Infection', 20), result.rows)
+        self.assertIn(('get_last_disease', 'a', '7d', {'name': 'Apple/Scab'}), client.calls)
+        self.assertEqual(result.errors, {})
+        self.assertLessEqual(client.max_running, 2)
+
+    def test_model_metadata_is_cached(self):
+        client = MockClient()
+        batch = DiseaseBatch(client)
+        self.run_async(batch.get_last_disease(['a'], '7d'))
+        self.run_async(batch.get_disease_between(['a'], 1543524622))
+        self.assertEqual(client.calls.count(('system_diseases_support',)), 1)
+
+    def test_explicit_models_and_value_dicts(self):
+        client = MockClient()
+        batch = DiseaseBatch(client)
+        result = self.run_async(batch.get_disease_between(['a'], 1543524622, 1543524623, models=['Pear/Scab']))
+        self.assertEqual(sorted(result.rows), [DiseaseRow('a', 'Pear/Scab', '2018-06-01', 'Risk:max', 2),
+                                               DiseaseRow('a', 'Pear/Scab', '2018-06-01', 'Risk:min', 1)])
+        self.assertNotIn(('system_diseases_support',), client.calls)
+
+    def test_errors_are_reported_per_combination(self):
+        client = MockClient()
+        batch = DiseaseBatch(client)
+        result = self.run_async(batch.get_last_disease(['a', 'broken'], '7d', models=['Apple/Scab']))
+        self.assertEqual(len(result.rows), 2)
+        self.assertEqual(list(result.errors.keys()), [('broken', 'Apple/Scab')])
+        self.assertEqual(result.errors[('broken', 'Apple/Scab')].code, 500)
@@ -0,0 +1,15 @@
+import asyncio
+import unittest
+
+from fieldclimate.benchmark import compare_transports
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_compare_transports(self):
+        results = asyncio.get_event_loop().run_until_complete(
+            compare_transports(('aiohttp', 'in-process'), requests=20, concurrency=5, stations=2))
+        self.assertEqual([result.transport for result in results], ['aiohttp', 'in-process'])
+        for result in results:
+            self.assertEqual((result.requests, result.errors, len(result.latencies)), (20, 0, 20))
+            self.assertGreater(result.throughput, 0)
+            self.assertIn('requests/s', result.summary())
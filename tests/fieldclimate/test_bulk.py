@@ -0,0 +1,66 @@
+import asyncio
+import unittest
+
+from fieldclimate.bulk import FAILED, NOT_FOUND, UNCHANGED, UPDATED, BulkUpdate
+from fieldclimate.ratelimit import RateLimiter
+from fieldclimate.reqresp import ResponseException
+from tests.fieldclimate.test_metadata import MockClient
+
+
+class MockWriteClient(MockClient):
+    def __init__(self):
+        super().__init__()
+        self.station.station_sensors = self.handler('station_sensors', lambda station_id: [
+            {'ch': 1, 'code': 506, 'name': 'Air temperature', 'unit': '°C'},
+            {'ch': 2, 'code': 507, 'name': 'Relative humidity', 'unit': '%'}])
+        self.station.station_nodes = self.handler('station_nodes', lambda station_id: {'1': 'North'})
+        self.station.station_sensor_update = self.handler('station_sensor_update', self.write)
+        self.station.change_node_name = self.handler('change_node_name', self.write)
+        self.station.change_serial_name = self.handler('change_serial_name', self.write)
+
+    def write(self, station_id, body):
+        if station_id == 'locked':
+            raise ResponseException(403, None)
+
+
+class TestBulkUpdate(unittest.TestCase):
+    def run_async(self, coroutine):
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    def test_only_changes_are_written(self):
+        client = MockWriteClient()
+        update = BulkUpdate(client, RateLimiter(2))
+        update.sensor('s1', 1, 506, name='Air temperature', unit='°C')
+        update.sensor('s1', 2, 507, name='Humidity')
+        update.sensor('s1', 3, 600, name='Radiation')
+        update.node('s1', '1', 'North').node('s1', '2', 'South')
+        update.serial('s1', 'ABC', name='Probe')
+        self.assertEqual(len(update), 6)
+        report = self.run_async(update.apply())
+
+        statuses = sorted((result.kind, result.key, result.status) for result in report.results)
+        self.assertEqual(statuses, [
+            ('node', '1', UNCHANGED), ('node', '2', UPDATED),
+            ('sensor', (1, 506), UNCHANGED), ('sensor', (2, 507), UPDATED), ('sensor', (3, 600), NOT_FOUND),
+            ('serial', 'ABC', UPDATED)])
+        writes = [call for call in client.calls if call[0] in ('station_sensor_update', 'change_node_name',
+                                                                 'change_serial_name')]
+        self.assertEqual(sorted(writes), [
+            ('change_node_name', 's1', {'2': 'South'}),
+            ('change_serial_name', 's1', {'ABC': {'name': 'Probe'}}),
+            ('station_sensor_update', 's1', {'channel': 2, 'code': 507, 'name': 'Humidity'})])
+        self.assertEqual(client.count('station_sensors'), 1)
+        self.assertEqual(len(update), 0)
+
+    def test_failures_are_reported_per_item(self):
+        client = MockWriteClient()
+        update = BulkUpdate(client)
+        update.sensor('locked', 1, 506, name='Temperature')
+        update.node('locked', '2', 'South')
+        update.sensor('s2', 1, 506, name='Temperature')
+        report = self.run_async(update.apply())
+
+        self.assertEqual(sorted((result.kind, result.station_id) for result in report.failed),
+                         [('node', 'locked'), ('sensor', 'locked')])
+        self.assertEqual(report.failed[0].error.code, 403)
+        self.assertEqual([result.station_id for result in report.with_status(UPDATED)], ['s2'])
@@ -0,0 +1,104 @@
+import asyncio
+import contextlib
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from fieldclimate.cli import chunks, harvest, main, parse_time
+from fieldclimate.mockserver import MockServer
+
+
+class TestHelpers(unittest.TestCase):
+    def test_parse_time(self):
+        self.assertEqual(parse_time('1543658700'), 1543658700)
+        self.assertEqual(parse_time('2018-12-01'), 1543622400)
+        self.assertEqual(parse_time('2018-12-01 10:05:00'), 1543658700)
+        self.assertRaises(ValueError, parse_time, 'yesterday')
+
+    def test_chunks(self):
+        self.assertEqual(chunks(0, 249, 100), [(0, 99), (100, 199), (200, 249)])
+        self.assertEqual(chunks(150, 250, 100), [(150, 199), (200, 250)])
+        self.assertEqual(chunks(150, 180, 100), [(150, 180)])
+        self.assertEqual(chunks(0, 0, 100), [(0, 0)])
+
+
+class TestHarvest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.loop = asyncio.get_event_loop()
+        self.server = MockServer(credentials={'public': 'private'}, stations=2)
+        self.loop.run_until_complete(self.server.start())
+        self.addCleanup(lambda: self.loop.run_until_complete(self.server.close()))
+        self.to = 1543622400
+
+    def options(self, **options):
+        result = {'public_key': 'public', 'private_key': 'private', 'api_uri': self.server.api_uri,
+                  'output': self.directory.name, 'data_group': 'hourly', 'format': 'optimized', 'chunk_days': 1,
+                  'max_concurrency': 2, 'max_rate': None, 'compression': True, 'from': self.to - 3 * 86400,
+                  'to': self.to - 1}
+        result.update(options)
+        return result
+
+    def test_writes_chunks_and_resumes(self):
+        output = io.StringIO()
+        stats = self.loop.run_until_complete(harvest(self.options(), output))
+        self.assertEqual((stats.requests, stats.skipped, stats.failures), (6, 0, []))
+        station_id = self.server.station_ids[0]
+        path = os.path.join(self.directory.name, station_id, 'hourly',
+                            '{}-{}.json.gz'.format(self.to - 86400, self.to - 1))
+        with gzip.open(path) as f:
+            self.assertEqual(len(json.loads(f.read().decode('utf-8'))['dates']), 24)
+        self.assertIn('6 chunks fetched, 0 skipped, 0 failed', output.getvalue())
+        self.assertIn('Latency: p50', output.getvalue())
+
+        os.remove(path)
+        stats = self.loop.run_until_complete(harvest(self.options(**{'from': self.to - 2 * 86400 - 5}), io.StringIO()))
+        self.assertEqual((stats.requests, stats.skipped), (1, 5))
+
+    def test_incomplete_chunks_are_rewritten(self):
+        directory = os.path.join(self.directory.name, self.server.station_ids[0], 'hourly')
+        for to in (self.to + 3600, self.to + 7200):
+            stats = self.loop.run_until_complete(harvest(self.options(**{'from': self.to, 'to': to}), io.StringIO()))
+            self.assertEqual((stats.requests, stats.skipped), (2, 0))
+            self.assertEqual(os.listdir(directory), ['{}.json.gz'.format(self.to)])
+        with gzip.open(os.path.join(directory, '{}.json.gz'.format(self.to))) as f:
+            self.assertEqual(len(json.loads(f.read().decode('utf-8'))['dates']), 3)
+        stats = self.loop.run_until_complete(harvest(self.options(**{'from': self.to, 'to': self.to + 86399}),
+                                                     io.StringIO()))
+        self.assertEqual(os.listdir(directory), ['{}-{}.json.gz'.format(self.to, self.to + 86399)])
+
+    def test_first_chunk_starts_at_from(self):
+        directory = os.path.join(self.directory.name, self.server.station_ids[0], 'hourly')
+        stats = self.loop.run_until_complete(harvest(self.options(**{'from': self.to - 7200}), io.StringIO()))
+        self.assertEqual((stats.requests, stats.skipped), (2, 0))
+        self.assertEqual(os.listdir(directory), ['{}.json.gz'.format(self.to - 86400)])
+        with gzip.open(os.path.join(directory, '{}.json.gz'.format(self.to - 86400))) as f:
+            self.assertEqual(len(json.loads(f.read().decode('utf-8'))['dates']), 2)
+
+    def main(self, argv):
+        # `main` runs its own event loop, so it runs in a thread while this loop serves its requests.
+        return self.loop.run_until_complete(self.loop.run_in_executor(None, main, argv))
+
+    def test_main(self):
+        stations = os.path.join(self.directory.name, 'stations.txt')
+        with open(stations, 'w') as f:
+            f.write('# stations\n{}\n\n'.format(self.server.station_ids[1]))
+        config = os.path.join(self.directory.name, 'config.json')
+        with open(config, 'w') as f:
+            json.dump({'public_key': 'public', 'private_key': 'wrong', 'data_group': 'daily'}, f)
+        output = os.path.join(self.directory.name, 'data')
+        argv = ['harvest', '--config', config, '--stations', stations, '--output', output,
+                '--api-uri', self.server.api_uri, '--from', str(self.to - 86400), '--to', str(self.to - 1),
+                '--chunk-days', '1']
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(self.main(argv), 1)
+        with open(config, 'w') as f:
+            json.dump({'public_key': 'public', 'private_key': 'private', 'data_group': 'daily'}, f)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(self.main(argv), 0)
+        self.assertEqual(os.listdir(os.path.join(output, self.server.station_ids[1], 'daily')),
+                         ['{}-{}.json.gz'.format(self.to - 86400, self.to - 1)])
@@ -0,0 +1,54 @@
+import unittest
+
+from fieldclimate.compute import daily_aggregates, day_of_year, daily_eto, eto_hargreaves, eto_penman_monteith, \
+    extraterrestrial_radiation
+
+
+class TestCompute(unittest.TestCase):
+
+    def test_daily_aggregates(self):
+        dates = ['2018-07-06 00:00:00', '2018-07-06 12:00:00', '2018-07-07 00:00:00', '2018-07-08 00:00:00']
+        (days, aggregates) = daily_aggregates(dates, [1, 3, None, 5])
+        self.assertEqual(days, ['2018-07-06', '2018-07-07', '2018-07-08'])
+        self.assertEqual(aggregates['min'], [1, None, 5])
+        self.assertEqual(aggregates['max'], [3, None, 5])
+        self.assertEqual(aggregates['avg'], [2, None, 5])
+        self.assertEqual(aggregates['sum'], [4, None, 5])
+
+    def test_day_of_year(self):
+        self.assertEqual(day_of_year('2018-07-06'), 187)
+        self.assertEqual(day_of_year('2016-03-01 10:00:00'), 61)
+
+    def test_extraterrestrial_radiation(self):
+        # FAO-56, examples 8 and 18.
+        self.assertAlmostEqual(extraterrestrial_radiation('2018-09-03', -20), 32.2, places=1)
+        self.assertAlmostEqual(extraterrestrial_radiation('2018-07-06', 50.8), 41.09, places=1)
+
+    def test_eto_penman_monteith(self):
+        # FAO-56, example 18 (Brussels), with mean relative humidity instead of its min and max.
+        eto = eto_penman_monteith(['2018-07-06', '2018-07-07'], [12.3, None], [21.5, 20], [73.5, 70], [2.078, 2],
+                                  [22.07 / 0.0864, 250], 50.8, 100)
+        self.assertAlmostEqual(eto[0], 3.9, delta=0.2)
+        self.assertIsNone(eto[1])
+
+    def test_eto_penman_monteith_in_polar_night(self):
+        # No extraterrestrial, and so no clear-sky, radiation at 80 N in December.
+        self.assertEqual(extraterrestrial_radiation('2018-12-21', 80), 0)
+        eto = eto_penman_monteith(['2018-12-21'], [-25], [-20], [80], [3], [0], 80, 10)
+        self.assertAlmostEqual(eto[0], 0.0, delta=0.5)
+
+    def test_eto_hargreaves(self):
+        eto = eto_hargreaves(['2018-07-06'], [12.3], [21.5], 50.8)
+        self.assertAlmostEqual(eto[0], 0.0023 * 34.7 * 9.2 ** 0.5 * 0.408 * 41.09, delta=0.05)
+
+    def test_daily_eto(self):
+        def sensor(values):
+            return {'aggr': {'avg': values}}
+        response = {
+            'dates': ['2018-07-06 00:00:00', '2018-07-06 12:00:00'],
+            'data': {'t': sensor([12.3, 21.5]), 'rh': sensor([84, 63]), 'u': sensor([2.078, 2.078]),
+                     'rs': sensor([22.07 / 0.0864] * 2)},
+        }
+        (days, eto) = daily_eto(response, 't', 'rh', 'u', 'rs', 50.8, 100)
+        self.assertEqual(days, ['2018-07-06'])
+        self.assertAlmostEqual(eto[0], 3.9, delta=0.2)
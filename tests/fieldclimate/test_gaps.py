@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+
+from parameterized import parameterized
+
+from fieldclimate.connection.hmac import HMAC
+from fieldclimate.gaps import GapFiller, merge_data, missing_intervals, plan_requests, typical_step
+from fieldclimate.mockserver import MockServer
+
+DAY = 86400
+
+
+class TestGapDetection(unittest.TestCase):
+    def test_missing_intervals(self):
+        timestamps = [0, 300, 900, 1200, 2400]
+        self.assertEqual(typical_step(timestamps), 300)
+        self.assertEqual(missing_intervals(timestamps, 300, 0, 3000), [(600, 899), (1500, 2399), (2700, 3000)])
+        self.assertEqual(missing_intervals(timestamps, 300, 300, 1200), [(600, 899)])
+        self.assertEqual(missing_intervals([], 300, 0, 599), [(0, 599)])
+
+    def test_plan_requests(self):
+        intervals = [(600, 899), (1500, 2399), (10000, 30000)]
+        self.assertEqual(plan_requests(intervals), intervals)
+        self.assertEqual(plan_requests(intervals, merge_within=600), [(600, 2399), (10000, 30000)])
+        self.assertEqual(plan_requests([(0, 24999)], max_span=10000), [(0, 9999), (10000, 19999), (20000, 24999)])
+
+    def test_merge_data(self):
+        stored = {'dates': ['2018-12-01 00:00:00', '2018-12-01 02:00:00'],
+                  'data': {'1_X_X_506': {'name': 'T', 'aggr': {'avg': [1, 3]}}}}
+        fetched = {'dates': ['2018-12-01 01:00:00', '2018-12-01 02:00:00'],
+                   'data': {'1_X_X_506': {'name': 'T', 'aggr': {'avg': [2, 4]}},
+                            '2_X_X_6': {'name': 'P', 'aggr': {'sum': [0, 1]}}}}
+        merged = merge_data(stored, fetched)
+        self.assertEqual(merged['dates'], ['2018-12-01 00:00:00', '2018-12-01 01:00:00', '2018-12-01 02:00:00'])
+        self.assertEqual(merged['data']['1_X_X_506']['aggr']['avg'], [1, 2, 4])
+        self.assertEqual(merged['data']['2_X_X_6']['aggr']['sum'], [None, 0, 1])
+
+
+class TestGapFiller(unittest.TestCase):
+    @parameterized.expand([(0,), (120,), (-300,)])
+    def test_fills_only_the_holes(self, timezone_offset):
+        async def actual_test():
+            async with MockServer(credentials={'public': 'private'}, sensors=2, raw_interval=900,
+                                  timezone_offset=timezone_offset) as server:
+                connection = HMAC('public', 'private')
+                connection.api_uri = server.api_uri
+                async with connection as client:
+                    complete = (await client.data.get_data_between_period('00200000', 'raw', DAY, 2 * DAY - 1,
+                                                                          'optimized')).response
+                    keep = [i for i in range(len(complete['dates'])) if not (10 <= i < 20 or 40 <= i < 42)]
+                    stored = {'dates': [complete['dates'][i] for i in keep],
+                              'data': {tag: dict(sensor, aggr={aggr: [values[i] for i in keep]
+                                                               for (aggr, values) in sensor['aggr'].items()})
+                                       for (tag, sensor) in complete['data'].items()}}
+                    filler = GapFiller(client)
+                    filled = await filler.fill_many({('00200000', 'raw'): stored}, DAY, 2 * DAY - 1)
+                    return complete, filled[('00200000', 'raw')], filler.requests
+
+        (complete, filled, requests) = asyncio.get_event_loop().run_until_complete(actual_test())
+        self.assertEqual(filled['dates'], complete['dates'])
+        self.assertEqual(filled['data'], complete['data'])
+        self.assertEqual(requests, [('00200000', 'raw', DAY + 10 * 900, DAY + 20 * 900 - 1),
+                                    ('00200000', 'raw', DAY + 40 * 900, DAY + 42 * 900 - 1)])
+
+    def test_plan_with_timezone_offset(self):
+        # Local dates two hours ahead of UTC, from 02:00 to 04:00 local time with 03:00 missing.
+        stored = {'dates': ['1970-01-02 02:00:00', '1970-01-02 04:00:00']}
+        filler = GapFiller(None)
+        self.assertEqual(filler.plan('hourly', stored, DAY, DAY + 2 * 3600, timezone_offset=120),
+                         [(DAY + 3600, DAY + 7199)])
+        # Read as UTC, the dates would lie two hours later.
+        self.assertEqual(filler.plan('hourly', stored, DAY, DAY + 2 * 3600), [(DAY, DAY + 7199)])
@@ -0,0 +1,136 @@
+import asyncio
+import math
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from fieldclimate.connection.hmac import HMAC
+from fieldclimate.connection.transport import InProcessTransport
+from fieldclimate.history import ColumnTable, HistoryStore, daily, events_per_day, transmission_gaps, trend, uptime
+from fieldclimate.mockserver import MockServer
+from fieldclimate.reqresp import Response
+from fieldclimate.resample import from_timestamp
+
+DAY = 86400
+
+
+class MockClient:
+    def __init__(self):
+        self.calls = []
+        self.station = SimpleNamespace(station_transmission_history_between=self.history,
+                                       station_events_between=self.events, station_information=self.information)
+
+    async def information(self, station_id):
+        return Response(200, {'config': {'timezone_offset': 0}})
+
+    async def history(self, station_id, from_unix_timestamp, to_unix_timestamp):
+        self.calls.append(('history', from_unix_timestamp, to_unix_timestamp))
+        start = -(-from_unix_timestamp // 3600) * 3600
+        return Response(200, [{'date': from_timestamp(timestamp), 'battery': 6500 - timestamp // 3600,
+                               'solar_panel': 3000.5, 'description': 'ok'}
+                              for timestamp in range(start, to_unix_timestamp + 1, 3600)
+                              if not 5 * 3600 <= timestamp < 8 * 3600])
+
+    async def events(self, station_id, from_unix_timestamp, to_unix_timestamp):
+        self.calls.append(('events', from_unix_timestamp, to_unix_timestamp))
+        return Response(200, [{'date': from_timestamp(DAY + 60), 'code': 1}, {'date': from_timestamp(60), 'code': 2},
+                              {'date': from_timestamp(120), 'code': 1}])
+
+
+class TestColumnTable(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_typed_columns_round_trip(self):
+        table = ColumnTable.from_records([{'date': from_timestamp(3600), 'battery': 6400, 'solar': None},
+                                          {'date': from_timestamp(0), 'battery': 6500, 'solar': 1.5, 'text': 'x'}])
+        self.assertEqual(list(table.columns), ['time', 'battery', 'solar'])
+        self.assertEqual(table['battery'].typecode, 'q')
+        self.assertEqual(list(table['time']), [0, 3600])
+        self.assertTrue(math.isnan(table['solar'][1]))
+
+        path = self.directory + '/table'
+        table.meta = {'from': 0, 'to': 3600}
+        table.save(path)
+        loaded = ColumnTable.load(path)
+        self.assertEqual(loaded.meta, {'from': 0, 'to': 3600})
+        self.assertEqual(loaded.columns['battery'], table.columns['battery'])
+        self.assertEqual(list(loaded.select(1, 3600)['time']), [3600])
+
+    def test_merge_fills_missing_columns(self):
+        first = ColumnTable.from_records([{'date': 100, 'battery': 1}])
+        second = ColumnTable.from_records([{'date': 50, 'rssi': -70}])
+        merged = first.merge(second)
+        self.assertEqual(list(merged['time']), [50, 100])
+        self.assertEqual(merged['battery'].typecode, 'd')
+        self.assertEqual(merged['rssi'][0], -70)
+        self.assertTrue(math.isnan(merged['rssi'][1]))
+
+
+class TestHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_async(self, coroutine):
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    def test_fetches_windows_and_only_missing_ranges(self):
+        client = MockClient()
+        store = HistoryStore(client, self.directory, window=DAY)
+        history = self.run_async(store.history('s1', 0, 2 * DAY - 1))
+        self.assertEqual(sorted(client.calls), [('history', 0, DAY - 1), ('history', DAY, 2 * DAY - 1)])
+        self.assertEqual(len(history), 45)
+
+        client.calls = []
+        history = self.run_async(HistoryStore(client, self.directory, window=DAY).history('s1', DAY, 3 * DAY - 1))
+        self.assertEqual(client.calls, [('history', 2 * DAY, 3 * DAY - 1)])
+        self.assertEqual(history['time'][0], DAY)
+        self.assertEqual(len(history), 48)
+
+    def test_local_dates(self):
+        server = MockServer(credentials={'public': 'private'}, now=3 * DAY, timezone_offset=120)
+
+        async def actual_test():
+            async with HMAC('public', 'private', transport=InProcessTransport(server.respond)) as client:
+                records = await client.station.station_transmission_history_between(server.station_ids[0], DAY,
+                                                                                     DAY + 3 * 3600)
+                history = await HistoryStore(client, self.directory).history(server.station_ids[0], DAY,
+                                                                             DAY + 3 * 3600)
+                return records.response, history
+
+        (records, history) = self.run_async(actual_test())
+        self.assertEqual(len(history), len(records))
+        self.assertEqual(list(history['time']), list(range(DAY, DAY + 3 * 3600 + 1, 900)))
+        self.assertEqual(records[0]['date'], '1970-01-02 02:00:00')
+
+    def test_concurrent_queries_fetch_once(self):
+        client = MockClient()
+        store = HistoryStore(client, self.directory, window=DAY)
+
+        async def actual_test():
+            return await asyncio.gather(store.history('s1', 0, 2 * DAY - 1), store.history('s1', DAY, 2 * DAY - 1))
+
+        (first, second) = self.run_async(actual_test())
+        self.assertEqual(sorted(client.calls), [('history', 0, DAY - 1), ('history', DAY, 2 * DAY - 1)])
+        self.assertEqual((len(first), len(second)), (45, 24))
+
+    def test_queries(self):
+        store = HistoryStore(MockClient(), self.directory)
+        history = self.run_async(store.history('s1', 0, 2 * DAY - 1))
+        self.assertEqual(transmission_gaps(history, 3600), [(4 * 3600, 8 * 3600)])
+        self.assertAlmostEqual(uptime(history, 3600, 0, DAY - 1), 21 / 24)
+        self.assertEqual(daily(history, 'battery', 'max'), (['1970-01-01 00:00:00', '1970-01-02 00:00:00'], [6500, 6476]))
+        self.assertAlmostEqual(trend(history, 'battery'), -24)
+        self.assertIsNone(trend(history.select(0, 0), 'battery'))
+
+        events = self.run_async(store.events('s1', 0, 2 * DAY - 1))
+        self.assertEqual(list(events_per_day(events).values()), [2, 1])
+        self.assertEqual(list(events_per_day(events, code=1).values()), [1, 1])
+        self.assertEqual(events_per_day(ColumnTable(), code=1), {})
@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from fieldclimate.metadata import StationMetadataCache
+from fieldclimate.reqresp import Response
+
+
+class MockClient:
+    def __init__(self):
+        self.calls = []
+        self.last_communication = '2018-12-01 10:00:00'
+        self.station = SimpleNamespace(
+            station_information=self.handler('station_information', lambda station_id: {
+                'name': {'original': station_id},
+                'dates': {'last_communication': self.last_communication},
+                'config': {'upload': {'transfer_interval': 15}}}),
+            station_sensors=self.handler('station_sensors', lambda station_id: [{'code': 506, 'ch': 1}]),
+            station_nodes=self.handler('station_nodes', lambda station_id: {}),
+            station_serials=self.handler('station_serials', lambda station_id: None))
+        self.user = SimpleNamespace(list_of_user_devices=self.handler('list_of_user_devices', lambda: [
+            {'name': {'original': 's1'}, 'dates': {'last_communication': self.last_communication}, 'config': {}},
+            {'name': {'original': 's2'}, 'dates': {'last_communication': self.last_communication}, 'config': {}}]))
+
+    def handler(self, name, result):
+        async def handle(*args):
+            await asyncio.sleep(0)
+            self.calls.append((name,) + args)
+            return Response(200, result(*args))
+        return handle
+
+    def count(self, name):
+        return len([call for call in self.calls if call[0] == name])
+
+
+class TestStationMetadataCache(unittest.TestCase):
+    def run_async(self, coroutine):
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    def setUp(self):
+        self.client = MockClient()
+        self.cache = StationMetadataCache(self.client)
+
+    def test_metadata_is_refetched_only_on_change(self):
+        metadata = self.run_async(self.cache.get('s1'))
+        self.assertEqual(metadata.sensors, [{'code': 506, 'ch': 1}])
+        self.assertIsNone(metadata.serials)
+        self.run_async(self.cache.get('s1'))
+        self.assertEqual(self.client.count('station_information'), 2)
+        self.assertEqual(self.client.count('station_sensors'), 1)
+        self.client.last_communication = '2018-12-01 10:15:00'
+        self.run_async(self.cache.get('s1'))
+        self.assertEqual(self.client.count('station_sensors'), 2)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+        self.assertAlmostEqual(self.cache.hit_ratio, 1 / 3)
+
+    def test_max_age(self):
+        cache = StationMetadataCache(self.client, max_age=3600)
+        self.run_async(cache.get('s1'))
+        self.run_async(cache.get('s1'))
+        self.assertEqual(self.client.count('station_information'), 1)
+        self.assertEqual(cache.hits, 1)
+
+    def test_concurrent_gets_share_one_load(self):
+        async def concurrent():
+            return await asyncio.gather(self.cache.get('s1'), self.cache.get('s1'))
+        (first, second) = self.run_async(concurrent())
+        self.assertIs(first, second)
+        self.assertEqual(self.client.count('station_sensors'), 1)
+
+    def test_warm_up(self):
+        self.run_async(self.cache.warm_up())
+        self.assertEqual(self.client.count('station_information'), 0)
+        self.assertEqual(self.client.count('station_sensors'), 2)
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_invalidate(self):
+        self.run_async(self.cache.get('s1'))
+        self.cache.invalidate('s1')
+        self.run_async(self.cache.get('s1'))
+        self.assertEqual(self.client.count('station_sensors'), 2)
@@ -0,0 +1,168 @@
+import asyncio
+import os
+import subprocess
+import sys
+import unittest
+
+from fieldclimate.connection.base import ConnectionBase
+from fieldclimate.connection.hmac import HMAC
+from fieldclimate.mockserver import MockServer
+from fieldclimate.reqresp import ResponseException
+
+
+class BearerConnection(ConnectionBase):
+    def __init__(self, token):
+        super().__init__()
+        self._token = token
+
+    def _modify_request(self, request):
+        request.headers['Authorization'] = 'Authorization: Bearer {}'.format(self._token)
+
+
+class TestMockServer(unittest.TestCase):
+    public_key = 'public'
+    private_key = 'private'
+
+    def run_with_server(self, test, connection=None, **kwargs):
+        async def actual_test():
+            async with MockServer(credentials={self.public_key: self.private_key}, tokens=['token'],
+                                  **kwargs) as server:
+                conn = connection or HMAC(self.public_key, self.private_key)
+                conn.api_uri = server.api_uri
+                async with conn as client:
+                    return server, await test(client)
+
+        return asyncio.get_event_loop().run_until_complete(actual_test())
+
+    def test_hmac_authenticated_routes(self):
+        async def test(client):
+            devices = await client.user.list_of_user_devices()
+            station_id = devices.response[0]['name']['original']
+            return devices, await client.data.get_last_data(station_id, 'raw', '1d', 'optimized')
+
+        (server, (devices, data)) = self.run_with_server(test, stations=3, sensors=8, raw_interval=900)
+        self.assertEqual(len(devices.response), 3)
+        self.assertEqual(len(data.response['dates']), 96)
+        self.assertEqual(len(data.response['data']), 8)
+        self.assertEqual(sum(server.requests.values()), 2)
+
+    def test_data_between_period(self):
+        async def test(client):
+            return await client.data.get_data_between_period('00200000', 'hourly', 1543622400, 1543708800)
+
+        (_, data) = self.run_with_server(test)
+        self.assertEqual(data.response['dates'][0], '2018-12-01 00:00:00')
+        self.assertEqual(len(data.response['dates']), 25)
+        self.assertEqual(len(data.response['data'][0]['values']['avg']), 25)
+
+    def test_oauth2_token(self):
+        async def test(client):
+            return await client.user.user_information()
+
+        (_, response) = self.run_with_server(test, connection=BearerConnection('token'))
+        self.assertEqual(response.response['username'], 'mock')
+
+    def test_invalid_signature(self):
+        async def test(client):
+            with self.assertRaises(ResponseException) as context:
+                await client.user.user_information()
+            return context.exception.code
+
+        (_, code) = self.run_with_server(test, connection=HMAC(self.public_key, 'wrong'))
+        self.assertEqual(code, 401)
+
+    def test_rate_limit(self):
+        async def test(client):
+            results = await asyncio.gather(*[client.user.user_information() for _ in range(5)],
+                                           return_exceptions=True)
+            return [getattr(result, 'code', None) for result in results]
+
+        (_, codes) = self.run_with_server(test, rate_limit=2)
+        self.assertEqual(sorted(codes, key=str), [200, 200, 429, 429, 429])
+
+    def test_errors_and_latency(self):
+        async def test(client):
+            loop = asyncio.get_event_loop()
+            start = loop.time()
+            results = await asyncio.gather(*[client.user.user_information() for _ in range(20)],
+                                           return_exceptions=True)
+            return loop.time() - start, [getattr(result, 'code', None) for result in results]
+
+        (_, (elapsed, codes)) = self.run_with_server(test, latency=0.05, error_rate=0.5)
+        self.assertGreaterEqual(elapsed, 0.05)
+        self.assertIn(200, codes)
+        self.assertIn(500, codes)
+
+    def test_all_client_routes(self):
+        async def test(client):
+            station_id = '00200000'
+            body = {'sensors': [{'code': 506, 'ch': 1}]}
+            calls = [
+                client.user.user_information(), client.user.update_user_information({}),
+                client.user.delete_user_account(), client.user.list_of_user_devices(),
+                client.user.list_of_user_licenses(), client.system.system_status(),
+                client.system.list_of_system_sensors(), client.system.list_of_system_sensor_groups(),
+                client.system.list_of_groups_and_sensors(), client.system.types_of_devices(),
+                client.system.system_countries_support(), client.system.system_timezones_support(),
+                client.system.system_diseases_support(), client.station.station_information(station_id),
+                client.station.update_station_information(station_id, {}), client.station.station_sensors(station_id),
+                client.station.station_sensor_update(station_id, {}), client.station.station_nodes(station_id),
+                client.station.change_node_name(station_id, {}), client.station.station_serials(station_id),
+                client.station.change_serial_name(station_id, {}),
+                client.station.add_station_to_account(station_id, 'key', {}),
+                client.station.remove_station_from_account(station_id, 'key'),
+                client.station.stations_in_proximity(station_id, '10km'),
+                client.station.station_last_events(station_id, 5, 'desc'),
+                client.station.station_events_between(station_id, 1543622400, 1543708800),
+                client.station.station_transmission_history_last(station_id, 5, 'all', 'asc'),
+                client.station.station_transmission_history_between(station_id, 1543622400, 1543708800),
+                client.station.station_licenses(station_id), client.data.min_max_date_of_data(station_id),
+                client.data.get_last_data(station_id, 'hourly', '1d'),
+                client.data.get_data_between_period(station_id, 'daily', 1543622400, 1543708800, 'optimized'),
+                client.data.get_last_data_customized(station_id, 'raw', '5', body),
+                client.data.get_data_between_period_customized(station_id, 'hourly', 1543622400, body, 1543708800),
+                client.forecast.get_forecast_data(station_id, 'general7'),
+                client.forecast.get_forecast_image(station_id, 'general7'),
+                client.disease.get_last_eto(station_id, '7d'), client.disease.get_eto_between(station_id, 1543622400),
+                client.disease.get_last_disease(station_id, '7d', {'name': 'GeneralAPIs/Apple Scab'}),
+                client.disease.get_disease_between(station_id, 1543622400, {'name': 'Model'}, 1543708800),
+                client.dev.list_of_applications(), client.dev.application_users('app'),
+                client.dev.application_stations('app'), client.dev.user_stations('user0'),
+                client.dev.add_station_to_user('user0', station_id, 'key', {}),
+                client.dev.remove_station_from_user('user0', station_id),
+                client.dev.register_user_to_application('app', {}),
+                client.dev.activate_registered_user_account('key'),
+                client.dev.new_password_request('app', {}), client.dev.setting_new_password('app', 'key', {}),
+                client.chart.charting_last_data(station_id, 'hourly', '1d'),
+                client.chart.charting_period(station_id, 'daily', 1543622400, 1543708800, 'images'),
+                client.chart.charting_last_data_customized(station_id, 'raw', '5', body),
+                client.chart.charting_period_data_customized(station_id, 'hourly', 1543622400, body, 1543708800),
+                client.cameras.min_max_date_of_data(station_id), client.cameras.get_last_photos(station_id, 3, 1),
+                client.cameras.get_photos_between_period(station_id, 1543622400, 1543708800),
+                client.cameras.get_photos_between_period(station_id, camera=2),
+            ]
+            return await asyncio.gather(*calls)
+
+        (server, responses) = self.run_with_server(test, now=1543708800)
+        self.assertTrue(all(response.code in (200, 204) for response in responses))
+        photos = responses[-2].response
+        self.assertEqual((photos[0]['time'], len(photos)), ('2018-12-01 00:00:00', 25))
+
+    def test_fixed_now_and_local_dates(self):
+        async def test(client):
+            station = await client.station.station_information('00200000')
+            data = await client.data.get_last_data('00200000', 'hourly', '2')
+            return station.response, data.response
+
+        (_, (station, data)) = self.run_with_server(test, now=1543708800 + 1800, timezone_offset=60)
+        self.assertEqual(station['config']['timezone_offset'], 60)
+        self.assertEqual(station['dates']['max_date'], '2018-12-02 01:30:00')
+        self.assertEqual(data['dates'], ['2018-12-02 00:00:00', '2018-12-02 01:00:00'])
+
+    def test_other_stations_are_the_same_in_every_process(self):
+        code = 'from fieldclimate.mockserver import MockServer; print(MockServer()._station_index("elsewhere"))'
+        indices = set()
+        for seed in ('1', '2'):
+            env = dict(os.environ, PYTHONHASHSEED=seed)
+            indices.add(subprocess.check_output([sys.executable, '-c', code], env=env).strip())
+        self.assertEqual(indices, {str(MockServer()._station_index('elsewhere')).encode()})
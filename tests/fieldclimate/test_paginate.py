@@ -0,0 +1,134 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from fieldclimate import paginate
+from fieldclimate.reqresp import Response
+from fieldclimate.resample import from_timestamp
+
+
+class MockClient:
+    def __init__(self, timestamps, latency=0.0, timezone_offset=0):
+        # Dates are in the local time of the station, `timezone_offset` minutes ahead of UTC.
+        self.timezone_offset = timezone_offset
+        self.items = [{'date': self.date(timestamp), 'code': i} for (i, timestamp) in enumerate(timestamps)]
+        self.calls = []
+        self.latency = latency
+        self.now = 0.0
+        self.station = SimpleNamespace(station_last_events=self.last, station_events_between=self.between,
+                                       station_information=self.information)
+
+    def date(self, timestamp):
+        return from_timestamp(timestamp + self.timezone_offset * 60)
+
+    async def information(self, station_id):
+        return Response(200, {'config': {'timezone_offset': self.timezone_offset}})
+
+    def clock(self):
+        return self.now
+
+    async def last(self, station_id, amount):
+        self.calls.append(('last', amount))
+        self.now += self.latency
+        return Response(200, sorted(self.items, key=lambda item: item['date'])[-amount:])
+
+    async def between(self, station_id, from_unix_timestamp, to_unix_timestamp):
+        self.calls.append(('between', from_unix_timestamp, to_unix_timestamp))
+        self.now += self.latency
+        (start, end) = (self.date(from_unix_timestamp), self.date(to_unix_timestamp))
+        return Response(200, [item for item in self.items if start <= item['date'] <= end])
+
+
+def collect(paginator):
+    async def actual_test():
+        items = []
+        async for item in paginator:
+            items.append(item)
+        return items
+
+    return asyncio.get_event_loop().run_until_complete(actual_test())
+
+
+class TestBackwardPaginator(unittest.TestCase):
+    def test_walks_backwards_without_duplicates(self):
+        # Two events share the timestamp at which the first page ends.
+        timestamps = [i * 900 for i in range(1, 200)] + [190 * 900]
+        client = MockClient(timestamps)
+        items = collect(paginate.events(client, 's1', page_size=10, max_page_size=10, max_empty_span=86400,
+                                        clock=client.clock))
+        self.assertEqual(sorted(item['code'] for item in items), list(range(200)))
+        dates = [item['date'] for item in items]
+        self.assertEqual(dates, sorted(dates, reverse=True))
+        self.assertEqual(client.calls[0], ('last', 10))
+        self.assertEqual(client.calls[1], ('between', 180 * 900, 190 * 900))
+
+    def test_stops_early(self):
+        client = MockClient([i * 900 for i in range(1, 1000)])
+        items = collect(paginate.events(client, 's1', page_size=10, limit=25, clock=client.clock))
+        self.assertEqual(len(items), 25)
+        self.assertLessEqual(len(client.calls), 3)
+
+        client = MockClient([i * 900 for i in range(1, 1000)])
+        items = collect(paginate.events(client, 's1', page_size=10, until=900 * 950, clock=client.clock))
+        self.assertEqual(len(items), 50)
+
+    def test_stops_after_empty_span(self):
+        client = MockClient([i * 900 for i in range(1, 20)] + [10 ** 7 + i * 900 for i in range(20)])
+        items = collect(paginate.events(client, 's1', page_size=10, max_empty_span=86400, clock=client.clock))
+        self.assertEqual(len(items), 20)
+        self.assertEqual(client.calls[-1][0], 'between')
+
+    def test_page_size_follows_latency(self):
+        client = MockClient([i * 900 for i in range(1, 1000)])
+        paginator = paginate.events(client, 's1', page_size=40, target_latency=1.0, limit=100, clock=client.clock)
+        client.latency = 2.0
+        collect(paginator)
+        self.assertEqual(paginator.page_size, 10)
+
+        client = MockClient([i * 900 for i in range(1, 1000)])
+        paginator = paginate.events(client, 's1', page_size=10, max_page_size=80, clock=client.clock)
+        collect(paginator)
+        self.assertEqual(paginator.page_size, 80)
+        self.assertLess(paginator.pages, 30)
+
+    def test_short_history(self):
+        client = MockClient([900, 1800])
+        self.assertEqual(len(collect(paginate.events(client, 's1', clock=client.clock))), 2)
+        self.assertEqual(client.calls, [('last', 100)])
+
+    def test_local_dates(self):
+        timestamps = [i * 900 for i in range(1, 200)]
+        client = MockClient(timestamps, timezone_offset=120)
+        items = collect(paginate.events(client, 's1', page_size=10, max_page_size=10, clock=client.clock))
+        self.assertEqual([item['code'] for item in items], list(range(198, -1, -1)))
+        self.assertEqual(client.calls[1], ('between', 180 * 900, 190 * 900))
+
+        client = MockClient(timestamps, timezone_offset=120)
+        items = collect(paginate.events(client, 's1', page_size=10, until=150 * 900, timezone_offset=120,
+                                        clock=client.clock))
+        self.assertEqual(len(items), 50)
+
+    def test_pages_are_capped(self):
+        # Sparse at first, so that the period estimated for the second page holds far more than a page.
+        timestamps = [i * 900 for i in range(1, 1000)] + [10 ** 6 + i * 86400 for i in range(10)]
+        client = MockClient(timestamps)
+        paginator = paginate.events(client, 's1', page_size=10, max_page_size=10, clock=client.clock)
+        queued = []
+
+        async def actual_test():
+            items = []
+            async for item in paginator:
+                items.append(item)
+                queued.append(len(paginator._items))
+            return items
+
+        items = asyncio.get_event_loop().run_until_complete(actual_test())
+        self.assertEqual(sorted(item['code'] for item in items), list(range(1009)))
+        self.assertLess(max(queued), 10)
+
+    def test_duplicates_are_told_apart_by_key_fields(self):
+        client = MockClient([900, 1800])
+        client.items.append(dict(client.items[1], description='Other'))
+        client.items.append(dict(client.items[1]))
+        items = collect(paginate.events(client, 's1', page_size=2, clock=client.clock))
+        self.assertEqual(len(items), 3)
@@ -0,0 +1,82 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from fieldclimate.proximity import ProximityIndex, distance_km
+from fieldclimate.reqresp import Response
+
+
+def device(station_id, latitude, longitude):
+    return {'name': {'original': station_id}, 'position': {'geo': {'coordinates': [longitude, latitude]}}}
+
+
+class MockClient:
+    def __init__(self):
+        self.proximity_calls = []
+        self.user = SimpleNamespace(list_of_user_devices=self.list_of_user_devices)
+        self.station = SimpleNamespace(stations_in_proximity=self.stations_in_proximity)
+
+    async def list_of_user_devices(self):
+        return Response(200, [device('warsaw', 52.23, 21.01), device('lodz', 51.76, 19.46),
+                              device('krakow', 50.06, 19.94), device('fiji-east', -17.7, 179.9),
+                              device('fiji-west', -17.7, -179.9), {'name': {'original': 'nowhere'}}])
+
+    async def stations_in_proximity(self, station_id, radius):
+        self.proximity_calls.append((station_id, radius))
+        return Response(200, [{'name': {'original': 'other'}, 'distance': 1.5}])
+
+
+class TestProximityIndex(unittest.TestCase):
+    def setUp(self):
+        self.client = MockClient()
+        self.index = ProximityIndex(self.client)
+        asyncio.get_event_loop().run_until_complete(self.index.build())
+
+    def test_distance(self):
+        self.assertAlmostEqual(distance_km(52.23, 21.01, 50.06, 19.94), 252, delta=2)
+
+    def test_build_skips_stations_without_position(self):
+        self.assertEqual(len(self.index), 5)
+        self.assertNotIn('nowhere', self.index)
+
+    def test_within(self):
+        self.assertEqual([station_id for (station_id, _) in self.index.within(52.0, 20.0, 200)], ['lodz', 'warsaw'])
+        self.assertEqual(self.index.within(0, 0, 100), [])
+
+    def test_within_across_antimeridian(self):
+        result = self.index.within(-17.7, 179.95, 50)
+        self.assertEqual([station_id for (station_id, _) in result], ['fiji-east', 'fiji-west'])
+
+    def test_station_on_antimeridian(self):
+        self.index.add('dateline', -17.7, 180)
+        for longitude in (179.99, -179.99):
+            result = self.index.within(-17.7, longitude, 3)
+            self.assertEqual([station_id for (station_id, _) in result], ['dateline'])
+        self.index.remove('dateline')
+        self.assertNotIn('dateline', self.index)
+
+    def test_nearest(self):
+        self.assertEqual([station_id for (station_id, _) in self.index.nearest(50.0, 20.0, 2)], ['krakow', 'lodz'])
+
+    def test_neighbours(self):
+        neighbours = asyncio.get_event_loop().run_until_complete(self.index.neighbours('warsaw', 150))
+        self.assertEqual([station_id for (station_id, _) in neighbours], ['lodz'])
+        self.assertEqual(self.client.proximity_calls, [])
+
+    def test_neighbours_fallback(self):
+        neighbours = asyncio.get_event_loop().run_until_complete(self.index.neighbours('unknown', 10))
+        self.assertEqual(neighbours, [('other', 1.5)])
+        self.assertEqual(self.client.proximity_calls, [('unknown', 10)])
+
+    def test_save_and_load(self):
+        (handle, path) = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            self.index.save(path)
+            loaded = ProximityIndex()
+            loaded.load(path)
+        finally:
+            os.remove(path)
+        self.assertEqual(loaded.within(52.0, 20.0, 200), self.index.within(52.0, 20.0, 200))
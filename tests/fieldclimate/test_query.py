@@ -0,0 +1,68 @@
+import asyncio
+import unittest
+
+from fieldclimate.connection.hmac import HMAC
+from fieldclimate.metadata import StationMetadataCache
+from fieldclimate.mockserver import MockServer
+from fieldclimate.query import SensorQuery
+
+SENSORS = [
+    {'ch': 1, 'code': 506, 'name': 'HC Air temperature', 'aggr': ['avg', 'max', 'min'], 'mac': 'X', 'serial': 'X'},
+    {'ch': 2, 'code': 507, 'name': 'HC Relative humidity', 'aggr': {'avg': True, 'max': True}},
+    {'ch': 3, 'code': 6, 'name': 'Precipitation', 'aggr': ['sum']},
+    {'ch': 4, 'code': 6, 'name': 'Precipitation', 'aggr': ['sum']},
+]
+
+
+class TestSensorQuery(unittest.TestCase):
+    def test_body(self):
+        query = SensorQuery(None).sensor(code=506, aggr='avg').sensor(name='humidity', aggr=['max', 'min']) \
+            .sensor(code=6).sensor(channel=1, aggr=['min', 'avg'])
+        self.assertEqual(query.body(SENSORS), {'sensors': [
+            {'code': 506, 'ch': 1, 'mac': 'X', 'serial': 'X', 'aggr': ['avg', 'min']},
+            {'code': 507, 'ch': 2, 'aggr': ['max']},
+            {'code': 6, 'ch': 3, 'aggr': ['sum']},
+            {'code': 6, 'ch': 4, 'aggr': ['sum']}]})
+
+    def test_all_aggregations_widen_earlier_selections(self):
+        sensors = [{'ch': 1, 'code': 506, 'name': 'HC Air temperature'}]
+        query = SensorQuery(None).sensor(code=506, aggr='avg').sensor(channel=1)
+        self.assertEqual(query.body(sensors), {'sensors': [{'code': 506, 'ch': 1}]})
+        query = SensorQuery(None).sensor(code=506).sensor(channel=1, aggr='avg')
+        self.assertEqual(query.body(sensors), {'sensors': [{'code': 506, 'ch': 1}]})
+
+    def test_unresolved_selection(self):
+        with self.assertRaises(LookupError):
+            SensorQuery(None).sensor(code=600).body(SENSORS)
+        with self.assertRaises(LookupError):
+            SensorQuery(None).sensor(code=6, aggr='avg').body(SENSORS)
+
+    def test_only_selected_sensors_are_transferred(self):
+        async def actual_test():
+            async with MockServer(credentials={'public': 'private'}, sensors=6) as server:
+                connection = HMAC('public', 'private')
+                connection.api_uri = server.api_uri
+                async with connection as client:
+                    cache = StationMetadataCache(client, max_age=3600)
+                    query = SensorQuery(cache).sensor(code=506, aggr='avg').sensor(code=6)
+                    data = await query.get_last_data('00200000', 'hourly', '1d', 'optimized')
+                    await query.get_data_between_period('00200000', 'hourly', 0, 3600)
+                    return data, cache
+
+        (data, cache) = asyncio.get_event_loop().run_until_complete(actual_test())
+        self.assertEqual(sorted(data.response['data']), ['1_X_X_506', '3_X_X_6'])
+        self.assertEqual((cache.misses, cache.hits), (1, 1))
+
+    def test_creates_cache_keeping_metadata(self):
+        async def actual_test():
+            async with MockServer(credentials={'public': 'private'}, sensors=6) as server:
+                connection = HMAC('public', 'private')
+                connection.api_uri = server.api_uri
+                async with connection as client:
+                    query = SensorQuery(client).sensor(code=506, aggr='avg')
+                    for _ in range(3):
+                        await query.get_last_data('00200000', 'hourly', '1d', 'optimized')
+                    return connection.metrics['requests']
+
+        # The station information and sensors, nodes and serials once, then the data three times.
+        self.assertEqual(asyncio.get_event_loop().run_until_complete(actual_test()), 7)
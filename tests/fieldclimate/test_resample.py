@@ -0,0 +1,41 @@
+import unittest
+
+from fieldclimate.resample import buckets, from_timestamp, resample, resample_response, to_timestamp
+
+
+class TestResample(unittest.TestCase):
+    dates = ['2018-07-06 00:00:00', '2018-07-06 00:30:00', '2018-07-06 01:00:00', '2018-07-06 01:30:00',
+             '2018-07-07 00:00:00']
+
+    def test_timestamps(self):
+        self.assertEqual(to_timestamp('2018-07-06 00:00:00'), 1530835200)
+        self.assertEqual(to_timestamp(1530835200), 1530835200)
+        self.assertEqual(from_timestamp(1530835200), '2018-07-06 00:00:00')
+
+    def test_buckets(self):
+        self.assertEqual(list(buckets(self.dates, 'hourly').values()), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(buckets(self.dates, 'daily').values()), [[0, 1, 2, 3], [4]])
+        self.assertEqual(list(buckets(self.dates, 7200, offset=3600).values()), [[0, 1], [2, 3], [4]])
+
+    def test_resample(self):
+        (dates, values) = resample(self.dates, [1, 2, None, None, 5], 'hourly', 'sum')
+        self.assertEqual(dates, ['2018-07-06 00:00:00', '2018-07-06 01:00:00', '2018-07-07 00:00:00'])
+        self.assertEqual(values, [3, None, 5])
+
+    def test_resample_response_respects_aggregation_kinds(self):
+        response = {
+            'dates': self.dates,
+            'data': {
+                '14_X_X_506': {'name': 'HC Air temperature', 'unit': 'C',
+                               'aggr': {'avg': [1, 3, 5, 7, 9], 'min': [0, 2, 4, 6, 8], 'max': [2, 4, 6, 8, 10]}},
+                '5_X_X_6': {'name': 'Precipitation', 'unit': 'mm', 'aggr': {'sum': [0.2, 0.4, 0, 0, 1]}},
+                '4_X_X_143': {'name': 'Leaf wetness', 'unit': 'min', 'aggr': {'time': [10, 20, 30, 0, 5]}},
+            }
+        }
+        resampled = resample_response(response, 'daily')
+        self.assertEqual(resampled['dates'], ['2018-07-06 00:00:00', '2018-07-07 00:00:00'])
+        temperature = resampled['data']['14_X_X_506']
+        self.assertEqual(temperature['name'], 'HC Air temperature')
+        self.assertEqual(temperature['aggr'], {'avg': [4, 9], 'min': [0, 8], 'max': [8, 10]})
+        self.assertAlmostEqual(resampled['data']['5_X_X_6']['aggr']['sum'][0], 0.6)
+        self.assertEqual(resampled['data']['4_X_X_143']['aggr']['time'], [60, 5])
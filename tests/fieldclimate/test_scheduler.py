@@ -0,0 +1,76 @@
+import asyncio
+import unittest
+
+from fieldclimate.scheduler import BATCH, INTERACTIVE, PriorityScheduler
+from tests.fieldclimate.test_api import MockConnection
+
+
+class TestPriorityScheduler(unittest.TestCase):
+    def run_async(self, coroutine):
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    def test_priority_classes_have_separate_budgets(self):
+        scheduler = PriorityScheduler({INTERACTIVE: 1, BATCH: 1})
+        blocker = asyncio.Event()
+        order = []
+
+        async def job(priority, name):
+            async with scheduler.slot(priority):
+                order.append(name)
+                if name == 'batch-1':
+                    await blocker.wait()
+
+        async def actual_test():
+            batch = [asyncio.ensure_future(job(BATCH, 'batch-{}'.format(i))) for i in range(1, 4)]
+            await asyncio.sleep(0)
+            await job(INTERACTIVE, 'interactive')
+            self.assertEqual(scheduler.waiting(BATCH), 2)
+            blocker.set()
+            await asyncio.gather(*batch)
+
+        self.run_async(actual_test())
+        self.assertEqual(order, ['batch-1', 'interactive', 'batch-2', 'batch-3'])
+        self.assertEqual(scheduler.running(BATCH), 0)
+
+    def test_tenants_are_served_in_turn(self):
+        scheduler = PriorityScheduler({BATCH: 1})
+        order = []
+
+        async def job(tenant, i):
+            async with scheduler.slot(BATCH, tenant):
+                order.append((tenant, i))
+                await asyncio.sleep(0)
+
+        async def actual_test():
+            jobs = [job('big', i) for i in range(4)] + [job('small', i) for i in range(2)]
+            await asyncio.gather(*jobs)
+
+        self.run_async(actual_test())
+        self.assertEqual(order, [('big', 0), ('big', 1), ('small', 0), ('big', 2), ('small', 1), ('big', 3)])
+
+    def test_cancelled_waiters_give_up_their_place(self):
+        scheduler = PriorityScheduler({BATCH: 1})
+
+        async def actual_test():
+            await scheduler.acquire(BATCH)
+            waiter = asyncio.ensure_future(scheduler.acquire(BATCH))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.sleep(0)
+            self.assertEqual(scheduler.waiting(BATCH), 0)
+            scheduler.release(BATCH)
+            self.assertEqual(scheduler.running(BATCH), 0)
+
+        self.run_async(actual_test())
+
+    def test_scheduled_client(self):
+        scheduler = PriorityScheduler({INTERACTIVE: 1, BATCH: 1})
+
+        async def actual_test():
+            async with MockConnection() as client:
+                scheduled = client.scheduled(scheduler, BATCH, tenant='customer')
+                responses = await asyncio.gather(*[scheduled.user.user_information() for _ in range(3)])
+                return [response.code for response in responses]
+
+        self.assertEqual(self.run_async(actual_test()), [200, 200, 200])
+        self.assertEqual(scheduler.running(BATCH), 0)
@@ -0,0 +1,71 @@
+import asyncio
+import math
+import unittest
+from types import SimpleNamespace
+
+from fieldclimate.connection.hmac import HMAC
+from fieldclimate.mockserver import MockServer
+from fieldclimate.reqresp import Response, ResponseException
+from fieldclimate.resample import to_timestamp
+from fieldclimate.snapshot import Snapshot, SnapshotCollector
+
+
+class TestSnapshot(unittest.TestCase):
+    def test_table(self):
+        snapshot = Snapshot(['s1', 's2'], ['temperature', 'rain'])
+        self.assertEqual(len(snapshot.values), 4)
+        snapshot.set('s2', 'rain', 1.5)
+        self.assertEqual(snapshot.row('s2'), {'temperature': None, 'rain': 1.5})
+        self.assertEqual(snapshot.column('rain'), [None, 1.5])
+        self.assertTrue(math.isnan(snapshot.values[0]))
+
+
+class TestSnapshotCollector(unittest.TestCase):
+    def run_async(self, coroutine):
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    def test_collects_latest_projected_values(self):
+        async def get_last_data(station_id, data_group, time_period, format=None):
+            if station_id == 'broken':
+                raise ResponseException(500, None)
+            return Response(200, {'dates': ['2018-12-01 10:00:00', '2018-12-01 10:05:00'], 'data': {
+                '1_X_X_506': {'aggr': {'avg': [10.5, 11.5], 'max': [12, 13]}},
+                '2_X_X_506': {'aggr': {'avg': [20.5, None]}},
+                '3_X_X_6': {'aggr': {'sum': [0.2, 0.4]}}}})
+
+        async def station_information(station_id):
+            return Response(200, {'config': {'timezone_offset': 0}})
+
+        client = SimpleNamespace(data=SimpleNamespace(get_last_data=get_last_data),
+                                 station=SimpleNamespace(station_information=station_information))
+        collector = SnapshotCollector(client, [('temperature', (506, 'avg', 1)), ('soil', (506, 'avg', 2)),
+                                               ('rain', (6, 'sum')), ('wind', (5, 'avg'))], stream=False)
+        snapshot = self.run_async(collector.collect(['s1', 'broken']))
+        self.assertEqual(snapshot.row('s1'), {'temperature': 11.5, 'soil': 20.5, 'rain': 0.4, 'wind': None})
+        self.assertEqual(list(snapshot.times), [1543658700, 0])
+        # The soil temperature is missing at the last date and dated by the value picked instead.
+        self.assertEqual((snapshot.time('s1', 'temperature'), snapshot.time('s1', 'soil')), (1543658700, 1543658400))
+        self.assertIsNone(snapshot.time('s1', 'wind'))
+        self.assertEqual(snapshot.column('rain'), [0.4, None])
+        self.assertEqual(snapshot.errors['broken'].code, 500)
+
+    def test_streams_from_server(self):
+        async def actual_test():
+            async with MockServer(credentials={'public': 'private'}, stations=3, timezone_offset=120) as server:
+                connection = HMAC('public', 'private')
+                connection.api_uri = server.api_uri
+                async with connection as client:
+                    projection = {'temperature': (506, 'avg'), 'rain': (6, 'sum')}
+                    snapshot = await SnapshotCollector(client, projection).collect(server.station_ids)
+                    response = await client.data.get_last_data(server.station_ids[0], 'raw', '1', 'optimized')
+                    return server.station_ids, snapshot, response.response
+
+        (station_ids, snapshot, response) = self.run_async(actual_test())
+        self.assertEqual(snapshot.errors, {})
+        latest = response['data']
+        self.assertEqual(snapshot.value(station_ids[0], 'temperature'), latest['1_X_X_506']['aggr']['avg'][-1])
+        self.assertEqual(snapshot.value(station_ids[0], 'rain'), latest['3_X_X_6']['aggr']['sum'][-1])
+        self.assertTrue(all(snapshot.times))
+        # The last date is in the local time of the station, two hours ahead of UTC.
+        self.assertEqual(snapshot.times[0], to_timestamp(response['dates'][-1]) - 7200)
+        self.assertEqual(snapshot.time(station_ids[0], 'rain'), snapshot.times[0])
@@ -0,0 +1,155 @@
+import asyncio
+import gzip
+import json
+import unittest
+from unittest.mock import patch
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from parameterized import parameterized
+
+from fieldclimate.api import ApiClient
+from fieldclimate.connection.base import ConnectionBase
+from fieldclimate.connection.hmac import HMAC
+from fieldclimate.connection.transport import InProcessTransport
+from fieldclimate.mockserver import MockServer
+from fieldclimate.reqresp import ResponseException
+from fieldclimate.streaming import JsonObjectParser
+
+
+class PlainConnection(ConnectionBase):
+    def _modify_request(self, request):
+        pass
+
+
+class TestJsonObjectParser(unittest.TestCase):
+    body = {
+        'dates': ['2018-12-01 00:00:00', '2018-12-01 00:05:00'],
+        'data': {
+            '14_X_X_506': {'name': 'HC Air "temperature"', 'unit': '°C', 'aggr': {'avg': [1.5, -2e3]}},
+            '5_X_X_6': {'name': 'Precipitation \\ [mm]', 'aggr': {'sum': [0, None]}},
+        },
+        'count': 12345,
+        'flag': True,
+        'empty': {},
+    }
+
+    def parse(self, text, chunk_size, split=('data',)):
+        parser = JsonObjectParser(split)
+        raw = text.encode('utf-8')
+        events = []
+        for i in range(0, len(raw), chunk_size):
+            events.extend(parser.feed(raw[i:i + chunk_size]))
+        events.extend(parser.close())
+        return events
+
+    @parameterized.expand([(1,), (2,), (7,), (1000,)])
+    def test_events(self, chunk_size):
+        events = self.parse(json.dumps(self.body, indent=1), chunk_size)
+        self.assertEqual(events, [
+            ('dates', None, self.body['dates']),
+            ('data', '14_X_X_506', self.body['data']['14_X_X_506']),
+            ('data', '5_X_X_6', self.body['data']['5_X_X_6']),
+            ('count', None, 12345),
+            ('flag', None, True),
+            ('empty', None, {}),
+        ])
+
+    @parameterized.expand([(1,), (5,), (1000,)])
+    def test_split_arrays(self, chunk_size):
+        text = '{"data": [{"name": "a"}, [1, 2], "b", 3], "empty": [], "last": 4.5}'
+        events = self.parse(text, chunk_size, split=('data', 'empty'))
+        self.assertEqual(events, [('data', 0, {'name': 'a'}), ('data', 1, [1, 2]), ('data', 2, 'b'), ('data', 3, 3),
+                                  ('last', None, 4.5)])
+
+    def test_events_are_emitted_as_soon_as_complete(self):
+        parser = JsonObjectParser()
+        self.assertEqual(parser.feed(b'{"data": {"a": [1, 2]'), [('data', 'a', [1, 2])])
+        self.assertEqual(parser.feed(b', "b": [3'), [])
+        self.assertEqual(parser.feed(b']}, "count": 1'), [('data', 'b', [3])])
+        self.assertEqual(parser.feed(b'}'), [('count', None, 1)])
+        self.assertEqual(parser.close(), [])
+
+    def test_incomplete_or_invalid_body(self):
+        with self.assertRaises(ValueError):
+            self.parse('{"data": {"a": [1, 2]}', 3)
+        with self.assertRaises(ValueError):
+            self.parse('[1, 2]', 3)
+
+
+class TestStreamedRequests(unittest.TestCase):
+    body = {'dates': list(range(2000)), 'data': {str(sensor): {'aggr': {'avg': list(range(2000))}}
+                                                 for sensor in range(10)}}
+
+    def stream(self, handler, compression=False):
+        async def actual_test():
+            app = web.Application()
+            app.router.add_get('/v1/data/station-id/raw/last/1d', handler)
+            async with TestServer(app) as server:
+                connection = PlainConnection()
+                if compression:
+                    connection.enable_compression()
+                with patch.object(ApiClient, 'api_uri', str(server.make_url('/v1'))):
+                    async with connection as client:
+                        stream = await client.data.stream_last_data('station-id', 'raw', '1d')
+                        events = []
+                        async for event in stream:
+                            events.append(event)
+                        return connection, events
+
+        return asyncio.get_event_loop().run_until_complete(actual_test())
+
+    def test_stream_last_data(self):
+        async def handler(request):
+            return web.json_response(self.body)
+
+        (_, events) = self.stream(handler)
+        self.assertEqual(events[0], ('dates', None, self.body['dates']))
+        self.assertEqual(dict((tag, sensor) for (_, tag, sensor) in events[1:]), self.body['data'])
+
+    def test_compressed_stream(self):
+        raw = json.dumps(self.body).encode()
+
+        async def handler(request):
+            return web.Response(body=gzip.compress(raw), headers={'Content-Encoding': 'gzip'})
+
+        (connection, events) = self.stream(handler, compression=True)
+        self.assertEqual(len(events), 11)
+        self.assertEqual(connection.metrics['bytes_decompressed'], len(raw))
+        self.assertEqual(connection.metrics['bytes_compressed'], len(gzip.compress(raw)))
+
+    def test_error_response(self):
+        async def handler(request):
+            return web.json_response({'message': 'Not found'}, status=404)
+
+        with self.assertRaises(ResponseException) as context:
+            self.stream(handler)
+        self.assertEqual(context.exception.code, 404)
+        self.assertEqual(context.exception.response, {'message': 'Not found'})
+
+    def test_admission_and_permit_are_held_until_the_stream_is_closed(self):
+        server = MockServer(credentials={'public': 'private'})
+        connection = HMAC('public', 'private', transport=InProcessTransport(server.respond))
+        connection.enable_adaptive_concurrency()
+        held = []
+
+        def hold():
+            held.append((connection._load_guard.outstanding, connection._concurrency.in_flight))
+
+        async def actual_test():
+            async with connection as client:
+                stream = await client.data.stream_last_data(server.station_ids[0], 'raw', '6')
+                hold()
+                async for _ in stream:
+                    hold()
+                hold()
+                async with await client.data.stream_last_data(server.station_ids[0], 'raw', '6') as stream:
+                    await stream.__anext__()
+                    hold()
+                hold()
+                with self.assertRaises(StopAsyncIteration):
+                    await stream.__anext__()
+
+        asyncio.get_event_loop().run_until_complete(actual_test())
+        self.assertEqual(held[0], (1, 1))
+        self.assertEqual(held[-3:], [(0, 0), (1, 1), (0, 0)])
@@ -0,0 +1,52 @@
+import threading
+import unittest
+from concurrent.futures import Future
+
+from fieldclimate.api import ApiClient
+from fieldclimate.sync import SyncApiClient
+from tests.fieldclimate.test_api import MockConnection
+
+
+class TestSyncApiClient(unittest.TestCase):
+
+    def setUp(self):
+        self.client = SyncApiClient(MockConnection())
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_blocking_call(self):
+        response = self.client.user.user_information()
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.response['url'], '{}/user'.format(ApiClient.api_uri))
+
+    def test_futures(self):
+        futures = [self.client.futures.data.get_last_data('station-{}'.format(i), 'raw', '1') for i in range(10)]
+        self.assertTrue(all(isinstance(future, Future) for future in futures))
+        urls = [future.result().response['url'] for future in futures]
+        self.assertEqual(urls, ['{}/data/station-{}/raw/last/1'.format(ApiClient.api_uri, i) for i in range(10)])
+
+    def test_calls_from_many_threads_share_one_session(self):
+        sessions = []
+
+        def worker():
+            self.client.station.station_information('station-id')
+            sessions.append(self.client.client._auth._session)
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(sessions), 5)
+        self.assertEqual(len(set(map(id, sessions))), 1)
+
+    def test_unknown_attributes(self):
+        with self.assertRaises(AttributeError):
+            self.client.no_such_route
+        with self.assertRaises(AttributeError):
+            self.client.futures.api_uri
+
+    def test_close_is_idempotent(self):
+        self.client.close()
+        self.client.close()
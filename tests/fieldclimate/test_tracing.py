@@ -0,0 +1,96 @@
+import asyncio
+import gc
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import weakref
+
+from fieldclimate import tracing
+from fieldclimate.tracing import Tracer, route_name
+from tests.fieldclimate.test_api import MockConnection
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 0.001
+        return self.now
+
+
+class TestTracer(unittest.TestCase):
+    def run_async(self, coroutine):
+        return asyncio.get_event_loop().run_until_complete(coroutine)
+
+    def test_route_name(self):
+        self.assertEqual(route_name('GET', 'data/00000146/raw/last/1d'), 'GET data/{}/raw/last/{}')
+        self.assertEqual(route_name('GET', 'user/stations'), 'GET user/stations')
+
+    def test_nested_spans_and_collapsed_stacks(self):
+        tracer = Tracer(FakeClock())
+        with tracer.span('job'):
+            with tracer.span('fetch'):
+                pass
+            with tracing.span('inner'):
+                pass
+        self.assertEqual([span.stack for span in tracer.spans], [('job', 'fetch'), ('job', 'inner'), ('job',)])
+        self.assertEqual(tracer.collapsed_stacks(), ['job 3000', 'job;fetch 1000', 'job;inner 1000'])
+
+    def test_spans_do_not_keep_tasks_alive(self):
+        tracer = Tracer()
+
+        async def job():
+            with tracer.span('job'):
+                await asyncio.sleep(0)
+            return bytearray(1000)
+
+        loop = asyncio.get_event_loop()
+        task = loop.create_task(job())
+        loop.run_until_complete(task)
+        (reference, task_id) = (weakref.ref(task), id(task))
+        del task
+        gc.collect()
+        self.assertIsNone(reference())
+        self.assertEqual([span.task_id for span in tracer.spans], [task_id])
+        self.assertEqual(tracer.chrome_trace()['traceEvents'][0]['tid'], 1)
+
+    def test_spans_without_tracer_are_no_ops(self):
+        with tracing.span('nothing') as span:
+            self.assertIsNone(span)
+        self.assertEqual(tracing._stacks, {})
+
+    def test_traced_calls(self):
+        tracer = Tracer()
+
+        async def actual_test():
+            async with MockConnection() as client:
+                traced = client.traced(tracer)
+                await asyncio.gather(traced.user.user_information(), traced.station.station_information('00000146'))
+                await client.user.user_information()
+
+        self.run_async(actual_test())
+        stacks = sorted(span.stack for span in tracer.spans)
+        self.assertEqual(stacks, [
+            ('GET station/{}',), ('GET station/{}', '_make_request'), ('GET station/{}', '_make_request', 'decode'),
+            ('GET station/{}', '_make_request', 'http'), ('GET station/{}', '_make_request', 'sign'),
+            ('GET user',), ('GET user', '_make_request'), ('GET user', '_make_request', 'decode'),
+            ('GET user', '_make_request', 'http'), ('GET user', '_make_request', 'sign')])
+        self.assertEqual(tracing._stacks, {})
+
+        directory = tempfile.mkdtemp()
+        try:
+            tracer.save_chrome_trace(os.path.join(directory, 'trace.json'))
+            with open(os.path.join(directory, 'trace.json')) as f:
+                events = json.load(f)['traceEvents']
+            tracer.save_collapsed_stacks(os.path.join(directory, 'trace.folded'))
+            with open(os.path.join(directory, 'trace.folded')) as f:
+                lines = f.read().splitlines()
+        finally:
+            shutil.rmtree(directory)
+        self.assertEqual(len(events), 10)
+        self.assertEqual(set(event['tid'] for event in events), {1, 2})
+        self.assertEqual(set(event['ph'] for event in events), {'X'})
+        self.assertIn('GET user;_make_request;http', [line.rsplit(' ', 1)[0] for line in lines])